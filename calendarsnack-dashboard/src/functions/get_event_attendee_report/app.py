@@ -6,14 +6,14 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from os import environ, path
 
-import boto3
-from thirtyone import aws
+from thirtyone import aws, templates
+from thirtyone.clients import client, cold_start_report
 
 # Variable Reuse
-codecommit = boto3.client("codecommit")
-dynamodb = boto3.client("dynamodb", region_name=environ["REGION"])
 dynamodb_table = environ["DYNAMODB_TABLE"]
-ses = boto3.client("ses", region_name=environ["REGION"])
+templates.preload_templates_for(
+    (environ["ATTENDEE_REPORT_EMAIL"],), repository=environ["CODECOMMIT_REPO"]
+)
 
 
 def lambda_handler(event, _):
@@ -21,6 +21,7 @@ def lambda_handler(event, _):
     configure_logging(environ.get("LOG_LEVEL", "WARNING"))
     logging.info(event)
     generate_attendee_report_for(event["pathParameters"]["uid"])
+    cold_start_report()
 
     return {
         "statusCode": 200,
@@ -39,7 +40,7 @@ def generate_attendee_report_for(uid):
 
 def get_attendee_list_for(uid):
     """Get attendee list for uid."""
-    return dynamodb.query(
+    return client("dynamodb", region_name=environ["REGION"]).query(
         TableName=environ["DYNAMODB_TABLE"],
         KeyConditionExpression="pk = :pk AND begins_with ( sk , :attendee )",
         ProjectionExpression=(
@@ -69,7 +70,7 @@ def get_organizer_email_from(uid):
     return aws.get_dynamodb_record_for(
         "event#{}".format(uid),
         secondary_key="event#{}".format(uid),
-        dynamodb=dynamodb,
+        dynamodb=client("dynamodb", region_name=environ["REGION"]),
         dynamodb_table=dynamodb_table,
     )["mailto"]
 
@@ -122,7 +123,7 @@ def send_report_to_organizer_for(event):
 
     report_email.attach(attachment)
 
-    ses.send_raw_email(
+    client("ses", region_name=environ["REGION"]).send_raw_email(
         Source=environ["SENDER"],
         Destinations=[event["mailto"]],
         RawMessage={
@@ -133,13 +134,14 @@ def send_report_to_organizer_for(event):
 
 def get_attendee_report_email_template_for(event):
     """Get attendee report email template for event."""
-    attendee_report_email_template = aws.get_codecommit_file_for(
+    attendee_report_email_template = templates.get_template_for(
         environ["ATTENDEE_REPORT_EMAIL"],
         repository=environ["CODECOMMIT_REPO"],
-        codecommit=codecommit,
     )
 
-    return attendee_report_email_template.replace("{uid}", event["uid"])
+    return templates.render_template(
+        attendee_report_email_template, uid=event["uid"]
+    )
 
 
 def configure_logging(log_level=environ.get("LOG_LEVEL", "WARNING")):
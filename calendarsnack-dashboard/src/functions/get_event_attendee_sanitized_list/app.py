@@ -4,10 +4,8 @@ import json
 import logging
 from os import environ
 
-import boto3
-
-# Variable Reuse
-dynamodb = boto3.client("dynamodb", region_name=environ["REGION"])
+from thirtyone.clients import client, cold_start_report
+from thirtyone.sanitize import mask_many
 
 
 def lambda_handler(event, _):
@@ -17,6 +15,7 @@ def lambda_handler(event, _):
     attendee_list = get_sanitized_attendee_list_for(
         event["pathParameters"]["uid"]
     )
+    cold_start_report()
 
     return {
         "statusCode": 200,
@@ -34,7 +33,7 @@ def get_sanitized_attendee_list_for(uid):
 
 def get_attendee_list_for(uid):
     """Get attendee list for uid."""
-    return dynamodb.query(
+    return client("dynamodb", region_name=environ["REGION"]).query(
         TableName=environ["DYNAMODB_TABLE"],
         KeyConditionExpression="pk = :pk AND begins_with ( sk , :attendee )",
         ProjectionExpression="attendee, #name, origin, prodid, #status",
@@ -50,34 +49,21 @@ def get_attendee_list_for(uid):
 
 def sanitize(attendee_list):
     """Sanitize attendee list."""
-    sanitized_attendee_list = []
-
-    for attendee in attendee_list:
-        sanitized_attendee_list.append(
-            {
-                "attendee": sanitize_sender_from(attendee["attendee"]["S"]),
-                "name": sanitize_attendee(attendee["name"]["S"]),
-                "status": attendee["status"]["S"],
-                "origin": attendee["origin"]["S"],
-                "prodid": attendee["prodid"]["S"],
-            }
-        )
-
-    return sanitized_attendee_list
-
-
-def sanitize_sender_from(email):
-    """Sanitize sender email."""
-    sender, domain = email.split("@")
-
-    return "{sender}@{domain}".format(
-        sender=sender[0] + ("*" * 7), domain=domain
+    emails = mask_many(
+        [attendee["attendee"]["S"] for attendee in attendee_list], emails=True
     )
-
-
-def sanitize_attendee(name):
-    """Sanitize attendee name."""
-    return name[0] + ("*" * 7)
+    names = mask_many([attendee["name"]["S"] for attendee in attendee_list])
+
+    return [
+        {
+            "attendee": email,
+            "name": name,
+            "status": attendee["status"]["S"],
+            "origin": attendee["origin"]["S"],
+            "prodid": attendee["prodid"]["S"],
+        }
+        for attendee, email, name in zip(attendee_list, emails, names)
+    ]
 
 
 def configure_logging(log_level=environ.get("LOG_LEVEL", "WARNING")):
@@ -5,18 +5,18 @@ import logging
 import re
 from os import environ
 
-import boto3
 from thirtyone import aws
-
-# Variable Reuse
-sns = boto3.client("sns")
+from thirtyone.clients import cold_start_report
 
 
 def lambda_handler(event, _):
     """Handle lambda event."""
     configure_logging(environ.get("LOG_LEVEL", "WARNING"))
     logging.info(event)
-    return get_event_invite_from_api(event)
+    result = get_event_invite_from_api(event)
+    cold_start_report()
+
+    return result
 
 
 def get_event_invite_from_api(request):
@@ -118,7 +118,6 @@ def queue_invite_for_processing(request):
     aws.publish_sns_message(
         message=json.dumps({"default": json.dumps(request)}),
         arn=environ["NEW_EVENT_INVITE_REQUEST"],
-        sns=sns,
     )
 
     return status
@@ -5,17 +5,18 @@ import logging
 from base64 import b64decode
 from os import environ
 
-import boto3
-
-# Variable Reuse
-DYNAMODB = boto3.client("dynamodb", region_name=environ["REGION"])
+from thirtyone.aws import EVENT_SCHEMA, deserializer_for
+from thirtyone.clients import client, cold_start_report
 
 
 def lambda_handler(event, _):
     """Process API request."""
     configure_logging(environ.get("LOG_LEVEL", "WARNING"))
     logging.info(event)
-    return get_organizer_events(event)
+    result = get_organizer_events(event)
+    cold_start_report()
+
+    return result
 
 
 def get_organizer_events(request):
@@ -46,7 +47,7 @@ def get_organizer_events(request):
 
 def get_event_list(organizer):
     """Get event list for organizer."""
-    return DYNAMODB.query(
+    return client("dynamodb", region_name=environ["REGION"]).query(
         TableName=environ["DYNAMODB_TABLE"],
         IndexName="organizer_events",
         KeyConditionExpression=(
@@ -81,21 +82,7 @@ def get_organizer(request):
 
 def format_events(events):
     """Standardize event information."""
-    return [
-        {
-            "uid": event["uid"]["S"],
-            "mailto": event["mailto"]["S"],
-            "organizer": event["organizer"]["S"],
-            "status": event["status"]["S"],
-            "created": int(event["created"]["N"]),
-            "dtstart": int(event["dtstart"]["N"]),
-            "dtend": int(event["dtend"]["N"]),
-            "summary_html": event["summary_html"]["S"],
-            "description_html": event["description_html"]["S"],
-            "location_html": event["location_html"]["S"],
-        }
-        for event in events
-    ]
+    return deserializer_for(EVENT_SCHEMA)(events)
 
 
 def invalid_request():
@@ -4,10 +4,8 @@ import json
 import logging
 from os import environ
 
-import boto3
-
-# Variable Reuse
-dynamodb = boto3.client("dynamodb", region_name=environ["REGION"])
+from thirtyone.aws import EVENT_SCHEMA, deserializer_for
+from thirtyone.clients import client, cold_start_report
 
 
 def lambda_handler(event, __):
@@ -15,6 +13,7 @@ def lambda_handler(event, __):
     configure_logging(environ.get("LOG_LEVEL", "WARNING"))
     logging.info(event)
     event_list = get_system_event_list()
+    cold_start_report()
 
     return {
         "statusCode": 200,
@@ -31,7 +30,7 @@ def get_system_event_list():
 
 def get_event_records():
     """Get event records."""
-    return dynamodb.query(
+    return client("dynamodb", region_name=environ["REGION"]).query(
         TableName=environ["DYNAMODB_TABLE"],
         IndexName="system_events",
         KeyConditionExpression="tenant = :tenant AND last_modified > :time",
@@ -55,25 +54,7 @@ def get_event_records():
 
 def format_events_from(event_list):
     """Format events from event list."""
-    formatted_event_list = []
-
-    for event in event_list:
-        formatted_event_list.append(
-            {
-                "uid": event["uid"]["S"],
-                "mailto": event["mailto"]["S"],
-                "organizer": event["organizer"]["S"],
-                "status": event["status"]["S"],
-                "created": int(event["created"]["N"]),
-                "dtstart": int(event["dtstart"]["N"]),
-                "dtend": int(event["dtend"]["N"]),
-                "summary_html": event["summary_html"]["S"],
-                "description_html": event["description_html"]["S"],
-                "location_html": event["location_html"]["S"],
-            }
-        )
-
-    return formatted_event_list
+    return deserializer_for(EVENT_SCHEMA)(event_list)
 
 
 def configure_logging(log_level=environ.get("LOG_LEVEL", "WARNING")):
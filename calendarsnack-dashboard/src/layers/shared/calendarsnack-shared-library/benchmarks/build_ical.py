@@ -0,0 +1,165 @@
+"""Benchmark per-invite cost of thirtyone.Ical.build_ical_from.
+
+Usage: python benchmarks/build_ical.py [repeat] [recipients]
+"""
+
+import logging
+import re
+import sys
+from os import path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone import Ical  # noqa: E402
+from thirtyone import ical as _ical  # noqa: E402
+
+EVENT = {
+    "description": "Quarterly planning review with notes. " * 40,
+    "dtend": "20240102T100000Z",
+    "dtstamp": "20240101T000000Z",
+    "dtstart": "20240102T090000Z",
+    "location": "https://meet.example.com/quarterly-planning",
+    "organizer": "Jane Organizer",
+    "mailto": "jane.organizer@contoso.example.com",
+    "rsvp_email": "invite@calendarsnack.com",
+    "sequence": 2,
+    "summary": "Quarterly planning",
+    "uid": "0123456789abcdef0123456789abcdef",
+}
+
+
+def legacy_build_ical_from(ical, recipient, **fields):
+    """Build an ical the way build_ical_from did before prepared icals."""
+    logging.debug("Building ical")
+    fields.setdefault("method", "REQUEST")
+    fields.setdefault("status", "CONFIRMED")
+    fields.setdefault("transp", "OPAQUE")
+
+    return (
+        "BEGIN:VCALENDAR\r\n"
+        + "PRODID:-//31Events//CalendarSnack//EN\r\n"
+        + "VERSION:2.0\r\n"
+        + "METHOD:{method}\r\n"
+        + "BEGIN:VEVENT\r\n"
+        + "{summary}\r\n"
+        + "{description}\r\n"
+        + "CLASS:PUBLIC\r\n"
+        + "DTSTART;TZID=Etc/GMT:{dtstart}\r\n"
+        + "DTEND;TZID=Etc/GMT:{dtend}\r\n"
+        + "{location}\r\n"
+        + "PRIORITY:0\r\n"
+        + "SEQUENCE:{sequence}\r\n"
+        + "STATUS:{status}\r\n"
+        + "{uid}\r\n"
+        + "DTSTAMP:{dtstamp}\r\n"
+        + "{recipient}\r\n"
+        + "{organizer}\r\n"
+        + "{mailto}\r\n"
+        + "TRANSP:{transp}\r\n"
+        + "STATUS:{status}\r\n"
+        + "X-THIRTYONE-USER-STATUS:FREE\r\n"
+        + "X-THIRTYONE-EVENT-STATUS:FREE\r\n"
+        + "BEGIN:VALARM\r\n"
+        + "ACTION:DISPLAY\r\n"
+        + "{tz_description}\r\n"
+        + "TRIGGER;RELATED=START:-PT15M\r\n"
+        + "END:VALARM\r\n"
+        + "END:VEVENT\r\n"
+        + "BEGIN:VTIMEZONE\r\n"
+        + "TZID:Etc/GMT\r\n"
+        + "TZURL:http://tzurl.org/zoneinfo/Etc/GMT\r\n"
+        + "X-LIC-LOCATION:Etc/GMT\r\n"
+        + "BEGIN:STANDARD\r\n"
+        + "TZOFFSETFROM:+0000\r\n"
+        + "TZOFFSETTO:+0000\r\n"
+        + "TZNAME:GMT\r\n"
+        + "DTSTART:16010101T000000\r\n"
+        + "RDATE:16010101T000000\r\n"
+        + "END:STANDARD\r\n"
+        + "END:VTIMEZONE\r\n"
+        + "END:VCALENDAR"
+    ).format(
+        description=ical.format_text_length(
+            "DESCRIPTION:" + fields["description"]
+        ),
+        dtend=re.sub("Z", "", fields["dtend"]),
+        dtstamp=fields["dtstamp"],
+        dtstart=re.sub("Z", "", fields["dtstart"]),
+        location=ical.format_text_length("LOCATION:" + fields["location"]),
+        mailto=ical.format_text_length("X-YAHOO-YID:" + fields["mailto"]),
+        method=fields["method"],
+        organizer=ical.format_text_length(
+            "ORGANIZER;CN="
+            + fields["organizer"]
+            + ";"
+            + 'SENT-BY="'
+            + "mailto:"
+            + fields["rsvp_email"]
+            + '":'
+            + "mailto:"
+            + fields["rsvp_email"]
+        ),
+        recipient=ical.generate_attendee_field(recipient),
+        sequence=str(fields["sequence"]),
+        status=fields["status"],
+        summary=ical.format_text_length("SUMMARY:" + fields["summary"]),
+        transp=fields["transp"],
+        tz_description=ical.format_text_length(
+            "DESCRIPTION:" + fields["summary"]
+        ),
+        uid=ical.format_text_length("UID:" + fields["uid"]),
+    )
+
+
+def best_of(statement, number, repeats):
+    """Return best time in microseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(repeats=5, size=1000):
+    """Print per-invite build time for one event sent to many recipients."""
+    ical = Ical()
+    recipients = ["attendee{}@example.com".format(row) for row in range(size)]
+
+    assert ical.build_icals_for(recipients, **EVENT) == [
+        legacy_build_ical_from(ical, recipient, **EVENT)
+        for recipient in recipients
+    ]
+
+    print("{:<24} {:>12}".format("per invite", "time"))
+
+    for label, statement in (
+        (
+            "legacy",
+            lambda: [
+                legacy_build_ical_from(ical, recipient, **EVENT)
+                for recipient in recipients
+            ],
+        ),
+        (
+            "build_ical_from",
+            lambda: [
+                ical.build_ical_from(recipient=recipient, **EVENT)
+                for recipient in recipients
+            ],
+        ),
+        (
+            "build_ical_from cold",
+            lambda: [
+                _ical.PREPARED_ICALS.clear()
+                or ical.build_ical_from(recipient=recipient, **EVENT)
+                for recipient in recipients
+            ],
+        ),
+        ("build_icals_for", lambda: ical.build_icals_for(recipients, **EVENT)),
+    ):
+        print(
+            "{:<24} {:>10.2f}us".format(
+                label, best_of(statement, 1, repeats) / size
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:3]))
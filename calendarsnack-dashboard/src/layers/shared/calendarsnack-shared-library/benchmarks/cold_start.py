@@ -0,0 +1,62 @@
+"""Benchmark cold start cost of thirtyone.aws in fresh interpreters.
+
+Usage: python benchmarks/cold_start.py [repeat]
+"""
+
+import subprocess
+import sys
+from os import environ, path
+
+SRC = path.join(path.dirname(path.abspath(__file__)), "../src")
+SERVICES = ("codecommit", "s3", "ses", "sns", "sqs")
+# What importing thirtyone.aws built before the client registry
+LEGACY = (
+    "import thirtyone\nimport boto3\n"
+    + "".join(
+        "boto3.client({!r})\n".format(service) for service in SERVICES
+    )
+)
+STATEMENTS = (
+    ("legacy import", LEGACY),
+    ("import", "import thirtyone.aws\n"),
+    (
+        "import, one client",
+        "from thirtyone import aws, clients\n"
+        + "clients.client('sns')\n"
+        + "clients.cold_start_report()\n",
+    ),
+)
+
+
+def time_statement(statement):
+    """Return wall time of statement in a fresh interpreter, in ms."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from timeit import default_timer\n"
+            + "started = default_timer()\n"
+            + statement
+            + "print((default_timer() - started) * 1e3)\n",
+        ],
+        check=True,
+        stdout=subprocess.PIPE,
+        env=dict(environ, PYTHONPATH=SRC, AWS_DEFAULT_REGION="us-west-2"),
+    )
+
+    return float(output.stdout)
+
+
+def main(repeats=5):
+    """Print cold start time of importing the layer's AWS helpers."""
+    for label, statement in STATEMENTS:
+        print(
+            "{:<20} {:>8.1f}ms".format(
+                label,
+                min(time_statement(statement) for _ in range(repeats)),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:2]))
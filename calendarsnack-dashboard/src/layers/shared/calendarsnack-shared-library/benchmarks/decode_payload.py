@@ -0,0 +1,98 @@
+"""Benchmark time and peak memory of calendar payload decoding.
+
+Usage: python benchmarks/decode_payload.py [megabytes]
+"""
+
+import sys
+import tracemalloc
+from base64 import b64decode, encodebytes
+from os import path
+from quopri import decodestring, encodestring
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone.extract import (  # noqa: E402
+    decode_base64,
+    decode_quoted_printable,
+)
+
+DESCRIPTION = (
+    "DESCRIPTION;LANGUAGE=en-US:Quarterly planning review - agenda\\, "
+    "budget\\; staffing\r\n"
+)
+
+
+def calendar_of(megabytes):
+    """Build a VCALENDAR of roughly megabytes size."""
+    repeat = int(megabytes * 1024 * 1024 / len(DESCRIPTION.encode("utf-8")))
+
+    return (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\n"
+        + DESCRIPTION * repeat
+        + "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def legacy_decode_base64(payload):
+    """Decode base64 the way decode_base64 did before streaming."""
+    return b64decode(payload).decode("utf-8-sig")
+
+
+def legacy_decode_quoted_printable(payload):
+    """Decode quoted-printable the way it was done before streaming."""
+    return decodestring(payload).decode("utf-8-sig")
+
+
+def measure(decode, payload):
+    """Return seconds and peak bytes allocated while decoding payload."""
+    tracemalloc.start()
+    start = perf_counter()
+    decoded = decode(payload)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+
+    return elapsed, peak
+
+
+def main(megabytes=4):
+    """Print decode time and peak memory, legacy versus streaming."""
+    ical = calendar_of(megabytes).encode("utf-8")
+    payloads = {
+        "base64": encodebytes(ical).decode("ascii").replace("\n", "\r\n"),
+        "quoted-printable": encodestring(ical).decode("ascii"),
+    }
+    decoders = {
+        "base64": (legacy_decode_base64, decode_base64),
+        "quoted-printable": (
+            legacy_decode_quoted_printable,
+            decode_quoted_printable,
+        ),
+    }
+
+    print(
+        "{:<18} {:>10} {:>10} {:>12} {:>12}".format(
+            "encoding", "legacy", "streaming", "legacy peak", "stream peak"
+        )
+    )
+
+    for encoding, payload in payloads.items():
+        legacy, streaming = decoders[encoding]
+        assert legacy(payload) == streaming(payload)
+        legacy_time, legacy_peak = measure(legacy, payload)
+        streaming_time, streaming_peak = measure(streaming, payload)
+        print(
+            "{:<18} {:>8.1f}ms {:>8.1f}ms {:>10.1f}MB {:>10.1f}MB".format(
+                encoding,
+                legacy_time * 1000,
+                streaming_time * 1000,
+                legacy_peak / 1024 / 1024,
+                streaming_peak / 1024 / 1024,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 4)
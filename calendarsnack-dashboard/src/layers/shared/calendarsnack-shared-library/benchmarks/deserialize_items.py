@@ -0,0 +1,103 @@
+"""Benchmark deserializing DynamoDB Items pages with thirtyone.aws.
+
+Usage: python benchmarks/deserialize_items.py [repeat] [page size]
+"""
+
+import sys
+from os import environ, path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+
+from thirtyone.aws import EVENT_SCHEMA, deserializer_for  # noqa: E402
+
+
+def legacy_format_events(events):
+    """Format events the way the event listing functions did by hand."""
+    return [
+        {
+            "uid": event["uid"]["S"],
+            "mailto": event["mailto"]["S"],
+            "organizer": event["organizer"]["S"],
+            "status": event["status"]["S"],
+            "created": int(event["created"]["N"]),
+            "dtstart": int(event["dtstart"]["N"]),
+            "dtend": int(event["dtend"]["N"]),
+            "summary_html": event["summary_html"]["S"],
+            "description_html": event["description_html"]["S"],
+            "location_html": event["location_html"]["S"],
+        }
+        for event in events
+    ]
+
+
+def build_page(size):
+    """Build an Items page of size events."""
+    return [
+        {
+            "uid": {"S": "{:040x}".format(row)},
+            "mailto": {"S": "organizer{}@example.com".format(row)},
+            "organizer": {"S": "Organizer {}".format(row)},
+            "status": {"S": "CONFIRMED"},
+            "created": {"N": str(1704067200 + row)},
+            "dtstart": {"N": str(1704153600 + row)},
+            "dtend": {"N": str(1704157200 + row)},
+            "summary_html": {"S": "Event {}".format(row)},
+            "description_html": {"S": "Details<br>of event {}".format(row)},
+            "location_html": {"S": "Room {}".format(row % 10)},
+        }
+        for row in range(size)
+    ]
+
+
+def best_of(statement, number, repeats):
+    """Return best time per call in microseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(repeats=5, page_size=1000):
+    """Print per-page deserialize time."""
+    page = build_page(page_size)
+    events = deserializer_for(EVENT_SCHEMA)
+    rows = deserializer_for(EVENT_SCHEMA, tuples=True)
+    untyped = deserializer_for(list(EVENT_SCHEMA))
+
+    assert events(page) == legacy_format_events(page) == untyped(page)
+    assert [tuple(event.values()) for event in events(page)] == rows(page)
+
+    statements = [
+        ("legacy", lambda: legacy_format_events(page)),
+        ("schema dicts", lambda: events(page)),
+        ("schema tuples", lambda: rows(page)),
+        ("projection dicts", lambda: untyped(page)),
+    ]
+
+    try:
+        from boto3.dynamodb.types import TypeDeserializer
+    except ImportError:
+        pass
+    else:
+        deserialize = TypeDeserializer().deserialize
+        statements.append(
+            (
+                "boto3",
+                lambda: [
+                    {key: deserialize(value) for key, value in item.items()}
+                    for item in page
+                ],
+            )
+        )
+
+    print("{:<20} {:>12}".format("page", "time"))
+
+    for label, statement in statements:
+        print(
+            "{:<20} {:>10.2f}ms".format(
+                label, best_of(statement, 20, repeats) / 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:3]))
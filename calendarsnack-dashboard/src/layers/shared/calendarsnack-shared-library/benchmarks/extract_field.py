@@ -0,0 +1,102 @@
+"""Benchmark per-email parse time of thirtyone.extract.
+
+Usage: python benchmarks/extract_field.py [repeat]
+"""
+
+import logging
+import re
+import sys
+from os import path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone import Ical  # noqa: E402
+from thirtyone.extract import (  # noqa: E402
+    EXTRACTIONS,
+    extract_field,
+    extract_ical_from,
+    walk_mime,
+)
+
+CORPUS = path.join(path.dirname(path.abspath(__file__)), "corpus")
+EMAILS = (
+    "google_reply.eml",
+    "google_request.eml",
+    "outlook_desktop_cancel.eml",
+    "outlook_desktop_request.eml",
+)
+FIELDS = (
+    "description",
+    "dtend",
+    "dtstart",
+    "location",
+    "org_mailto",
+    "original_uid",
+    "prodid",
+    "summary",
+    "tzid",
+)
+
+
+def read_corpus_email(name):
+    """Read raw email from corpus."""
+    with open(path.join(CORPUS, name), encoding="utf8", newline="") as email:
+        return email.read()
+
+
+def legacy_extract_field(field, data):
+    """Extract field the way extract_field did before the registry."""
+    logging.debug(
+        "Extracting {field} from: {data}".format(
+            field=field, data=str(data)[:78]
+        )
+    )
+    result = {}
+    extractions = dict(EXTRACTIONS)
+
+    for regex in extractions[field]:
+        extracted = re.search(regex, data)
+
+        if extracted:
+            result = extracted.groupdict()
+            break
+
+    return result
+
+
+def best_of(statement, number, repeats):
+    """Return best time per call in microseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(repeats=5):
+    """Print per-email parse time and per-field extraction time."""
+    print("{:<32} {:>12}".format("email", "read_ical_from"))
+
+    for name in EMAILS:
+        email = read_corpus_email(name)
+        timing = best_of(
+            lambda: Ical().read_ical_from(email, uid="benchmark"), 200, repeats
+        )
+        print("{:<32} {:>10.1f}us".format(name, timing))
+
+    email = read_corpus_email("outlook_desktop_request.eml")
+    payload = extract_ical_from(walk_mime(email))
+
+    print("\n{:<16} {:>12} {:>12}".format("field", "legacy", "registry"))
+
+    for field in FIELDS:
+        legacy = best_of(
+            lambda: legacy_extract_field(field, payload), 2000, repeats
+        )
+        registry = best_of(
+            lambda: extract_field(field, payload), 2000, repeats
+        )
+        print(
+            "{:<16} {:>10.2f}us {:>10.2f}us".format(field, legacy, registry)
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
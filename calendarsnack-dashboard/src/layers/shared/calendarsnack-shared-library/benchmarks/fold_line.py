@@ -0,0 +1,80 @@
+"""Benchmark content line folding of thirtyone.ical.
+
+Usage: python benchmarks/fold_line.py [repeat]
+"""
+
+import sys
+from os import path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone.ical import fold_into, fold_line  # noqa: E402
+
+# Description lengths in characters, up to an Outlook HTML import
+SIZES = (1000, 16000, 256000)
+TEXTS = {
+    "ascii": "Quarterly planning review, agenda and notes. ",
+    "emoji": "Planning \U0001f4c5 review — café notes \U0001f389 ",
+}
+
+
+def legacy_fold_line(text):
+    """Fold text the way format_text_length did before octet folding."""
+    line_boundary = 70
+    visible_character_length = line_boundary - 5
+    visible_character_boundary = line_boundary - 4
+    final_text = ""
+
+    if len(text) <= line_boundary:
+        final_text = text
+    else:
+        final_text = "{initial_text}\r\n".format(
+            initial_text=text[:visible_character_length]
+        )
+        text = text[visible_character_length:]
+
+        while len(text) / visible_character_boundary > 1:
+            final_text += " {append_text}\r\n".format(
+                append_text=text[:visible_character_boundary]
+            )
+            text = text[visible_character_boundary:]
+        final_text += " {append_text}".format(append_text=text[0:])
+
+    return final_text
+
+
+def best_of(statement, number, repeats):
+    """Return best time per call in milliseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e3
+
+
+def main(repeats=5):
+    """Print folding time of long descriptions per size and alphabet."""
+    print(
+        "{:<16} {:>12} {:>12} {:>12}".format(
+            "description", "legacy", "fold_line", "fold_into"
+        )
+    )
+
+    for name, words in sorted(TEXTS.items()):
+        for size in SIZES:
+            text = "DESCRIPTION:" + (words * (size // len(words) + 1))[:size]
+
+            if name == "ascii":
+                assert fold_line(text) == legacy_fold_line(text)
+
+            print(
+                "{:<16} {:>10.2f}ms {:>10.2f}ms {:>10.2f}ms".format(
+                    "{} {}".format(name, size),
+                    best_of(lambda: legacy_fold_line(text), 1, repeats),
+                    best_of(lambda: fold_line(text), 1, repeats),
+                    best_of(
+                        lambda: fold_into(bytearray(), text), 1, repeats
+                    ),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:2]))
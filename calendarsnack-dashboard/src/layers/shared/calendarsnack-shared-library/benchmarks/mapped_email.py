@@ -0,0 +1,99 @@
+"""Benchmark peak memory of reading an oversized email as str versus mmap.
+
+Usage: python benchmarks/mapped_email.py [megabytes]
+"""
+
+import mmap
+import sys
+import tracemalloc
+from os import path
+from tempfile import TemporaryFile
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone import Ical  # noqa: E402
+from thirtyone.ical import PARSE_TIMESTAMPS  # noqa: E402
+
+CORPUS = path.join(path.dirname(path.abspath(__file__)), "corpus")
+ATTACHMENT_LINE = (
+    b"JVBERi0xLjQKJcfsj6IKNSAwIG9iago8PC9MZW5ndGggNiAwIFIvRmlsdGVy\n"
+)
+
+
+def email_with_attachment(megabytes):
+    """Insert a base64 attachment of roughly megabytes into a corpus email."""
+    with open(path.join(CORPUS, "google_request.eml"), "rb") as email:
+        email = email.read()
+
+    start = email.find(b"\n--") + 1
+    boundary = email[start : email.find(b"\n", start)]
+    repeat = int(megabytes * 1024 * 1024 / len(ATTACHMENT_LINE))
+
+    return email.replace(
+        boundary,
+        boundary
+        + b"\nContent-Type: application/pdf\n"
+        + b"Content-Transfer-Encoding: base64\n\n"
+        + ATTACHMENT_LINE * repeat
+        + boundary,
+        1,
+    )
+
+
+def read_as_str(spool):
+    """Read the spooled email the way get_s3_file_content_from does."""
+    spool.seek(0)
+
+    return Ical().read_ical_from(
+        spool.read().decode("utf-8-sig"), uid="benchmark"
+    )
+
+
+def read_as_mmap(spool):
+    """Read the spooled email through a read-only mmap."""
+    with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as email:
+        return Ical().read_ical_from(email, uid="benchmark")
+
+
+def measure(read, spool):
+    """Return result, seconds and peak bytes allocated while reading."""
+    tracemalloc.start()
+    start = perf_counter()
+    result = read(spool)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def main(megabytes=16):
+    """Print parse time and peak memory for str and mmap reads."""
+    print("{:<8} {:>10} {:>12}".format("read", "time", "peak"))
+
+    with TemporaryFile() as spool:
+        spool.write(email_with_attachment(megabytes))
+        spool.flush()
+        results = []
+
+        for name, read in (("str", read_as_str), ("mmap", read_as_mmap)):
+            result, elapsed, peak = measure(read, spool)
+            results.append(
+                {
+                    field: value
+                    for field, value in result.items()
+                    if field not in PARSE_TIMESTAMPS
+                }
+            )
+            print(
+                "{:<8} {:>8.1f}ms {:>10.2f}MB".format(
+                    name, elapsed * 1000, peak / 1024 / 1024
+                )
+            )
+
+        assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 16)
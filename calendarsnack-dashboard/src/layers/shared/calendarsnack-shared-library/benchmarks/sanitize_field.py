@@ -0,0 +1,238 @@
+"""Benchmark per-field cost of thirtyone.sanitize.
+
+Usage: python benchmarks/sanitize_field.py [repeat] [roster size]
+"""
+
+import logging
+import re
+import sys
+from os import path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone.sanitize import SANITIZE_PIPELINES  # noqa: E402
+from thirtyone.sanitize import (  # noqa: E402
+    mask_many,
+    sanitize_field,
+    sanitize_many,
+)
+from thirtyone.tokenizer import tokenize  # noqa: E402
+
+CORPUS = path.join(path.dirname(path.abspath(__file__)), "corpus")
+# Content line each field is sanitized from, or a literal raw value
+INPUTS = {
+    "attendee": "ATTENDEE",
+    "description": "DESCRIPTION",
+    "dtend": "20240102",
+    "dtstart": "20240102",
+    "html": "DESCRIPTION",
+    "location": "LOCATION",
+    "mailto": "prvs=1234abcd=jane.organizer@contoso.example\r\n .com",
+    "name": "Organizer\\, Jane jane@contoso.example.com",
+    "org_mailto": "ORGANIZER",
+    "organizer": "ORGANIZER",
+    "original_uid": "UID",
+    "outlook_desktop": "DESCRIPTION",
+    "partstat": "ACCEPTED",
+    "return_path": "Jane <prvs=1234abcd=jane@contoso.example.com>",
+    "summary": "SUMMARY",
+}
+
+
+def legacy_sanitize_field(field, data):
+    """Sanitize field the way sanitize_field did before compiled pipelines."""
+    logging.debug("Sanitizing {}".format(field))
+    result = {field: data}
+    sanitize_regex_for = {
+        "attendee": ((r"(?s)(\r)?\n( |\t)", ""),),
+        "description": (
+            (r"(?s)(\r)?\n( |\t)", ""),
+            (r"(?s)((\\+\s*n\s*){1,}-\s*\\\s*n)?(\s*-)?\s*:\s*:\s*~.*$", ""),
+            (r"&nbsp(\\)?;", " "),
+            (r"&amp(\\)?;", "&"),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+            (r"(?s)((\\r)?\\n|\s){1,}$", ""),
+        ),
+        "dtend": ((r"^(\d{8})$", "\\1T000000Z"),),
+        "dtstart": ((r"^(\d{8})$", "\\1T000000Z"),),
+        "html": (
+            (r"(?s)(\r)?\n( |\t)", ""),
+            (r"(\\){1,}n", "<br>"),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+        ),
+        "location": (
+            (r"(?s)(\r)?\n( |\t)", ""),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+        ),
+        "mailto": ((r"(?s)(\r)?\n( |\t)", ""), (r"prvs=[^=\s@]+=", "")),
+        "name": (
+            (r"\s*([^@]*)@(([\w\-\=]*\.){1,}(\w+))\s*", "\\1[at]\\2"),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+        ),
+        "organizer": (
+            (r"(?s)(\r)?\n( |\t)", ""),
+            (r"\s*([^@]*)@(([\w\-\=]*\.){1,}(\w+))\s*", "\\1[at]\\2"),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+            (r"prvs=[^=\s@]+=", ""),
+        ),
+        "org_mailto": ((r"(?s)(\r)?\n( |\t)", ""), (r"prvs=[^=\s@]+=", "")),
+        "original_uid": ((r"(?s)(\r)?\n( |\t)", ""),),
+        "outlook_desktop": (
+            (r"(?<!<\\\\n>)(\\\\n\\\\n)(?!\\\\n)", "\\\\\\\\n"),
+            (r"(?<!<br>)(<br><br>)(?!<br>)", "<br>"),
+        ),
+        "partstat": ((r"(?s)(\r)?\n( |\t)", ""),),
+        "return_path": ((r"^.*<([^\>])", "\\1"), (r"prvs=[^=\s@]+=", "")),
+        "summary": (
+            (r"(?s)(\r)?\n( |\t)", ""),
+            (r"(\\){1,},", ","),
+            (r"(\\){1,};", ";"),
+            (r"(?s)((\\r)?\\n|\s){1,}$", ""),
+        ),
+    }
+
+    if result[field] and sanitize_regex_for.get(field, None):
+        for index, regex in enumerate(sanitize_regex_for[field]):
+            result[field] = re.sub(regex[0], regex[1], result[field])
+            logging.debug(
+                "Value: {value}\nRegex: {regex}".format(
+                    value=result[field],
+                    regex={"index": str(index), "regex": regex},
+                )
+            )
+
+    return result
+
+
+def legacy_mask_email(email):
+    """Mask an email the way the sanitized list endpoint did per row."""
+    sender, domain = email.split("@")
+
+    return "{sender}@{domain}".format(
+        sender=sender[0] + ("*" * 7), domain=domain
+    )
+
+
+def legacy_mask_name(name):
+    """Mask a name the way the sanitized list endpoint did per row."""
+    return name[0] + ("*" * 7)
+
+
+def build_roster(size):
+    """Build organizer, name and email columns of a large roster."""
+    organizers = [
+        "Organizer {0}\\, Team prvs=ab{0}=user{0}@ex\r\n ample.com".format(
+            row
+        )
+        for row in range(size)
+    ]
+    names = ["Attendee {}".format(row) for row in range(size)]
+    emails = ["attendee{}@example.com".format(row) for row in range(size)]
+
+    return organizers, names, emails
+
+
+def read_content_lines(name):
+    """Read the first value of each content line in a corpus email."""
+    with open(path.join(CORPUS, name), encoding="utf8", newline="") as email:
+        content_lines = {}
+
+        for content_line in tokenize(email.read()):
+            content_lines.setdefault(content_line.name, content_line.value)
+
+        return content_lines
+
+
+def best_of(statement, number, repeats):
+    """Return best time per call in microseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(repeats=5, roster_size=10000):
+    """Print per-field and per-roster sanitize time."""
+    content_lines = read_content_lines("outlook_desktop_request.eml")
+    print(
+        "{:<16} {:>12} {:>12} {:>12}".format(
+            "field", "legacy", "compiled", "unfolded"
+        )
+    )
+
+    for field in sorted(SANITIZE_PIPELINES):
+        data = content_lines.get(INPUTS[field], INPUTS[field])
+
+        assert legacy_sanitize_field(field, data) == sanitize_field(
+            field, data
+        )
+
+        legacy = best_of(
+            lambda: legacy_sanitize_field(field, data), 2000, repeats
+        )
+        compiled = best_of(lambda: sanitize_field(field, data), 2000, repeats)
+        unfolded = best_of(
+            lambda: sanitize_field(field, data, unfolded=True), 2000, repeats
+        )
+        print(
+            "{:<16} {:>10.2f}us {:>10.2f}us {:>10.2f}us".format(
+                field, legacy, compiled, unfolded
+            )
+        )
+
+    organizers, names, emails = build_roster(roster_size)
+
+    assert sanitize_many("organizer", organizers) == [
+        legacy_sanitize_field("organizer", organizer)["organizer"]
+        for organizer in organizers
+    ]
+    assert mask_many(emails, emails=True) == [
+        legacy_mask_email(email) for email in emails
+    ]
+
+    print("\n{:<16} {:>12} {:>12}".format("roster", "per value", "batched"))
+
+    for column, data, per_value, batched in (
+        (
+            "description",
+            organizers,
+            lambda: [
+                legacy_sanitize_field("description", value) for value in data
+            ],
+            lambda: sanitize_many("description", data),
+        ),
+        (
+            "organizer",
+            organizers,
+            lambda: [
+                legacy_sanitize_field("organizer", value) for value in data
+            ],
+            lambda: sanitize_many("organizer", data),
+        ),
+        (
+            "masked emails",
+            emails,
+            lambda: [legacy_mask_email(value) for value in emails],
+            lambda: mask_many(emails, emails=True),
+        ),
+        (
+            "masked names",
+            names,
+            lambda: [legacy_mask_name(value) for value in names],
+            lambda: mask_many(names),
+        ),
+    ):
+        print(
+            "{:<16} {:>10.2f}ms {:>10.2f}ms".format(
+                column,
+                best_of(per_value, 1, repeats) / 1000,
+                best_of(batched, 1, repeats) / 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:3]))
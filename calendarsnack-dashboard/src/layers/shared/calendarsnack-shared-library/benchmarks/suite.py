@@ -0,0 +1,330 @@
+"""Benchmark the thirtyone hot paths against a stored baseline.
+
+Usage: python benchmarks/suite.py [--save] [--tolerance 0.5] [--filter name]
+
+Each case reports throughput in calls per second and the peak memory one
+call allocates. Timings are compared as a cost relative to a calibration
+loop timed next to each case, so a baseline recorded on one machine still
+holds on a busier or faster one. The run fails when a case is slower or
+allocates more than benchmarks/baseline.json allows; --save records the
+current run instead.
+"""
+
+import argparse
+import json
+import re
+import sys
+import tracemalloc
+from os import path
+from statistics import median
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone import Ical  # noqa: E402
+from thirtyone.extract import (  # noqa: E402
+    EXTRACTIONS,
+    extract_field,
+    extract_ical_from,
+    walk_mime,
+)
+from thirtyone.sanitize import sanitize_field  # noqa: E402
+from thirtyone.timezone import convert_time_to_utc  # noqa: E402
+
+BENCHMARKS = path.dirname(path.abspath(__file__))
+BASELINE = path.join(BENCHMARKS, "baseline.json")
+CORPUS = path.join(BENCHMARKS, "corpus")
+EMAILS = (
+    "apple_request.eml",
+    "google_reply.eml",
+    "google_request.eml",
+    "outlook_desktop_cancel.eml",
+    "outlook_desktop_request.eml",
+    "outlook_desktop_tnef.eml",
+    "outlook_shared_calendar.eml",
+    "outlook_web_request.eml",
+    "yahoo_request.eml",
+    "zoom_request.eml",
+)
+# Shared calendars download their feed, so only their extraction is timed
+OFFLINE_EMAILS = tuple(
+    name for name in EMAILS if name != "outlook_shared_calendar.eml"
+)
+# Fields extracted from the raw email rather than the calendar payload,
+# with the corpus email that exercises them
+EMAIL_FIELDS = {
+    "encoding": "outlook_desktop_request.eml",
+    "ical_header": "outlook_desktop_request.eml",
+    "ical_payload": "outlook_desktop_request.eml",
+    "ical_url": "outlook_shared_calendar.eml",
+    "return_path": "outlook_desktop_request.eml",
+}
+# Fields extracted from a calendar payload other than the default one
+PAYLOAD_FIELDS = {
+    "google_meet": "google_request.eml",
+    "mailto_rsvp": "google_reply.eml",
+    "name": "google_reply.eml",
+    "partstat": "google_reply.eml",
+}
+SANITIZE_FIELDS = (
+    "description",
+    "dtstart",
+    "html",
+    "location",
+    "mailto",
+    "name",
+    "organizer",
+    "outlook_desktop",
+    "return_path",
+    "summary",
+)
+# Wall-clock time and timezone label pairs as clients send them
+TIMES = (
+    ("20240102T090000", "Pacific Standard Time"),
+    ("20240310T023000", "America/New_York"),
+    ("20241027T023000", "W. Europe Standard Time"),
+)
+CALIBRATION_TEXT = "DTSTART;TZID=Etc/GMT:20240102T090000\r\n" * 16
+# Slack allowed for peak memory on top of the relative tolerance, in bytes
+PEAK_SLACK = 1024
+
+
+def read_corpus_email(name):
+    """Read raw email from corpus."""
+    with open(path.join(CORPUS, name), encoding="utf8", newline="") as email:
+        return email.read()
+
+
+def build_cases():
+    """Return (name, function) pairs for every benchmarked call."""
+    emails = {name: read_corpus_email(name) for name in EMAILS}
+    payloads = {
+        name: extract_ical_from(walk_mime(email))
+        for name, email in emails.items()
+    }
+    cases = []
+
+    for name in OFFLINE_EMAILS:
+        email = emails[name]
+        cases.append(
+            (
+                "read_ical_from/" + name,
+                lambda email=email: Ical().read_ical_from(
+                    email, uid="benchmark"
+                ),
+            )
+        )
+
+    for field in sorted(EXTRACTIONS):
+        if field in EMAIL_FIELDS:
+            data = emails[EMAIL_FIELDS[field]]
+        else:
+            data = payloads[
+                PAYLOAD_FIELDS.get(field, "outlook_desktop_request.eml")
+            ]
+
+        cases.append(
+            (
+                "extract_field/" + field,
+                lambda field=field, data=data: extract_field(field, data),
+            )
+        )
+
+    for field in SANITIZE_FIELDS:
+        data = sanitize_input_for(field, payloads)
+        cases.append(
+            (
+                "sanitize_field/" + field,
+                lambda field=field, data=data: sanitize_field(field, data),
+            )
+        )
+
+    for time, timezone in TIMES:
+        cases.append(
+            (
+                "convert_time_to_utc/" + timezone,
+                lambda time=time, timezone=timezone: convert_time_to_utc(
+                    {"dtstart": time, "dtend": time}, timezone
+                ),
+            )
+        )
+
+    cases.append(("build_ical_from", build_sample_ical))
+
+    return cases
+
+
+def sanitize_input_for(field, payloads):
+    """Return a raw extracted value sanitize_field receives for field."""
+    if field in ("html", "outlook_desktop"):
+        field = "description"
+
+    if field == "mailto":
+        return "prvs=1234abcd=jane.organizer@contoso.example\r\n .com"
+
+    if field == "return_path":
+        return "Jane Organizer <prvs=1234abcd=jane@contoso.example.com>"
+
+    for payload in payloads.values():
+        if payload and extract_field(field, payload).get(field, None):
+            return extract_field(field, payload)[field]
+
+    raise LookupError("No corpus email carries " + field)
+
+
+def build_sample_ical():
+    """Build a REQUEST ical like the invite API does."""
+    return Ical().build_ical_from(
+        description="Quarterly planning review. " * 8,
+        dtend="20240102T100000Z",
+        dtstamp="20240101T000000Z",
+        dtstart="20240102T090000Z",
+        location="https://meet.example.com/quarterly-planning",
+        organizer="Jane Organizer",
+        mailto="jane.organizer@contoso.example.com",
+        recipient="attendee@example.com",
+        rsvp_email="invite@calendarsnack.com",
+        summary="Quarterly planning",
+        uid="0123456789abcdef0123456789abcdef",
+    )
+
+
+def calibration():
+    """Fixed regex and string workload timings are expressed against."""
+    for line in CALIBRATION_TEXT.split("\r\n"):
+        re.search(r"^(\w+)(;[^:]+)?:(\d{8}T\d{6})$", line)
+        line.lower().replace("t", " ")
+
+
+def seconds_per_call(function, repeats):
+    """Return the best time per call in seconds."""
+    number = 1
+    elapsed = min(repeat(function, number=number, repeat=1))
+
+    while elapsed < 0.02:
+        number *= 10
+        elapsed = min(repeat(function, number=number, repeat=1))
+
+    return min(repeat(function, number=number, repeat=repeats)) / number
+
+
+def measure(function, repeats):
+    """Return throughput, relative cost and the peak bytes of one call."""
+    function()
+    elapsed = float("inf")
+    relative_costs = []
+
+    # Interleave case and calibration so both see the same machine load
+    for _ in range(repeats):
+        case = seconds_per_call(function, 1)
+        relative_costs.append(case / seconds_per_call(calibration, 1))
+        elapsed = min(elapsed, case)
+
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls_per_second": 1 / elapsed,
+        "relative_cost": median(relative_costs),
+        "peak_bytes": peak,
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return messages for cases that regressed against baseline."""
+    regressions = []
+
+    for name, result in results.items():
+        expected = baseline.get(name, None)
+
+        if expected is None:
+            continue
+
+        if result["relative_cost"] > expected["relative_cost"] * (
+            1 + tolerance
+        ):
+            regressions.append(
+                "{}: relative cost {:.2f}, baseline {:.2f}".format(
+                    name, result["relative_cost"], expected["relative_cost"]
+                )
+            )
+
+        if (
+            result["peak_bytes"]
+            > expected["peak_bytes"] * (1 + tolerance) + PEAK_SLACK
+        ):
+            regressions.append(
+                "{}: {} bytes peak, baseline {} bytes".format(
+                    name, result["peak_bytes"], expected["peak_bytes"]
+                )
+            )
+
+    return regressions
+
+
+def main(arguments=None):
+    """Run the suite; return 1 when a case regressed, else 0."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--save", action="store_true", help="store results as baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed relative slowdown or memory growth",
+    )
+    parser.add_argument(
+        "--filter", default="", help="only run cases containing this text"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args(arguments)
+
+    baseline = {}
+
+    if path.exists(BASELINE):
+        with open(BASELINE, encoding="utf8") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = {}
+    print(
+        "{:<44} {:>10} {:>9} {:>9}".format(
+            "case", "calls/s", "relative", "peak KiB"
+        )
+    )
+
+    for name, function in build_cases():
+        if arguments.filter not in name:
+            continue
+
+        results[name] = measure(function, arguments.repeat)
+        print(
+            "{:<44} {:>10.0f} {:>9.2f} {:>9.1f}".format(
+                name,
+                results[name]["calls_per_second"],
+                results[name]["relative_cost"],
+                results[name]["peak_bytes"] / 1024,
+            )
+        )
+
+    if arguments.save:
+        baseline.update(results)
+
+        with open(BASELINE, "w", encoding="utf8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+        return 0
+
+    regressions = find_regressions(results, baseline, arguments.tolerance)
+
+    for regression in regressions:
+        print("REGRESSION " + regression)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
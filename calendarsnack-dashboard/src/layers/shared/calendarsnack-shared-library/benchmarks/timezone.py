@@ -0,0 +1,118 @@
+"""Benchmark local to UTC conversion of thirtyone.timezone per hot zone.
+
+Usage: python benchmarks/timezone.py [repeat] [batch size]
+"""
+
+import sys
+from datetime import datetime, timedelta
+from os import path
+from timeit import default_timer, repeat
+
+import pytz
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "../src"))
+
+from thirtyone import timezone  # noqa: E402
+from thirtyone.timezone import (  # noqa: E402
+    HOT_TIMEZONES,
+    WINDOWS_TIMEZONES,
+    convert_many_to_utc,
+    convert_to_utc,
+)
+
+# Wall-clock times every 61 hours through a year, so each zone is timed
+# across its daylight saving transitions
+TIMES = tuple(
+    (datetime(2024, 1, 1) + timedelta(hours=61 * step)).strftime(
+        "%Y%m%dT%H%M%S"
+    )
+    for step in range(144)
+)
+
+
+def legacy_convert_to_utc(time, _timezone):
+    """Convert time the way convert_to_utc did before resolved zones."""
+    timezones = dict(WINDOWS_TIMEZONES)
+    _time = datetime.strptime(time, "%Y%m%dT%H%M%S")
+    _timezone = pytz.timezone(timezones.get(_timezone, _timezone))
+    utc_time = _timezone.localize(_time, is_dst=True).astimezone(pytz.utc)
+
+    return utc_time.strftime("%Y%m%dT%H%M%SZ")
+
+
+def best_of(statement, number, repeats):
+    """Return best time per call in microseconds."""
+    return min(repeat(statement, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(repeats=5, batch_size=10000):
+    """Print per-zone and per-batch conversion time."""
+    print(
+        "{:<20} {:>10} {:>10} {:>10}".format(
+            "timezone", "first", "legacy", "resolved"
+        )
+    )
+
+    for name in HOT_TIMEZONES:
+        timezone.RESOLVED_TIMEZONES.pop(name, None)
+        started = default_timer()
+        timezone.resolve_timezone(name)
+        first = (default_timer() - started) * 1e6
+
+        for time in TIMES:
+            assert convert_to_utc(time, name) == legacy_convert_to_utc(
+                time, name
+            )
+
+        legacy = best_of(
+            lambda: [legacy_convert_to_utc(time, name) for time in TIMES],
+            10,
+            repeats,
+        )
+        resolved = best_of(
+            lambda: [convert_to_utc(time, name) for time in TIMES],
+            10,
+            repeats,
+        )
+        print(
+            "{:<20} {:>8.0f}us {:>8.2f}us {:>8.2f}us".format(
+                name, first, legacy / len(TIMES), resolved / len(TIMES)
+            )
+        )
+
+    batch = [TIMES[index % len(TIMES)] for index in range(batch_size)]
+
+    assert convert_many_to_utc(batch, "Eastern Standard Time") == [
+        convert_to_utc(time, "Eastern Standard Time") for time in batch
+    ]
+
+    print("\n{:<20} {:>10}".format("batch", "total"))
+
+    for label, statement in (
+        (
+            "per value",
+            lambda: [
+                convert_to_utc(time, "Eastern Standard Time")
+                for time in batch
+            ],
+        ),
+        (
+            "strings",
+            lambda: convert_many_to_utc(batch, "Eastern Standard Time"),
+        ),
+        (
+            "epoch",
+            lambda: convert_many_to_utc(
+                batch, "Eastern Standard Time", epoch=True
+            ),
+        ),
+    ):
+        print(
+            "{:<20} {:>8.2f}ms".format(
+                label, best_of(statement, 1, repeats) / 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:3]))
@@ -1 +1,3 @@
-from thirtyone.ical import Ical
+from thirtyone.extract import ExtractionTimeout
+from thirtyone.fetch import FetchError
+from thirtyone.ical import Ical, ParseCache
@@ -1,23 +1,113 @@
 import base64
 import json
+import mmap
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from os import environ
+from random import uniform
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from time import monotonic, sleep
+
+from thirtyone.clients import client
+
+S3_SPOOL_CHUNK_SIZE = 1024 * 1024
+# BatchGetItem accepts up to 100 keys per call
+BATCH_GET_SIZE = 100
+BATCH_GET_WORKERS = 8
+BATCH_GET_ATTEMPTS = 8
+# Seconds of the first UnprocessedKeys backoff, doubling up to the maximum
+BATCH_GET_BACKOFF = 0.05
+BATCH_GET_MAX_BACKOFF = 2.0
+# Expressions reading an attribute of each DynamoDB type, and any type
+TYPED_VALUES = {
+    "S": "{}['S']",
+    "N": "int({}['N'])",
+    "BOOL": "{}['BOOL']",
+    "NULL": "{}['NULL'] and None",
+    "L": "[deserialize_value(element) for element in {}['L']]",
+    "M": "deserialize_item({}['M'])",
+    None: "deserialize_value({})",
+}
+# Generated Items converters by schema
+DESERIALIZERS = {}
+# DynamoDB types of the event attributes the event listings return
+EVENT_SCHEMA = {
+    "uid": "S",
+    "mailto": "S",
+    "organizer": "S",
+    "status": "S",
+    "created": "N",
+    "dtstart": "N",
+    "dtend": "N",
+    "summary_html": "S",
+    "description_html": "S",
+    "location_html": "S",
+}
+SES_SEND_WORKERS = int(environ.get("SES_SEND_WORKERS", 8))
+SES_SEND_ATTEMPTS = 5
+# Seconds of the first throttling backoff, doubling up to the maximum
+SES_SEND_BACKOFF = 0.5
+SES_SEND_MAX_BACKOFF = 8.0
+SES_THROTTLING_CODES = (
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+)
+
+SentInvite = namedtuple("SentInvite", ("recipient", "message_id", "error"))
+
+
+class BatchGetError(Exception):
+    """BatchGetItem left keys unprocessed after every retry."""
+
+
+class TokenBucket:
+    """Paces callers to rate acquisitions per second.
+
+    Tokens refill continuously up to capacity; callers finding none wait
+    for the token reserved for them, so concurrent callers stay in step.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a token, waiting until it is due."""
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait_seconds = -self.tokens / self.rate
 
-import boto3
+        if wait_seconds > 0:
+            sleep(wait_seconds)
 
 
 # CodeCommit
 def get_codecommit_file_for(
-    path, repository=None,
-    codecommit=boto3.client("codecommit"), s3_prefix="s3://"
+    path, repository=None, codecommit=None, s3_prefix="s3://"
 ):
     if repository.startswith(s3_prefix):
         file_content = get_s3_file_content_from(
-            bucket=repository.replace(s3_prefix, ""), key=path, s3=boto3.client("s3")
+            bucket=repository.replace(s3_prefix, ""), key=path
         )
 
     else:
+        if codecommit is None:
+            codecommit = client("codecommit")
+
         file = codecommit.get_file(repositoryName=repository, filePath=path)
         file_content = file["fileContent"].decode("utf-8-sig")
 
@@ -40,26 +130,212 @@ def get_dynamodb_record_for(
         ReturnConsumedCapacity="NONE",
     ).get("Item", {})
 
-    formatted_record = {}
+    return deserialize_item(dynamodb_record)
+
+
+def get_dynamodb_records_for(keys, dynamodb=None, dynamodb_table=None):
+    """Gets the records of many keys with concurrent BatchGetItem calls.
+
+    keys are primary keys, whose secondary key defaults to the primary key
+    as in get_dynamodb_record_for, or (primary, secondary) pairs. Records
+    are deserialized and returned in key order, {} where none exists.
+    """
+    if dynamodb is None:
+        dynamodb = client("dynamodb")
+
+    pairs = [
+        (key, key) if isinstance(key, str) else tuple(key) for key in keys
+    ]
+    # BatchGetItem rejects requests holding the same key twice
+    unique = list(dict.fromkeys(pairs))
+    chunks = [
+        unique[start : start + BATCH_GET_SIZE]
+        for start in range(0, len(unique), BATCH_GET_SIZE)
+    ]
+    records = {}
+
+    if chunks:
+        with ThreadPoolExecutor(
+            max_workers=min(len(chunks), BATCH_GET_WORKERS)
+        ) as executor:
+            for items in executor.map(
+                lambda chunk: batch_get_items(chunk, dynamodb, dynamodb_table),
+                chunks,
+            ):
+                for item in items:
+                    records[(item["pk"]["S"], item["sk"]["S"])] = item
+
+    return [deserialize_item(records.get(pair, {})) for pair in pairs]
+
+
+def batch_get_items(pairs, dynamodb, dynamodb_table):
+    """Gets items of up to BATCH_GET_SIZE keys, retrying unprocessed keys.
+
+    Raises BatchGetError when keys are still unprocessed after
+    BATCH_GET_ATTEMPTS calls.
+    """
+    request = {
+        dynamodb_table: {
+            "Keys": [
+                {"pk": {"S": primary_key}, "sk": {"S": secondary_key}}
+                for primary_key, secondary_key in pairs
+            ]
+        }
+    }
+    items = []
+
+    for attempt in range(BATCH_GET_ATTEMPTS):
+        if attempt:
+            # Full jitter keeps concurrent chunks from retrying in step
+            backoff = BATCH_GET_BACKOFF * 2 ** (attempt - 1)
+            sleep(uniform(0, min(backoff, BATCH_GET_MAX_BACKOFF)))
+
+        response = dynamodb.batch_get_item(
+            RequestItems=request, ReturnConsumedCapacity="NONE"
+        )
+        items.extend(response.get("Responses", {}).get(dynamodb_table, []))
+        request = response.get("UnprocessedKeys")
 
-    if dynamodb_record:
-        for field in dynamodb_record.keys():
-            formatted_record.update(
-                get_value_from_dynamodb(field, dynamodb_record[field])
-            )
+        if not request:
+            return items
 
-    return formatted_record
+    raise BatchGetError(
+        "{} keys unprocessed after {} attempts".format(
+            len(request[dynamodb_table]["Keys"]), BATCH_GET_ATTEMPTS
+        )
+    )
 
 
 def get_value_from_dynamodb(field, value):
-    if value.get("N", False):
-        value["N"] = int(value["N"])
+    return {field: deserialize_value(value)}
+
+
+def deserializer_for(schema, tuples=False):
+    """Returns a converter of DynamoDB Items pages into plain values.
+
+    schema maps attribute names to their DynamoDB type ("S", "N", "BOOL",
+    "NULL", "L", "M" or None for any), or lists names, as in a projection.
+    The converter is generated once per schema and returns a list of dicts,
+    or of tuples in schema order. Missing attributes become None, items
+    are not mutated, and pages that do not match the declared types are
+    converted value by value instead.
+    """
+    if isinstance(schema, str):
+        schema = [name.strip() for name in schema.split(",")]
+
+    if not isinstance(schema, dict):
+        schema = dict.fromkeys(schema)
+
+    key = (tuple(schema.items()), tuples)
+
+    if key not in DESERIALIZERS:
+        DESERIALIZERS[key] = generate_deserializer(schema, tuples)
+
+    return DESERIALIZERS[key]
+
+
+def generate_deserializer(schema, tuples):
+    """Compiles a converter specialized to schema."""
+    values = []
+
+    # Missing attributes raise KeyError, sending the page to the fallback
+    for name, kind in schema.items():
+        if kind not in TYPED_VALUES:
+            raise ValueError("Unsupported DynamoDB type: {}".format(kind))
+
+        values.append(TYPED_VALUES[kind].format("item[{!r}]".format(name)))
+
+    if tuples:
+        row = "({},)".format(", ".join(values)) if values else "()"
+    else:
+        row = "{{{}}}".format(
+            ", ".join(
+                "{}: {}".format(repr(name), value)
+                for name, value in zip(schema, values)
+            )
+        )
+
+    source = (
+        "def convert_items(items):\n"
+        + "    try:\n"
+        + "        return [{} for item in items]\n".format(row)
+        + "    except (KeyError, TypeError, ValueError):\n"
+        + "        return [convert(item, names) for item in items]\n"
+    )
+    namespace = {
+        "convert": deserialize_row if tuples else deserialize_record,
+        "deserialize_item": deserialize_item,
+        "deserialize_value": deserialize_value,
+        "names": tuple(schema),
+    }
+    exec(compile(source, "<deserializer>", "exec"), namespace)  # nosec
+
+    return namespace["convert_items"]
+
+
+def deserialize_record(item, names):
+    """Deserializes attributes names of item into a dict."""
+    return {name: deserialize_attribute(item, name) for name in names}
+
+
+def deserialize_row(item, names):
+    """Deserializes attributes names of item into a tuple."""
+    return tuple(deserialize_attribute(item, name) for name in names)
+
+
+def deserialize_attribute(item, name):
+    """Deserializes attribute name of item, or None when missing."""
+    return deserialize_value(item[name]) if name in item else None
+
+
+def deserialize_item(item):
+    """Deserializes every attribute of item into a plain dict."""
+    return {name: deserialize_value(value) for name, value in item.items()}
+
+
+def deserialize_value(value):
+    """Deserializes a DynamoDB attribute value without mutating it."""
+    for kind, data in value.items():
+        if kind == "S":
+            return data
+
+        if kind == "N":
+            return to_number(data)
+
+        if kind in ("BOOL", "B"):
+            return data
+
+        if kind == "NULL":
+            return None
+
+        if kind == "M":
+            return deserialize_item(data)
 
-    return {field: value.popitem()[1]}
+        if kind == "L":
+            return [deserialize_value(element) for element in data]
+
+        if kind == "NS":
+            return [to_number(element) for element in data]
+
+        if kind in ("SS", "BS"):
+            return list(data)
+
+    raise ValueError("Unsupported DynamoDB value: {!r}".format(value))
+
+
+def to_number(data):
+    """Converts a DynamoDB number to int, or to float when not integral."""
+    try:
+        return int(data)
+    except ValueError:
+        return float(data)
 
 
 # S3
-def get_s3_file_content_from(bucket=None, key=None, s3=boto3.client("s3")):
+def get_s3_file_content_from(bucket=None, key=None, s3=None):
+    if s3 is None:
+        s3 = client("s3")
+
     return (
         s3.get_object(Bucket=bucket, Key=key)["Body"]
         .read()
@@ -67,6 +343,32 @@ def get_s3_file_content_from(bucket=None, key=None, s3=boto3.client("s3")):
     )
 
 
+@contextmanager
+def mapped_s3_file_from(bucket=None, key=None, s3=None):
+    """Spools S3 object to /tmp and yields a read-only mmap of it.
+
+    Raw emails can then be walked with thirtyone.extract without holding
+    the whole object in memory; the mmap is only valid inside the block.
+    """
+    if s3 is None:
+        s3 = client("s3")
+
+    with TemporaryFile() as spool:
+        copyfileobj(
+            s3.get_object(Bucket=bucket, Key=key)["Body"],
+            spool,
+            S3_SPOOL_CHUNK_SIZE,
+        )
+        spool.flush()
+
+        if not spool.tell():
+            yield b""
+            return
+
+        with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as file:
+            yield file
+
+
 def get_s3_file_location_from(sns_notification):
     return (
         sns_notification["s3"]["bucket"]["name"],
@@ -85,9 +387,12 @@ def send_ses_invite_to_attendee(
     charset="UTF-8",
     html=None,
     text=None,
-    ses=boto3.client("ses", region_name="us-west-2"),
+    ses=None,
 ):
     """Sends raw email with ical to attendees."""
+    if ses is None:
+        ses = client("ses", region_name="us-west-2")
+
     email = MIMEMultipart("mixed")
     email["Subject"] = subject
     email["From"] = sender
@@ -142,6 +447,83 @@ def send_ses_invite_to_attendee(
     return response
 
 
+def send_ses_invites_to_attendees(
+    recipients,
+    max_send_rate=None,
+    workers=SES_SEND_WORKERS,
+    ses=None,
+    **invite
+):
+    """Sends invites to many recipients, paced to the SES max send rate.
+
+    recipients are addresses, or dicts of send_ses_invite_to_attendee
+    arguments (recipient, ical, ...) overriding invite. Up to workers
+    sends run at once, sharing a token bucket filled at max_send_rate per
+    second: SES_MAX_SEND_RATE or else the account's quota by default.
+    Returns a SentInvite per recipient in order; failed sends carry their
+    error instead of raising.
+    """
+    if ses is None:
+        ses = client("ses", region_name="us-west-2")
+
+    if max_send_rate is None:
+        max_send_rate = float(environ.get("SES_MAX_SEND_RATE", 0)) or (
+            ses.get_send_quota()["MaxSendRate"]
+        )
+
+    bucket = TokenBucket(max_send_rate)
+    sends = []
+    pending = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for recipient in recipients:
+            if isinstance(recipient, str):
+                recipient = {"recipient": recipient}
+
+            sends.append(
+                executor.submit(
+                    send_paced_invite, bucket, ses, dict(invite, **recipient)
+                )
+            )
+            pending.add(sends[-1])
+
+            # Bounds queued invites when recipients is a long iterator
+            if len(pending) >= 2 * workers:
+                pending = wait(pending, return_when=FIRST_COMPLETED).not_done
+
+    return [send.result() for send in sends]
+
+
+def send_paced_invite(bucket, ses, invite):
+    """Sends one invite once bucket allows, retrying when throttled."""
+    for attempt in range(SES_SEND_ATTEMPTS):
+        if attempt:
+            backoff = SES_SEND_BACKOFF * 2 ** (attempt - 1)
+            sleep(uniform(0, min(backoff, SES_SEND_MAX_BACKOFF)))
+
+        bucket.acquire()
+
+        try:
+            response = send_ses_invite_to_attendee(ses=ses, **invite)
+        except Exception as error:  # pylint: disable=broad-except
+            if is_throttling(error) and attempt + 1 < SES_SEND_ATTEMPTS:
+                continue
+
+            return SentInvite(invite.get("recipient"), None, error)
+
+        return SentInvite(invite["recipient"], response["MessageId"], None)
+
+
+def is_throttling(error):
+    """Whether error is SES throttling that a later retry can get past."""
+    details = getattr(error, "response", {}).get("Error", {})
+
+    # The daily quota is also reported as Throttling but will not recover
+    return details.get("Code") in SES_THROTTLING_CODES and (
+        "daily" not in details.get("Message", "").lower()
+    )
+
+
 def send_ses_standard_email(
     ses=None,
     subject=None,
@@ -169,12 +551,18 @@ def send_ses_standard_email(
 
 
 # SNS
-def publish_sns_message(message="", arn=None, sns=boto3.client("sns")):
+def publish_sns_message(message="", arn=None, sns=None):
+    if sns is None:
+        sns = client("sns")
+
     return sns.publish(TargetArn=arn, MessageStructure="json", Message=message)
 
 
 # SQS
-def delete_sqs_message(id, url=None, sqs=boto3.client("sqs")):
+def delete_sqs_message(id, url=None, sqs=None):
+    if sqs is None:
+        sqs = client("sqs")
+
     return sqs.delete_message(QueueUrl=url, ReceiptHandle=id)
 
 
@@ -0,0 +1,97 @@
+"""Share lazily created boto3 clients across the layer and functions."""
+
+import logging
+import threading
+from collections import namedtuple
+from os import environ
+from timeit import default_timer
+
+logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
+logging.getLogger(__name__)
+
+# Tuned for Lambda: fail fast on unreachable endpoints, keep sockets alive
+# between invocations and pool enough of them for concurrent batches
+CLIENT_SETTINGS = {
+    "connect_timeout": float(environ.get("AWS_CONNECT_TIMEOUT", 2)),
+    "read_timeout": float(environ.get("AWS_READ_TIMEOUT", 10)),
+    "max_pool_connections": int(environ.get("AWS_MAX_POOL_CONNECTIONS", 32)),
+    "retries": {
+        "max_attempts": int(environ.get("AWS_MAX_ATTEMPTS", 3)),
+        "mode": environ.get("AWS_RETRY_MODE", "standard"),
+    },
+    "tcp_keepalive": True,
+}
+# Clients by service and region, and the session that built them
+CLIENTS = {}
+SESSIONS = []
+CLIENTS_LOCK = threading.Lock()
+# What was built since the last cold start report, in build order
+COLD_START = []
+
+Built = namedtuple("Built", ("name", "seconds"))
+
+
+def client(service, region_name=None):
+    """Returns the shared boto3 client for service, building it once."""
+    key = (service, region_name)
+
+    if key not in CLIENTS:
+        with CLIENTS_LOCK:
+            if key not in CLIENTS:
+                session, config = boto3_session()
+                started = default_timer()
+                CLIENTS[key] = session.client(
+                    service, region_name=region_name, config=config
+                )
+                record_built(
+                    "client {}{}".format(
+                        service, " " + region_name if region_name else ""
+                    ),
+                    started,
+                )
+
+    return CLIENTS[key]
+
+
+def boto3_session():
+    """Returns the shared boto3 session and client config."""
+    if not SESSIONS:
+        started = default_timer()
+        # Imported on first use so modules that never call AWS skip it
+        import boto3
+        from botocore.config import Config
+
+        record_built("import boto3", started)
+        started = default_timer()
+        SESSIONS.append((boto3.session.Session(), Config(**CLIENT_SETTINGS)))
+        record_built("session", started)
+
+    return SESSIONS[0]
+
+
+def record_built(name, started):
+    """Records how long building name took since started."""
+    COLD_START.append(Built(name, default_timer() - started))
+    logging.debug("Built %s in %.1f ms", name, COLD_START[-1].seconds * 1e3)
+
+
+def cold_start_report():
+    """Returns and logs what was built since the last report, in ms.
+
+    The first report of a container breaks down its cold start; later
+    ones are empty unless a new client was needed.
+    """
+    report = {
+        built.name: round(built.seconds * 1e3, 1) for built in COLD_START
+    }
+    del COLD_START[:]
+
+    if report:
+        logging.info(
+            "Built %s in %.1f ms: %s",
+            len(report),
+            sum(report.values()),
+            report,
+        )
+
+    return report
@@ -1,25 +1,332 @@
+import codecs
 import logging
 import re
-from base64 import b64decode
+import signal
+import threading
+from binascii import Error as BinasciiError
+from binascii import a2b_base64, a2b_qp
+from collections import namedtuple
 from datetime import datetime
 from os import environ
-from quopri import decodestring
+from time import monotonic
 
 from thirtyone.sanitize import sanitize_field
 from thirtyone.timezone import convert_time_to_utc
+from thirtyone.tokenizer import (find_component, index_components,
+                                 join_content_line)
 
 logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
 logging.getLogger(__name__)
 
+# Extraction regexes by field, tried in order until one matches. Patterns
+# must match in linear time on hostile input: anchor property names to
+# line starts and emulate atomic groups with (?=(...))\1 instead of letting
+# nested or adjacent repeats backtrack into each other.
+EXTRACTIONS = {
+    "attendee": (
+        "(?s)ATTENDEE;"
+        + "(?P<attendee>[^\r\n]+(((\r)?\n"
+        + "( |\t)[^\r\n]+){1,})?)",
+        r"(?s)(?P<attendee>PARTSTAT=\w+;"
+        + "ROLE=[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+    "description": (
+        "(?ms)(?<!VALARM\r\n)"
+        + "^DESCRIPTION(;LANGUAGE=[^:\r\n]+)?:"
+        + "(?P<description>[^\r\n]+(((\r)?\n"
+        + "( |\t)[^\r\n]+){1,})?)",
+    ),
+    "dtend": (
+        "(?ms)\\A(?:(?!BEGIN:VEVENT).)*BEGIN:VEVENT"
+        + ".*^DTEND(;[^:\r\n]+)?:(?P<dtend>2[0-9TZ]+)",
+    ),
+    "dtstamp": (
+        "(?ms)\\A(?:(?!BEGIN:VEVENT).)*BEGIN:VEVENT"
+        + ".*^DTSTAMP(;[^:\r\n]+)?:(?P<dtstamp>2[0-9TZ]+)",
+    ),
+    # Extractions ordered intentionally to avoid timezone extraction
+    "dtstart": (
+        "(?ms)\\A(?:(?!BEGIN:VEVENT).)*BEGIN:VEVENT"
+        + ".*^DTSTART(;[^:\r\n]+)?:(?P<dtstart>2[0-9TZ]+)",
+    ),
+    "encoding": (
+        r"(C|c)ontent-(T|t)ransfer-(E|e)ncoding: (?P<type>[\w\-]+)",
+    ),
+    "google_meet": (
+        r"(?i)Join:\s*(?P<google_meet>https://meet.google.com\/[^\s\\\\]+)",
+    ),
+    # Extractions ordered intentionally to bias base64 extraction
+    "ical_header": (
+        r"(?ms)^Content\-(t|T)ype:\s+"
+        + r"(?P<content_type>application\/ics)"
+        + r'(?P<settings>([\w ;:=\-"\.\!\@\#\$\%\^\&\*'
+        + r"\(\)\_\+\,\<\>\?\/]+(\r)?\n(\t)?){1,})",
+        r"(?ms)^Content\-(t|T)ype:\s+"
+        + r"(?P<content_type>(text\/calendar|"
+        + r"application\/ms-tnef|application\/x-sharing-metadata-xml))"
+        + r'(?P<settings>([\w ;:=\-"\.\!\@\#\$\%\^\&\*'
+        + r"\(\)\_\+\,\<\>\?\/]+(\r)?\n(\t)?){1,})",
+    ),
+    "ical_payload": (
+        r"(?ms)^(C|c)ontent\-(T|t)ype:\s+"
+        + r"(application\/ics)"
+        + r'(?=(([\w ;:=\-"\.\!\@\#\$\%\^\&\*\(\)\_\+\,\<\>\?\/]+'
+        + r"(\r)?\n(\t)?){1,64}))\4(\r)?\n"
+        + r"(?P<content>BEGIN:VCALENDAR.*END:VCALENDAR|"
+        + r"([\w=\_\/+]+)(((\r)?\n[\w=\_\/+]+){1,})?)",
+        r"(?s)\A(?:(?!BEGIN:VCALENDAR).)*"
+        + r"(?P<content>BEGIN:VCALENDAR.*END:VCALENDAR)",
+        r"(?ms)^(C|c)ontent\-(T|t)ype:\s+"
+        + r"(application\/ics|text\/calendar|application\/ms-tnef|"
+        + r"application\/x-sharing-metadata-xml)"
+        + r'(?=(([\w ;:=\-"\.\!\@\#\$\%\^\&\*\(\)\_\+\,\<\>\?\/]+'
+        + r"(\r)?\n(\t)?){1,64}))\4(\r)?\n"
+        + r"(?P<content>([\w=\_\/+]+)(((\r)?\n[\w=\_\/+]+){1,})?)",
+    ),
+    "ical_url": (
+        r"(?im)^(?:(?!\<IcalUrl).)*"
+        + r"\<IcalUrl[^\>\r\n]*\>(?P<ical_url>.+)\<\/IcalUrl",
+    ),
+    "location": (
+        "(?ms)^LOCATION(;LANGUAGE=[^:\r\n]+)?:"
+        + "(?P<location>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+    "mailto": ('(?i)mailto:(?P<mailto>[^:;"@]+@[^:@]+)$',),
+    "mailto_rsvp": ('(?i)mailto:(?P<mailto_rsvp>[^:;"@]+@[^:@]+)$',),
+    "method": (r"METHOD(:|=)\s*(?P<method>[A-Z]+)",),
+    "name": (
+        r"(?im)^(?:(?!CN=|EMAIL=).)*(CN|EMAIL)="
+        + r"((?=(?P<name>[^;:\n]+))(?P=name))?.*:"
+        + r"mailto:([^@:\n]|\n[ \t])+@"
+        + r"(([^\.@:\n]|\n[ \t])+\.){1,}\w+",
+    ),
+    "organizer": (
+        r"(?i)^((?P<organizer>[^:;]*):)?"
+        + r"mailto:[^@]+@([^\.]+\.){1,}[a-zA-Z0-9]+",
+        r"(?im)^(?=((?P<organizer>.*[^:;])?;(SENT-BY|EMAIL)=))\1.*:"
+        + r"mailto:([^@:\n]|\n[ \t])+@"
+        + r"(([^\.@:\n]|\n[ \t])+\.){1,}[a-zA-Z0-9]+",
+    ),
+    "org_mailto": (
+        "(?s)ORGANIZER(;CN=|:)"
+        + "(?P<org_mailto>[^:;\r\n]+(((\r)?\n( |\t)[^:;\r\n]+){1,})?)",
+        "ORGANIZER(;CN=|:)(?P<org_mailto>[^:;\\\\]+)",
+    ),
+    "original_uid": (
+        "(?ms)^UID(;LANGUAGE=[^:\r\n]+)?:"
+        + "(?P<original_uid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+    "partstat": ("PARTSTAT=(?P<partstat>[A-Z]+)",),
+    "prodid": (
+        "(?s)PRODID:(?P<prodid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+    # Extractions ordered intentionally to avoid bounce emails
+    "return_path": (
+        r"(?mi)^Reply-To:(?=(\s+))\1((?:[^@\r\n]|\r?\n[ \t])*\s(<)?)?"
+        + r"(?P<return_path>[^@\s]+@[^\s>]+)(>)?$",
+        "envelope-from=(?P<return_path>[^;]+)",
+        r"From: ([^\<]+\<)?(?P<return_path>[^\<\>\r\n]+)",
+        r"^Return-Path: \<(?P<return_path>[^\>]+)",
+    ),
+    "status": ("STATUS:(?P<status>[A-Z]+)",),
+    "summary": (
+        "(?ms)^SUMMARY(;LANGUAGE=[^:\r\n]+)?:"
+        + "(?P<summary>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+    "tzid": ("TZID:(?P<tzid>[^\r\n]+)",),
+    "uid": (
+        "(?ms)^UID([^:\r\n]+)?:"
+        + "(?P<uid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
+    ),
+}
+
+# Compiled lazily on first use of each field
+COMPILED_EXTRACTIONS = {}
+
+BASE64_WHITESPACE = b" \t\r\n"
+DECODE_CHUNK_SIZE = 64 * 1024
+CALENDAR_CONTENT_TYPES = (
+    "application/ics",
+    "application/ms-tnef",
+    "application/x-sharing-metadata-xml",
+    "text/calendar",
+)
+HEADER_BLOCK_END = re.compile(r"\r?\n\r?\n")
+HEADER_BLOCK_END_BYTES = re.compile(rb"\r?\n\r?\n")
+# Characters that may follow a boundary on its delimiter line
+BOUNDARY_TERMINATORS = ("", "\r", "\n", "-", " ", "\t")
+BOUNDARY_TERMINATORS_BYTES = (b"", b"\r", b"\n", b"-", b" ", b"\t")
+MIME_HEADERS = {
+    "boundary": re.compile(
+        r'(?i)boundary=(?P<quote>"?)(?P<boundary>[^"\r\n;]+)(?P=quote)'
+    ),
+    "content_type": re.compile(
+        r"(?im)^Content-Type:\s*(?P<content_type>[\w\-\.\+]+/[\w\-\.\+]+)"
+    ),
+    "encoding": re.compile(
+        r"(?im)^Content-Transfer-Encoding:\s*(?P<encoding>[\w\-]+)"
+    ),
+}
+MimeMessage = namedtuple(
+    "MimeMessage", ("headers", "content_type", "encoding", "payload")
+)
+
+# Content line regexes by field, matched against a single unfolded line
+# owned directly by the first component of the given name. Scoping to the
+# VEVENT keeps VTIMEZONE DTSTARTs and VALARM DESCRIPTIONs out structurally.
+CONTENT_LINE_EXTRACTIONS = {
+    "attendee": (
+        "VEVENT",
+        "ATTENDEE",
+        re.compile(r"ATTENDEE;(?P<attendee>.+)"),
+    ),
+    "description": (
+        "VEVENT",
+        "DESCRIPTION",
+        re.compile(r"DESCRIPTION(;LANGUAGE=[^:]+)?:(?P<description>.+)"),
+    ),
+    "dtend": (
+        "VEVENT",
+        "DTEND",
+        re.compile(r"DTEND(;[^:]+)?:(?P<dtend>2[0-9TZ]+)"),
+    ),
+    "dtstamp": (
+        "VEVENT",
+        "DTSTAMP",
+        re.compile(r"DTSTAMP(;[^:]+)?:(?P<dtstamp>2[0-9TZ]+)"),
+    ),
+    "dtstart": (
+        "VEVENT",
+        "DTSTART",
+        re.compile(r"DTSTART(;[^:]+)?:(?P<dtstart>2[0-9TZ]+)"),
+    ),
+    "location": (
+        "VEVENT",
+        "LOCATION",
+        re.compile(r"LOCATION(;LANGUAGE=[^:]+)?:(?P<location>.+)"),
+    ),
+    "method": (
+        "VCALENDAR",
+        "METHOD",
+        re.compile(r"METHOD:\s*(?P<method>[A-Z]+)"),
+    ),
+    "org_mailto": (
+        "VEVENT",
+        "ORGANIZER",
+        re.compile(r"ORGANIZER(;CN=|:)(?P<org_mailto>[^:;]+)"),
+    ),
+    "original_uid": (
+        "VEVENT",
+        "UID",
+        re.compile(r"UID(;LANGUAGE=[^:]+)?:(?P<original_uid>.+)"),
+    ),
+    "prodid": (
+        "VCALENDAR",
+        "PRODID",
+        re.compile(r"PRODID:(?P<prodid>.+)"),
+    ),
+    "summary": (
+        "VEVENT",
+        "SUMMARY",
+        re.compile(r"SUMMARY(;LANGUAGE=[^:]+)?:(?P<summary>.+)"),
+    ),
+    "tzid": ("VTIMEZONE", "TZID", re.compile(r"TZID:(?P<tzid>.+)")),
+    "uid": ("VEVENT", "UID", re.compile(r"UID([^:]+)?:(?P<uid>.+)")),
+}
+
+# Hardened extraction limits per document: seconds, and characters handed
+# to extraction regexes in total
+EXTRACTION_SECONDS = 2.0
+EXTRACTION_INPUT_CHARS = 64 * 1024 * 1024
+ACTIVE_BUDGET = threading.local()
+
+
+class ExtractionTimeout(Exception):
+    """Extraction exceeded its per-document time or input size budget."""
+
+
+class ExtractionBudget:
+    """Per-document time and input size budget for hardened extraction.
+
+    The hard time bound is an ITIMER_REAL interval timer, which can only be
+    armed in the main thread: its SIGALRM interrupts a single regex that
+    runs past the deadline. The process-wide SIGALRM handler is replaced
+    while the budget is active and restored on exit, and no timer is armed
+    when one is already running.
+
+    Every regex attempt is also charged the length of the text it scans
+    against max_chars, and the deadline is checked between attempts. Off
+    the main thread only these checks apply, so a single catastrophic
+    regex is bounded by the input size cap alone.
+    """
+
+    def __init__(
+        self, seconds=EXTRACTION_SECONDS, max_chars=EXTRACTION_INPUT_CHARS
+    ):
+        self.seconds = seconds
+        self.max_chars = max_chars
+        self.chars = 0
+        self.deadline = None
+        self.previous = None
+        self.handler = None
+
+    def __enter__(self):
+        self.deadline = monotonic() + self.seconds
+        self.previous = getattr(ACTIVE_BUDGET, "budget", None)
+        ACTIVE_BUDGET.budget = self
+
+        if (
+            self.previous is None
+            and threading.current_thread() is threading.main_thread()
+            and signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+        ):
+            self.handler = signal.signal(signal.SIGALRM, self.expire)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.handler)
+            self.handler = None
+
+        ACTIVE_BUDGET.budget = self.previous
+
+    def expire(self, signum, frame):
+        """Interrupts extraction once the deadline has passed."""
+        raise ExtractionTimeout(
+            "Extraction exceeded {} seconds".format(self.seconds)
+        )
+
+    def charge(self, field, data):
+        """Charges an attempt to extract field from data."""
+        self.chars += len(data)
+
+        if self.chars > self.max_chars:
+            raise ExtractionTimeout(
+                "Extraction exceeded input size cap at {}".format(field)
+            )
+
+        if monotonic() > self.deadline:
+            self.expire(None, None)
+
 
-def extract_ical_from(email, header):
-    """Extracts ical from email."""
+def charge_extraction_budget(field, data):
+    """Charges the active extraction budget, if any."""
+    budget = getattr(ACTIVE_BUDGET, "budget", None)
+
+    if budget is not None:
+        budget.charge(field, data)
+
+
+def extract_ical_from(message):
+    """Extracts ical from the calendar part of a walked email."""
     logging.debug("Extracting ical from email")
-    if header.get("content_type", None) == "application/ms-tnef":
+    if message.content_type == "application/ms-tnef":
         ical = "METHOD:WINMAIL"
-    elif header:
-        encoding = extract_field("encoding", data=header.get("settings", ""))
-        ical = extract_payload_from(email, encoding.get("type", "base64"))
+    elif message.payload is not None:
+        ical = decode_payload(message.payload, message.encoding)
     else:
         logging.debug("Ical not detected")
         ical = None
@@ -27,32 +334,218 @@ def extract_ical_from(email, header):
     return ical
 
 
-def extract_payload_from(email, encoding):
-    """Extracting payload from email."""
-    logging.debug("Extracting {} payload".format(encoding))
-    payload = extract_field("ical_payload", data=email)
+def decode_payload(payload, encoding):
+    """Decodes payload according to its transfer encoding."""
+    logging.debug("Decoding %s payload", encoding)
 
     if encoding.lower() == "base64":
-        ical = decode_base64(payload.get("content", ""))
+        ical = decode_base64(payload)
     elif encoding.lower() == "quoted-printable":
-        ical = decode_quoted_printable(payload.get("content", ""))
+        ical = decode_quoted_printable(payload)
     else:
-        ical = payload.get("content", "")
+        ical = decode_span(payload)
 
     return ical
 
 
-def decode_base64(payload):
-    """Decodes base64 content."""
+def walk_mime(email):
+    """Walks email MIME parts up to the first calendar part.
+
+    Headers are only read from the top-level header block. Parts before the
+    calendar part are skipped by searching for the next boundary, without
+    being decoded or copied, so only the calendar payload is sliced out.
+    Email may be str or bytes-like (e.g. an mmap of a spooled email), in
+    which case only header blocks and delimiter lines are decoded and the
+    payload is sliced out as bytes.
+    """
+    logging.debug("Walking email MIME parts")
+    headers, position = split_header_block(email, 0)
+    part_headers = headers
+    boundaries = []
+
+    while position is not None:
+        content_type, encoding, boundary = read_part_headers(part_headers)
+
+        if content_type == "message/rfc822":
+            # Forwarded invites carry their own header block and boundaries
+            part_headers, position = split_header_block(email, position)
+            continue
+
+        if boundary:
+            boundaries.append(boundary)
+
+        part_end = find_boundary(email, boundaries, position)
+
+        if content_type in CALENDAR_CONTENT_TYPES:
+            payload = email[position : part_end or len(email)]
+
+            return MimeMessage(
+                headers,
+                content_type,
+                encoding,
+                payload.strip("\r\n" if is_text(email) else b"\r\n"),
+            )
+
+        position = skip_closing_boundaries(email, boundaries, part_end)
+
+        if position is not None:
+            part_headers, position = split_header_block(email, position)
+
+    return MimeMessage(headers, None, None, None)
+
+
+def split_header_block(email, start):
+    """Returns header block starting at start and the offset of its body."""
+    if is_text(email):
+        match = HEADER_BLOCK_END.search(email, start)
+    else:
+        match = HEADER_BLOCK_END_BYTES.search(email, start)
+
+    if match is None:
+        return decode_span(email[start:]), len(email)
+
+    return decode_span(email[start : match.start()]), match.end()
+
+
+def find_boundary(email, boundaries, start):
+    """Returns offset of the next delimiter line of any open boundary."""
+    positions = []
+    terminators = (
+        BOUNDARY_TERMINATORS if is_text(email) else BOUNDARY_TERMINATORS_BYTES
+    )
+
+    for boundary in boundaries:
+        delimiter = encode_like(email, "\n--" + boundary)
+        position = email.find(delimiter, max(start - 1, 0))
+
+        while position != -1 and email[
+            position + len(delimiter) : position + len(delimiter) + 1
+        ] not in terminators:
+            position = email.find(delimiter, position + 1)
+
+        if position != -1:
+            positions.append(position + 1)
+
+    return min(positions) if positions else None
+
+
+def skip_closing_boundaries(email, boundaries, position):
+    """Returns offset after the next opening delimiter line, or None.
+
+    Closing delimiters end their multipart, so their boundary is dropped
+    and the walk resumes in the enclosing multipart.
+    """
+    while position is not None:
+        end = email.find(encode_like(email, "\n"), position)
+        end = len(email) if end == -1 else end + 1
+        delimiter = decode_span(email[position:end]).strip()
+
+        if delimiter[2:-2] in boundaries and delimiter.endswith("--"):
+            boundaries.remove(delimiter[2:-2])
+            position = find_boundary(email, boundaries, end)
+        else:
+            return end
+
+    return None
+
+
+def read_part_headers(headers):
+    """Reads content type, transfer encoding and boundary from headers."""
+    content_type = MIME_HEADERS["content_type"].search(headers)
+    encoding = MIME_HEADERS["encoding"].search(headers)
+    boundary = MIME_HEADERS["boundary"].search(headers)
+
+    return (
+        content_type.group("content_type").lower() if content_type else None,
+        encoding.group("encoding") if encoding else "base64",
+        boundary.group("boundary") if boundary else None,
+    )
+
+
+def is_text(email):
+    """Tells str emails apart from bytes-like ones."""
+    return isinstance(email, str)
+
+
+def encode_like(email, text):
+    """Encodes text to search a bytes-like email, leaving str untouched."""
+    return text if is_text(email) else text.encode("utf-8")
+
+
+def decode_span(span):
+    """Decodes a span sliced from a bytes-like email, leaving str untouched."""
+    return span if is_text(span) else codecs.decode(span, "utf-8-sig")
+
+
+def decode_base64(payload, chunk_size=DECODE_CHUNK_SIZE):
+    """Decodes base64 content.
+
+    Payload (str, bytes or memoryview) is decoded a window at a time into
+    one preallocated buffer. Line breaks and whitespace that mail clients
+    wrap base64 with are dropped per window, and partial quads carry over
+    to the next window.
+    """
     logging.debug("Decoding base64 payload")
+    buffer = bytearray(len(payload) * 3 // 4 + 3)
+    length = 0
+    carry = b""
+
+    for chunk in iter_payload_chunks(payload, chunk_size):
+        chunk = carry + chunk.translate(None, BASE64_WHITESPACE)
+        boundary = len(chunk) - len(chunk) % 4
+        carry = chunk[boundary:]
+        decoded = a2b_base64(chunk[:boundary])
+        buffer[length : length + len(decoded)] = decoded
+        length += len(decoded)
+
+    if carry.rstrip(b"="):
+        raise BinasciiError("Incorrect padding")
 
-    return b64decode(payload).decode("utf-8-sig")
+    return decode_buffer(buffer, length)
 
 
-def decode_quoted_printable(payload):
-    """Decodes 7-bit, 8-bit, and quoted-printable payloads."""
+def decode_quoted_printable(payload, chunk_size=DECODE_CHUNK_SIZE):
+    """Decodes 7-bit, 8-bit, and quoted-printable payloads.
+
+    Payload is decoded a window at a time into one preallocated buffer.
+    Windows end on line breaks so soft line breaks are never split.
+    """
     logging.debug("Decoding quoted-printable payload")
-    return decodestring(payload).decode("utf-8-sig")
+    buffer = bytearray(len(payload))
+    length = 0
+    carry = b""
+
+    for chunk in iter_payload_chunks(payload, chunk_size):
+        chunk = carry + chunk
+        boundary = chunk.rfind(b"\n") + 1
+        carry = chunk[boundary:]
+        decoded = a2b_qp(chunk[:boundary])
+        buffer[length : length + len(decoded)] = decoded
+        length += len(decoded)
+
+    decoded = a2b_qp(carry)
+    buffer[length : length + len(decoded)] = decoded
+    length += len(decoded)
+
+    return decode_buffer(buffer, length)
+
+
+def iter_payload_chunks(payload, chunk_size):
+    """Yields payload as bytes windows of about chunk_size."""
+    if isinstance(payload, str):
+        for start in range(0, len(payload), chunk_size):
+            yield payload[start : start + chunk_size].encode("utf-8")
+    else:
+        payload = memoryview(payload)
+
+        for start in range(0, len(payload), chunk_size):
+            yield payload[start : start + chunk_size].tobytes()
+
+
+def decode_buffer(buffer, length):
+    """Decodes the filled part of buffer as UTF-8 text."""
+    with memoryview(buffer) as view:
+        return codecs.decode(view[:length], "utf-8-sig")
 
 
 def extract_fields_by_method(method, data, sender):
@@ -78,8 +571,12 @@ def extract_ical_cancel_fields(ical, sender):
 
     cancel_fields = ("organizer", "original_uid", "prodid")
 
+    results.update(extract_field("organizer", data=ical))
+    results.update(
+        extract_content_line_fields(cancel_fields[1:], index_components(ical))
+    )
+
     for field in cancel_fields:
-        results.update(extract_field(field, data=ical))
         if results.get(field, None):
             results.update(
                 sanitize_field(field, data=results.pop(field, None))
@@ -99,8 +596,14 @@ def extract_ical_reply_fields(ical, sender):
 
     reply_fields = ("attendee", "method", "prodid", "uid")
 
+    results.update(
+        extract_content_line_fields(reply_fields, index_components(ical))
+    )
+
+    if results.get("attendee", None) is None:
+        results.update(extract_field("attendee", data=ical))
+
     for field in reply_fields:
-        results.update(extract_field(field, data=ical))
         if results.get(field, None):
             results.update(
                 sanitize_field(field, data=results.pop(field, None))
@@ -113,9 +616,11 @@ def enrich_ical_reply_fields(fields):
     """Enriches extracted ical fields."""
     results = {}
     results.update(fields)
-    results.update(extract_field(field="name", data=fields["attendee"]))
-
-    results.update(extract_field("mailto_rsvp", data=fields["attendee"]))
+    results.update(
+        extract_fields(
+            ("name", "mailto_rsvp", "partstat"), data=results.pop("attendee")
+        )
+    )
 
     if results.get("name", None) is None:
         results["name"] = results["mailto_rsvp"]
@@ -125,8 +630,6 @@ def enrich_ical_reply_fields(fields):
             field="organizer", data=results["name"]
         )["organizer"]
 
-    results.update(extract_field("partstat", data=results.pop("attendee")))
-
     return results
 
 
@@ -146,14 +649,20 @@ def extract_ical_request_fields(ical, sender):
         "tzid",
     )
 
+    index = index_components(ical)
+
+    results.update(extract_content_line_fields(request_fields, index))
+
+    # Content line values are unfolded once, by the tokenizer
     for field in request_fields:
-        results.update(extract_field(field, data=ical))
         if results.get(field, None):
             results.update(
-                sanitize_field(field, data=results.pop(field, None))
+                sanitize_field(
+                    field, data=results.pop(field, None), unfolded=True
+                )
             )
 
-    results.update(enrich_ical_request_fields(results, ical))
+    results.update(enrich_ical_request_fields(results, index))
 
     return results
 
@@ -176,7 +685,7 @@ def initialize_ical_request_fields(
     return icalFields
 
 
-def enrich_ical_request_fields(fields, ical):
+def enrich_ical_request_fields(fields, index):
     """Enriches extracted ical fields."""
     if fields["mailto"] == "":
         fields.update(extract_field("mailto", data=fields["org_mailto"]))
@@ -197,13 +706,10 @@ def enrich_ical_request_fields(fields, ical):
         )
 
     if fields.get("description", None):
-        _description = extract_field("description", data=ical)
+        _description = extract_content_line_field("description", index)
 
         google_meet = extract_field(
-            "google_meet",
-            data=re.sub(
-                r"(\r)?\n( )+", "", _description.pop("description", "")
-            ),
+            "google_meet", data=_description.pop("description", "")
         )
 
         if google_meet:
@@ -220,7 +726,11 @@ def enrich_ical_request_fields(fields, ical):
             )
 
     for field in "description location summary".split(" "):
-        fields.update(convert_html_from(field, data=fields.get(field, None)))
+        fields.update(
+            convert_html_from(
+                field, data=fields.get(field, None), unfolded=True
+            )
+        )
 
     if fields.get("tzid", None):
         fields.update(
@@ -230,6 +740,7 @@ def enrich_ical_request_fields(fields, ical):
                     "dtstart": fields["dtstart"],
                 },
                 timezone=fields.pop("tzid"),
+                index=index,
             )
         )
 
@@ -248,11 +759,14 @@ def extract_organizer_from(data, defaultValue):
     return sanitize_field("organizer", result["organizer"])
 
 
-def convert_html_from(field, data):
+def convert_html_from(field, data, unfolded=False):
     """Transforms data to HTML."""
     logging.debug("Extracting HTML from {}".format(field))
     result = {
-        field + "_html": sanitize_field("html", data=data).get("html", None)
+        field
+        + "_html": sanitize_field("html", data=data, unfolded=unfolded).get(
+            "html", None
+        )
     }
 
     return result
@@ -260,127 +774,78 @@ def convert_html_from(field, data):
 
 def extract_field(field, data):
     """Extracts field from data with regex."""
-    logging.debug(
-        "Extracting {field} from: {data}".format(
-            field=field, data=str(data)[:78]
-        )
-    )
+    logging.debug("Extracting %s from: %.78s", field, data)
     result = {}
-    extractions = {
-        "attendee": (
-            "(?s)ATTENDEE;"
-            + "(?P<attendee>[^\r\n]+(((\r)?\n"
-            + "( |\t)[^\r\n]+){1,})?)",
-            r"(?s)(?P<attendee>PARTSTAT=\w+;"
-            + "ROLE=[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-        "description": (
-            "(?s)(?<!VALARM\r\n)"
-            + "DESCRIPTION(;LANGUAGE=[^:]+)?:"
-            + "(?P<description>[^\r\n]+(((\r)?\n"
-            + "( |\t)[^\r\n]+){1,})?)",
-        ),
-        "dtend": ("(?s)BEGIN:VEVENT.*DTEND(;[^:]+)?:(?P<dtend>2[0-9TZ]+)",),
-        "dtstamp": (
-            "(?s)BEGIN:VEVENT.*DTSTAMP(;[^:]+)?:(?P<dtstamp>2[0-9TZ]+)",
-        ),
-        # Extractions ordered intentionally to avoid timezone extraction
-        "dtstart": (
-            "(?s)BEGIN:VEVENT.*DTSTART(;[^:]+)?:(?P<dtstart>2[0-9TZ]+)",
-        ),
-        "encoding": (
-            r"(C|c)ontent-(T|t)ransfer-(E|e)ncoding: (?P<type>[\w\-]+)",
-        ),
-        "google_meet": (
-            r"(?i)Join:\s*(?P<google_meet>https://meet.google.com\/[^\s\\\\]+)",
-        ),
-        # Extractions ordered intentionally to bias base64 extraction
-        "ical_header": (
-            r"(?s)Content\-(t|T)ype:\s+"
-            + "(?P<content_type>application\/ics)"
-            + '(?P<settings>([\w ;:=\-"\.\!\@\#\$\%\^\&\*'
-            + "\(\)\_\+\,\<\>\?\/]+(\\r)?\\n(\\t)?){1,})",
-            r"(?s)Content\-(t|T)ype:\s+"
-            + "(?P<content_type>(text\/calendar|"
-            + "application\/ms-tnef|application\/x-sharing-metadata-xml))"
-            + '(?P<settings>([\w ;:=\-"\.\!\@\#\$\%\^\&\*'
-            + "\(\)\_\+\,\<\>\?\/]+(\\r)?\\n(\\t)?){1,})",
-        ),
-        "ical_payload": (
-            r"(?s)(C|c)ontent\-(T|t)ype:\s+"
-            + "(application\/ics)"
-            + '([\w ;:=\-"\.\!\@\#\$\%\^\&\*\(\)\_\+\,\<\>\?\/]+'
-            + "(\r)?\n(\t)?){1,}(\r)?\n"
-            + "(?P<content>BEGIN:VCALENDAR.*END:VCALENDAR|"
-            + "([\w=\_\/+]+)(((\r)?\n[\w=\_\/+]+){1,})?)",
-            "(?s)(?P<content>BEGIN:VCALENDAR.*END:VCALENDAR)",
-            r"(?s)(C|c)ontent\-(T|t)ype:\s+"
-            + "(application\/ics|text\/calendar|application\/ms-tnef|"
-            + "application\/x-sharing-metadata-xml)"
-            + '([\w ;:=\-"\.\!\@\#\$\%\^\&\*\(\)\_\+\,\<\>\?\/]+'
-            + "(\\r)?\\n(\\t)?){1,}(\\r)?\\n"
-            + "(?P<content>([\w=\_\/+]+)(((\\r)?\\n[\w=\_\/+]+){1,})?)",
-        ),
-        "ical_url": (r"(?i)\<IcalUrl[^\>]*\>(?P<ical_url>.+)\<\/IcalUrl",),
-        "location": (
-            "(?s)(?<!X-LIC-)LOCATION(;LANGUAGE=[^:]+)?:"
-            + "(?P<location>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-        "mailto": ('(?i)mailto:(?P<mailto>[^:;"@]+@[^:@]+)$',),
-        "mailto_rsvp": ('(?i)mailto:(?P<mailto_rsvp>[^:;"@]+@[^:@]+)$',),
-        "method": (r"METHOD(:|=)\s*(?P<method>[A-Z]+)",),
-        "name": (
-            r"(?i)(CN|EMAIL)=(?P<name>[^;:]+)?.*:"
-            + "mailto:[^@]+@([^\.]+\.){1,}\w+",
-        ),
-        "organizer": (
-            r"(?i)^((?P<organizer>[^:;]*):)?"
-            + "mailto:[^@]+@([^\.]+\.){1,}[a-zA-Z0-9]+",
-            r"(?i)(?P<organizer>.*[^:;])?;(SENT-BY|EMAIL)=.*:"
-            + "mailto:[^@]+@([^\.]+\.){1,}[a-zA-Z0-9]+",
-        ),
-        "org_mailto": (
-            "(?s)ORGANIZER(;CN=|:)"
-            + "(?P<org_mailto>[^:;\r\n]+(((\r)?\n( |\t)[^:;\r\n]+){1,})?)",
-            "ORGANIZER(;CN=|:)(?P<org_mailto>[^:;\\\\]+)",
-        ),
-        "original_uid": (
-            "(?s)UID(;LANGUAGE=[^:]+)?:"
-            + "(?P<original_uid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-        "partstat": ("PARTSTAT=(?P<partstat>[A-Z]+)",),
-        "prodid": (
-            "(?s)PRODID:(?P<prodid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-        # Extractions ordered intentionally to avoid bounce emails
-        "return_path": (
-            r"(?mi)^Reply-To:\s+([^@]+\s+(<)?)?(?P<return_path>[^@\s]+@[^\s>]+)(>)?$",
-            "envelope-from=(?P<return_path>[^;]+)",
-            r"From: ([^\<]+\<)?(?P<return_path>[^\<\>\r\n]+)",
-            r"^Return-Path: \<(?P<return_path>[^\>]+)",
-        ),
-        "status": ("STATUS:(?P<status>[A-Z]+)",),
-        "summary": (
-            "(?s)SUMMARY(;LANGUAGE=[^:]+)?:"
-            + "(?P<summary>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-        "tzid": ("TZID:(?P<tzid>[^\r\n]+)",),
-        "uid": (
-            "(?s)UID([^:]+)?:"
-            + "(?P<uid>[^\r\n]+(((\r)?\n( |\t)[^\r\n]+){1,})?)",
-        ),
-    }
 
-    for index, regex in enumerate(extractions[field]):
-        extracted = re.search(regex, data)
+    for index, regex in enumerate(compiled_extractions_for(field)):
+        charge_extraction_budget(field, data)
+        extracted = regex.search(data)
 
         if extracted:
             result = extracted.groupdict()
             logging.debug(
-                "Value: {value}\n{regex}".format(
-                    value=result, regex={"index": str(index), "regex": regex}
-                )
+                "Value: %s\n%s",
+                result,
+                {"index": str(index), "regex": regex.pattern},
             )
             break
 
     return result
+
+
+def extract_fields(fields, data):
+    """Extracts several fields from the same data.
+
+    Each field tries its regexes in fallback order; later fields win when
+    results share a group name.
+    """
+    results = {}
+
+    for field in fields:
+        results.update(extract_field(field, data))
+
+    return results
+
+
+def compiled_extractions_for(field):
+    """Returns compiled extraction regexes for field, in fallback order."""
+    compiled = COMPILED_EXTRACTIONS.get(field, None)
+
+    if compiled is None:
+        compiled = tuple(re.compile(regex) for regex in EXTRACTIONS[field])
+        COMPILED_EXTRACTIONS[field] = compiled
+
+    return compiled
+
+
+def extract_content_line_fields(fields, index):
+    """Extracts several fields from an indexed ical."""
+    results = {}
+
+    for field in fields:
+        results.update(extract_content_line_field(field, index))
+
+    return results
+
+
+def extract_content_line_field(field, index):
+    """Extracts field from the first matching line of its component.
+
+    Icals without the expected component (e.g. bare property lists) are
+    searched in document order instead.
+    """
+    component, name, regex = CONTENT_LINE_EXTRACTIONS[field]
+    owner = find_component(index, component)
+
+    for position in index.names.get(name, []):
+        if owner is not None and index.owners[position] != owner:
+            continue
+
+        line = join_content_line(index.content_lines[position])
+        charge_extraction_budget(field, line)
+        extracted = regex.match(line)
+
+        if extracted:
+            return extracted.groupdict()
+
+    return {}
@@ -0,0 +1,373 @@
+"""Fetch shared calendars over HTTP."""
+
+import asyncio
+import codecs
+import ipaddress
+import logging
+import socket
+import ssl
+from collections import OrderedDict, namedtuple
+from os import environ
+from urllib.parse import quote, urljoin, urlsplit
+
+from thirtyone.tokenizer import EventCalendarSplitter
+
+logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
+logging.getLogger(__name__)
+
+# Seconds a whole fetch, redirects included, may take
+FETCH_SECONDS = float(environ.get("FETCH_SECONDS", 10))
+MAX_CALENDAR_BYTES = int(environ.get("MAX_CALENDAR_BYTES", 16 * 1024 * 1024))
+MAX_HEADER_BYTES = 64 * 1024
+MAX_REDIRECTS = 5
+READ_SIZE = 64 * 1024
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Shared calendar links may use webcal, which is served over HTTPS
+SCHEMES = {
+    "http": ("http", 80),
+    "https": ("https", 443),
+    "webcal": ("https", 443),
+    "webcals": ("https", 443),
+}
+USER_AGENT = "CalendarSnack/1.0"
+# Characters left as they are when quoting request targets
+TARGET_SAFE = "/?%!$&'()*+,;=:@~"
+# Fetched calendars by URL, with the validators to revalidate them
+CALENDARS = OrderedDict()
+CALENDARS_MAXSIZE = 32
+SSL_CONTEXTS = []
+
+CachedCalendar = namedtuple(
+    "CachedCalendar", ("etag", "last_modified", "text")
+)
+Response = namedtuple("Response", ("status", "headers", "reader", "writer"))
+
+
+class FetchError(Exception):
+    """Calendar could not be fetched within the fetch limits."""
+
+
+def fetch_calendar_now(url, **limits):
+    """Fetches calendar text at url from synchronous code.
+
+    Async callers await fetch_calendar instead. A fetch interrupted by a
+    signal is cancelled, and its connection closed, before the
+    interruption is raised.
+    """
+    return asyncio.run(fetch_calendar(url, **limits))
+
+
+async def fetch_calendar(
+    url, seconds=FETCH_SECONDS, max_bytes=MAX_CALENDAR_BYTES
+):
+    """Fetches calendar text at url, revalidating cached copies."""
+    texts = []
+
+    async for text in iter_calendar_text(url, seconds, max_bytes):
+        texts.append(text)
+
+    return "".join(texts)
+
+
+async def iter_calendar_events(
+    url, seconds=FETCH_SECONDS, max_bytes=MAX_CALENDAR_BYTES
+):
+    """Yields a standalone VCALENDAR per VEVENT as the calendar streams in.
+
+    Calendars match iter_event_calendars over the whole fetched text.
+    """
+    splitter = EventCalendarSplitter()
+
+    async for text in iter_calendar_text(url, seconds, max_bytes):
+        for calendar in splitter.feed(text):
+            yield calendar
+
+    for calendar in splitter.close():
+        yield calendar
+
+
+async def iter_calendar_text(url, seconds, max_bytes):
+    """Yields calendar text at url as it is downloaded and decoded.
+
+    Raises FetchError when the fetch takes longer than seconds, the body
+    exceeds max_bytes or the server answers with an error.
+    """
+    deadline = asyncio.get_event_loop().time() + seconds
+    cached = CALENDARS.get(url)
+    headers = {}
+
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    response = await request_following_redirects(url, headers, deadline)
+
+    try:
+        if response.status == 304 and cached:
+            logging.debug("Calendar not modified: %s", url)
+            CALENDARS.move_to_end(url)
+            yield cached.text
+            return
+
+        if response.status != 200:
+            raise FetchError(
+                "HTTP {} fetching calendar".format(response.status)
+            )
+
+        decoder = codecs.getincrementaldecoder("utf8")()
+        texts = []
+
+        try:
+            async for data in iter_body(response, deadline, max_bytes):
+                text = decoder.decode(data)
+                texts.append(text)
+                yield text
+
+            text = decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise FetchError("Calendar is not UTF-8 text")
+    finally:
+        response.writer.close()
+
+    texts.append(text)
+    yield text
+    etag = response.headers.get("etag")
+    last_modified = response.headers.get("last-modified")
+
+    if etag or last_modified:
+        CALENDARS[url] = CachedCalendar(etag, last_modified, "".join(texts))
+        CALENDARS.move_to_end(url)
+
+        if len(CALENDARS) > CALENDARS_MAXSIZE:
+            CALENDARS.popitem(last=False)
+    else:
+        CALENDARS.pop(url, None)
+
+
+async def request_following_redirects(url, headers, deadline):
+    """Requests url with GET, following redirects up to MAX_REDIRECTS."""
+    for _ in range(MAX_REDIRECTS + 1):
+        response = await request(url, headers, deadline)
+
+        if response.status not in REDIRECT_STATUSES:
+            return response
+
+        response.writer.close()
+
+        if "location" not in response.headers:
+            raise FetchError("Redirect without a location")
+
+        url = redirect_url(url, response.headers["location"])
+        logging.debug("Calendar redirected to %s", url)
+
+    raise FetchError("Too many redirects fetching calendar")
+
+
+def redirect_url(url, location):
+    """Returns the URL a redirect leads to, refusing HTTPS downgrades.
+
+    Relative locations resolve against the scheme url is served over, as
+    urljoin does not know webcal URLs.
+    """
+    parts = urlsplit(url)
+    scheme = SCHEMES.get(parts.scheme.lower(), ("",))[0]
+    redirected = urljoin(parts._replace(scheme=scheme).geturl(), location)
+
+    if scheme == "https" and (
+        SCHEMES.get(urlsplit(redirected).scheme.lower(), ("",))[0] != "https"
+    ):
+        raise FetchError("Refusing redirect from HTTPS to {}".format(location))
+
+    return redirected
+
+
+async def request(url, headers, deadline):
+    """Sends a GET for url and reads the response status and headers.
+
+    Requests are HTTP/1.0 on a connection of their own, so bodies are
+    never chunked and end when the server closes the connection.
+    """
+    scheme, host, port, message = request_for(url, headers)
+    address = await resolve(host, port, deadline)
+    reader, writer = await within(
+        asyncio.open_connection(
+            address,
+            port,
+            ssl=ssl_context() if scheme == "https" else None,
+            server_hostname=host if scheme == "https" else None,
+            limit=MAX_HEADER_BYTES,
+        ),
+        deadline,
+    )
+
+    try:
+        writer.write(message)
+        await within(writer.drain(), deadline)
+
+        return await read_response(reader, writer, deadline)
+    except BaseException:
+        writer.close()
+        raise
+
+
+def request_for(url, headers):
+    """Returns the scheme, host, port and GET message for url.
+
+    Internationalized hosts are IDNA encoded and targets percent-quoted.
+    """
+    parts = urlsplit(url)
+
+    try:
+        scheme, port = SCHEMES[parts.scheme.lower()]
+        host = parts.hostname.encode("idna").decode("ascii")
+        port = parts.port or port
+        target = quote(parts.path or "/", safe=TARGET_SAFE) + (
+            "?" + quote(parts.query, safe=TARGET_SAFE) if parts.query else ""
+        )
+        fields = {
+            "Host": ("[{}]" if ":" in host else "{}").format(host)
+            + (":{}".format(parts.port) if parts.port else ""),
+            "User-Agent": USER_AGENT,
+            "Accept": "text/calendar, */*",
+            "Accept-Encoding": "identity",
+            "Connection": "close",
+        }
+        fields.update(headers)
+        message = "GET {} HTTP/1.0\r\n{}\r\n".format(
+            target,
+            "".join("{}: {}\r\n".format(*field) for field in fields.items()),
+        ).encode("latin-1")
+    except (AttributeError, KeyError, UnicodeError, ValueError):
+        raise FetchError("Unsupported calendar URL: {}".format(url))
+
+    return scheme, host, port, message
+
+
+async def resolve(host, port, deadline):
+    """Resolves host to the address to connect to.
+
+    Calendar URLs come from inbound email, so hosts resolving to any
+    loopback, private, link-local (instance metadata) or otherwise
+    non-public address are refused. Connecting to the checked address
+    keeps the host from resolving elsewhere in between.
+    """
+    addresses = [
+        info[4][0]
+        for info in await within(
+            asyncio.get_event_loop().getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            ),
+            deadline,
+        )
+    ]
+
+    if not addresses or not all(map(is_public, addresses)):
+        raise FetchError(
+            "Calendar host {} is not a public address".format(host)
+        )
+
+    return addresses[0]
+
+
+def is_public(address):
+    """Whether address is a globally routable unicast IP address."""
+    address = ipaddress.ip_address(address.partition("%")[0])
+
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+
+    return address.is_global and not address.is_multicast
+
+
+async def read_response(reader, writer, deadline):
+    """Reads the status line and headers of a response."""
+    try:
+        status_line = await within(reader.readline(), deadline)
+        status = int(status_line.decode("latin-1").split()[1])
+    except (IndexError, ValueError):
+        raise FetchError("Malformed HTTP status line")
+
+    headers = {}
+    size = 0
+
+    while True:
+        try:
+            line = await within(reader.readline(), deadline)
+        except ValueError:
+            line = b""
+            size = MAX_HEADER_BYTES
+
+        size += len(line)
+
+        if size >= MAX_HEADER_BYTES or not line.endswith(b"\n"):
+            raise FetchError("Malformed or oversized HTTP headers")
+
+        if line in (b"\r\n", b"\n"):
+            break
+
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return Response(status, headers, reader, writer)
+
+
+async def iter_body(response, deadline, max_bytes):
+    """Yields body bytes of response until its length or EOF."""
+    length = response.headers.get("content-length")
+
+    if "transfer-encoding" in response.headers:
+        raise FetchError("Unexpected Transfer-Encoding for HTTP/1.0")
+
+    if length is not None:
+        if not length.isdigit():
+            raise FetchError("Malformed Content-Length: {}".format(length))
+
+        length = int(length)
+
+        if length > max_bytes:
+            raise FetchError("Calendar exceeds {} bytes".format(max_bytes))
+
+    size = 0
+
+    while length is None or size < length:
+        data = await within(
+            response.reader.read(
+                READ_SIZE if length is None else min(length - size, READ_SIZE)
+            ),
+            deadline,
+        )
+
+        if not data:
+            if length is None:
+                return
+
+            raise FetchError("Calendar download ended early")
+
+        size += len(data)
+
+        if size > max_bytes:
+            raise FetchError("Calendar exceeds {} bytes".format(max_bytes))
+
+        yield data
+
+
+async def within(awaitable, deadline):
+    """Awaits awaitable, raising FetchError once deadline has passed."""
+    seconds = deadline - asyncio.get_event_loop().time()
+
+    try:
+        return await asyncio.wait_for(awaitable, max(seconds, 0))
+    except asyncio.TimeoutError:
+        raise FetchError("Calendar fetch timed out")
+    except OSError as error:
+        raise FetchError("Calendar fetch failed: {}".format(error))
+
+
+def ssl_context():
+    """Default SSL context, loaded once."""
+    if not SSL_CONTEXTS:
+        SSL_CONTEXTS.append(ssl.create_default_context())
+
+    return SSL_CONTEXTS[0]
@@ -1,23 +1,110 @@
 import logging
-import re
 import uuid
+from collections import OrderedDict, namedtuple
+from contextlib import nullcontext
 from datetime import datetime
+from hashlib import sha256
+from html import unescape
 from os import environ
-from urllib.request import urlopen
 
-from thirtyone.extract import (extract_field, extract_fields_by_method,
-                               extract_ical_from)
+from thirtyone.aws import mapped_s3_file_from
+from thirtyone.extract import (ExtractionBudget, extract_field,
+                               extract_fields_by_method, extract_ical_from,
+                               walk_mime)
+from thirtyone.fetch import fetch_calendar_now
 from thirtyone.sanitize import sanitize_field
+from thirtyone.tokenizer import iter_event_calendars
 
 logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
 logging.getLogger(__name__)
 
+# Fields stamped with the parse time, refreshed on parse cache hits
+PARSE_TIMESTAMPS = ("created", "dtstamp", "last_modified")
+# Fields whose changes matter to attendees; DTSTAMP, SEQUENCE and the parse
+# timestamps change on every re-send and are left out
+FINGERPRINT_FIELDS = (
+    "summary",
+    "description",
+    "location",
+    "dtstart",
+    "dtend",
+    "organizer",
+    "status",
+)
+# Fields compared without regard to case
+CASELESS_FINGERPRINT_FIELDS = ("organizer", "status")
+ICAL_TEMPLATE = (
+    "BEGIN:VCALENDAR\r\n"
+    + "PRODID:-//31Events//CalendarSnack//EN\r\n"
+    + "VERSION:2.0\r\n"
+    + "METHOD:{method}\r\n"
+    + "BEGIN:VEVENT\r\n"
+    + "{summary}\r\n"
+    + "{description}\r\n"
+    + "CLASS:PUBLIC\r\n"
+    + "DTSTART;TZID=Etc/GMT:{dtstart}\r\n"
+    + "DTEND;TZID=Etc/GMT:{dtend}\r\n"
+    + "{location}\r\n"
+    + "PRIORITY:0\r\n"
+    + "SEQUENCE:{sequence}\r\n"
+    + "STATUS:{status}\r\n"
+    + "{uid}\r\n"
+    + "DTSTAMP:{dtstamp}\r\n"
+    + "{recipient}\r\n"
+    + "{organizer}\r\n"
+    + "{mailto}\r\n"
+    + "TRANSP:{transp}\r\n"
+    + "STATUS:{status}\r\n"
+    + "X-THIRTYONE-USER-STATUS:FREE\r\n"
+    + "X-THIRTYONE-EVENT-STATUS:FREE\r\n"
+    + "BEGIN:VALARM\r\n"
+    + "ACTION:DISPLAY\r\n"
+    + "{tz_description}\r\n"
+    + "TRIGGER;RELATED=START:-PT15M\r\n"
+    + "END:VALARM\r\n"
+    + "END:VEVENT\r\n"
+    + "BEGIN:VTIMEZONE\r\n"
+    + "TZID:Etc/GMT\r\n"
+    + "TZURL:http://tzurl.org/zoneinfo/Etc/GMT\r\n"
+    + "X-LIC-LOCATION:Etc/GMT\r\n"
+    + "BEGIN:STANDARD\r\n"
+    + "TZOFFSETFROM:+0000\r\n"
+    + "TZOFFSETTO:+0000\r\n"
+    + "TZNAME:GMT\r\n"
+    + "DTSTART:16010101T000000\r\n"
+    + "RDATE:16010101T000000\r\n"
+    + "END:STANDARD\r\n"
+    + "END:VTIMEZONE\r\n"
+    + "END:VCALENDAR"
+)
+# Every recipient of an event shares the text around its ATTENDEE line
+ICAL_BEFORE_RECIPIENT, ICAL_AFTER_RECIPIENT = ICAL_TEMPLATE.split(
+    "{recipient}"
+)
+# Prepared icals per (uid, sequence), least recently used evicted first
+PREPARED_ICALS = OrderedDict()
+PREPARED_ICALS_MAXSIZE = 256
+
+# Content lines up to UNFOLDED_OCTETS stay whole. Longer ones keep
+# FIRST_LINE_OCTETS on their first line and CONTINUATION_OCTETS after the
+# space of every following line, within the 75 octets of RFC 5545.
+UNFOLDED_OCTETS = 70
+FIRST_LINE_OCTETS = 65
+CONTINUATION_OCTETS = 66
+FOLD = "\r\n "
+
+PreparedIcal = namedtuple(
+    "PreparedIcal", ("arguments", "before_recipient", "after_recipient")
+)
+
 
 class Ical:
     """31Events logic to ingest and build new ical data."""
 
-    def __init__(self):
+    def __init__(self, parse_cache=None, hardened=False):
         self.ical = {}
+        self.parse_cache = parse_cache
+        self.hardened = hardened
 
     def __repr__(self):
         """Print ical attributes as a string according to method."""
@@ -83,7 +170,7 @@ class Ical:
         self,
         description="",
         dtend=None,
-        dtstamp=datetime.strftime(datetime.now(), "%Y%m%dT%H%M%SZ"),
+        dtstamp=None,
         dtstart=None,
         location="",
         organizer="",
@@ -99,58 +186,100 @@ class Ical:
     ):
         """Build REQUEST ical."""
         logging.debug("Building ical")
-        ical = (
-            "BEGIN:VCALENDAR\r\n"
-            + "PRODID:-//31Events//CalendarSnack//EN\r\n"
-            + "VERSION:2.0\r\n"
-            + "METHOD:{method}\r\n"
-            + "BEGIN:VEVENT\r\n"
-            + "{summary}\r\n"
-            + "{description}\r\n"
-            + "CLASS:PUBLIC\r\n"
-            + "DTSTART;TZID=Etc/GMT:{dtstart}\r\n"
-            + "DTEND;TZID=Etc/GMT:{dtend}\r\n"
-            + "{location}\r\n"
-            + "PRIORITY:0\r\n"
-            + "SEQUENCE:{sequence}\r\n"
-            + "STATUS:{status}\r\n"
-            + "{uid}\r\n"
-            + "DTSTAMP:{dtstamp}\r\n"
-            + "{recipient}\r\n"
-            + "{organizer}\r\n"
-            + "{mailto}\r\n"
-            + "TRANSP:{transp}\r\n"
-            + "STATUS:{status}\r\n"
-            + "X-THIRTYONE-USER-STATUS:FREE\r\n"
-            + "X-THIRTYONE-EVENT-STATUS:FREE\r\n"
-            + "BEGIN:VALARM\r\n"
-            + "ACTION:DISPLAY\r\n"
-            + "{tz_description}\r\n"
-            + "TRIGGER;RELATED=START:-PT15M\r\n"
-            + "END:VALARM\r\n"
-            + "END:VEVENT\r\n"
-            + "BEGIN:VTIMEZONE\r\n"
-            + "TZID:Etc/GMT\r\n"
-            + "TZURL:http://tzurl.org/zoneinfo/Etc/GMT\r\n"
-            + "X-LIC-LOCATION:Etc/GMT\r\n"
-            + "BEGIN:STANDARD\r\n"
-            + "TZOFFSETFROM:+0000\r\n"
-            + "TZOFFSETTO:+0000\r\n"
-            + "TZNAME:GMT\r\n"
-            + "DTSTART:16010101T000000\r\n"
-            + "RDATE:16010101T000000\r\n"
-            + "END:STANDARD\r\n"
-            + "END:VTIMEZONE\r\n"
-            + "END:VCALENDAR"
-        ).format(
-            description=self.format_text_length("DESCRIPTION:" + description),
-            dtend=re.sub("Z", "", dtend),
+        prepared = self.prepare_ical_from(
+            description=description,
+            dtend=dtend,
             dtstamp=dtstamp,
-            dtstart=re.sub("Z", "", dtstart),
-            location=self.format_text_length("LOCATION:" + location),
-            mailto=self.format_text_length("X-YAHOO-YID:" + mailto),
+            dtstart=dtstart,
+            location=location,
+            organizer=organizer,
+            mailto=mailto,
             method=method,
-            organizer=self.format_text_length(
+            rsvp_email=rsvp_email,
+            sequence=sequence,
+            status=status,
+            summary=summary,
+            transp=transp,
+            uid=uid,
+        )
+
+        return self.splice_recipient(prepared, recipient)
+
+    def build_icals_for(self, recipients, **fields):
+        """Build a REQUEST ical per recipient, rendering the event once.
+
+        Takes the arguments of build_ical_from other than recipient.
+        """
+        logging.debug("Building icals")
+        prepared = self.prepare_ical_from(**fields)
+
+        return [
+            self.splice_recipient(prepared, recipient)
+            for recipient in recipients
+        ]
+
+    def prepare_ical_from(
+        self,
+        description="",
+        dtend=None,
+        dtstamp=None,
+        dtstart=None,
+        location="",
+        organizer="",
+        mailto=None,
+        method="REQUEST",
+        rsvp_email=None,
+        sequence=0,
+        status="CONFIRMED",
+        summary="",
+        transp="OPAQUE",
+        uid=None,
+    ):
+        """Render and fold a REQUEST ical except for its ATTENDEE line.
+
+        Prepared icals are kept per (uid, sequence), least recently used
+        evicted first. A key seen with other arguments renders again.
+        DTSTAMP defaults to the current UTC time.
+        """
+        if dtstamp is None:
+            dtstamp = datetime.strftime(datetime.utcnow(), "%Y%m%dT%H%M%SZ")
+
+        arguments = (
+            description,
+            dtend,
+            dtstamp,
+            dtstart,
+            location,
+            organizer,
+            mailto,
+            method,
+            rsvp_email,
+            sequence,
+            status,
+            summary,
+            transp,
+            uid,
+        )
+        key = (uid, sequence)
+        prepared = PREPARED_ICALS.get(key, None)
+
+        if prepared is not None and prepared.arguments == arguments:
+            PREPARED_ICALS.move_to_end(key)
+
+            return prepared
+
+        logging.debug("Preparing ical")
+        fields = {
+            "description": self.format_text_length(
+                "DESCRIPTION:" + description
+            ),
+            "dtend": dtend.replace("Z", ""),
+            "dtstamp": dtstamp,
+            "dtstart": dtstart.replace("Z", ""),
+            "location": self.format_text_length("LOCATION:" + location),
+            "mailto": self.format_text_length("X-YAHOO-YID:" + mailto),
+            "method": method,
+            "organizer": self.format_text_length(
                 "ORGANIZER;CN="
                 + organizer
                 + ";"
@@ -161,42 +290,40 @@ class Ical:
                 + "mailto:"
                 + rsvp_email
             ),
-            recipient=self.generate_attendee_field(recipient),
-            sequence=str(sequence),
-            status=status,
-            summary=self.format_text_length("SUMMARY:" + summary),
-            transp=transp,
-            tz_description=self.format_text_length("DESCRIPTION:" + summary),
-            uid=self.format_text_length("UID:" + uid),
+            "sequence": str(sequence),
+            "status": status,
+            "summary": self.format_text_length("SUMMARY:" + summary),
+            "transp": transp,
+            "tz_description": self.format_text_length(
+                "DESCRIPTION:" + summary
+            ),
+            "uid": self.format_text_length("UID:" + uid),
+        }
+        prepared = PreparedIcal(
+            arguments,
+            ICAL_BEFORE_RECIPIENT.format(**fields),
+            ICAL_AFTER_RECIPIENT.format(**fields),
         )
+        PREPARED_ICALS[key] = prepared
 
-        return ical
+        while len(PREPARED_ICALS) > PREPARED_ICALS_MAXSIZE:
+            PREPARED_ICALS.popitem(last=False)
+
+        return prepared
+
+    def splice_recipient(self, prepared, recipient):
+        """Join a prepared ical around the folded ATTENDEE line."""
+        return (
+            prepared.before_recipient
+            + self.generate_attendee_field(recipient)
+            + prepared.after_recipient
+        )
 
     def format_text_length(self, text):
         """Format text length."""
         logging.debug("Enforcing character boundary limits")
 
-        line_boundary = 70
-        visible_character_length = line_boundary - 5
-        visible_character_boundary = line_boundary - 4
-        final_text = ""
-
-        if len(text) <= line_boundary:
-            final_text = text
-        else:
-            final_text = "{initial_text}\r\n".format(
-                initial_text=text[:visible_character_length]
-            )
-            text = text[visible_character_length:]
-
-            while len(text) / visible_character_boundary > 1:
-                final_text += " {append_text}\r\n".format(
-                    append_text=text[:visible_character_boundary]
-                )
-                text = text[visible_character_boundary:]
-            final_text += " {append_text}".format(append_text=text[0:])
-
-        return final_text
+        return fold_line(text)
 
     def generate_attendee_field(self, email):
         """Generate attendee field."""
@@ -217,14 +344,22 @@ class Ical:
     def read_ical_from(
         self, text, from_email=True, uid=str(uuid.uuid4().hex)[:16]
     ):
-        """Read iCal."""
+        """Read iCal.
+
+        Hardened instances raise ExtractionTimeout once extraction exceeds
+        its budget. MIME decoding and shared calendar downloads are left
+        out of the budget; downloads have their own fetch limits.
+        """
         logging.debug("Reading ical: {}".format(uid))
         self.ical["uid"] = uid
 
         if from_email:
-            self.ical.update(self.get_return_path_from(text))
-            ical_header = extract_field("ical_header", data=text)
-            ical = extract_ical_from(text, header=ical_header)
+            message = walk_mime(text)
+
+            with self.extraction_budget():
+                self.ical.update(self.get_return_path_from(message.headers))
+
+            ical = extract_ical_from(message)
         else:
             ical = text
 
@@ -233,28 +368,159 @@ class Ical:
                 logging.debug("Shared calendar detected")
                 ical = self.get_shared_calendar_from(ical)
 
-            if self.get_method_from(ical) != "WINMAIL":
-                self.get_ical_fields(
-                    ical, sender=self.ical.get("return_path", "")
-                )
+                with self.extraction_budget():
+                    self.read_ical_fields(ical)
+            else:
+                with self.extraction_budget():
+                    self.read_ical_fields(ical, parse_cache=self.parse_cache)
 
         return self.ical
 
-    def get_return_path_from(self, email):
-        """Get return path from email."""
+    def read_ical_from_s3(self, bucket=None, key=None, s3=None, uid=None):
+        """Read iCal from a raw inbound email stored in S3.
+
+        The email is spooled to /tmp and walked through a read-only mmap
+        with bytes patterns, so memory stays flat however large its
+        attachments are.
+        """
+        if uid is None:
+            uid = uuid.uuid4().hex[:16]
+
+        with mapped_s3_file_from(bucket=bucket, key=key, s3=s3) as email:
+            return self.read_ical_from(email, uid=uid)
+
+    def extraction_budget(self):
+        """Per-document extraction budget, enforced when hardened."""
+        if self.hardened:
+            return ExtractionBudget()
+
+        return nullcontext()
+
+    def read_ical_fields(self, ical, parse_cache=None):
+        """Read ical fields, reusing cached fields for repeated payloads."""
+        sender = self.ical.get("return_path", "")
+        uid = self.ical.get("uid", None)
+
+        if parse_cache is not None:
+            key = parse_cache.key_for(ical, sender)
+            fields = parse_cache.get(key)
+
+            if fields is not None:
+                self.ical.update(fields)
+                self.refresh_parse_timestamps()
+
+                return self.ical
+
+        if self.get_method_from(ical) != "WINMAIL":
+            self.get_ical_fields(ical, sender=sender)
+
+        if parse_cache is not None:
+            fields = dict(self.ical)
+            fields.pop("return_path", None)
+
+            if fields.get("uid", None) == uid:
+                fields.pop("uid", None)
+
+            parse_cache.put(key, fields)
+
+        return self.ical
+
+    def refresh_parse_timestamps(self):
+        """Stamp parse time fields with the current time."""
+        current_time = datetime.strftime(datetime.now(), "%Y%m%dT%H%M%SZ")
+
+        for field in PARSE_TIMESTAMPS:
+            if field in self.ical:
+                self.ical[field] = current_time
+
+    def iter_events(self, text, sender=None):
+        """Lazily yield parsed fields for each VEVENT in a VCALENDAR.
+
+        Records carry the same fields as read_ical_from would for a
+        calendar holding only that VEVENT. Hardened instances budget each
+        VEVENT separately.
+        """
+        logging.debug("Iterating ical events")
+
+        if sender is None:
+            sender = self.ical.get("return_path", "")
+
+        for ical in iter_event_calendars(text):
+            event = {"uid": str(uuid.uuid4().hex)[:16]}
+
+            if self.ical.get("return_path", None):
+                event["return_path"] = self.ical["return_path"]
+
+            with self.extraction_budget():
+                event["method"] = extract_field("method", data=ical).get(
+                    "method", "REQUEST"
+                )
+
+                if event["method"] == "PUBLISH":
+                    event["method"] = "REQUEST"
+
+                event.update(
+                    extract_fields_by_method(
+                        event["method"], data=ical, sender=sender
+                    )
+                )
+
+            yield event
+
+    def fingerprint(self):
+        """Digest of the normalized semantic fields of the parsed event."""
+        digest = sha256()
+
+        for field in FINGERPRINT_FIELDS:
+            value = self.normalize_fingerprint_field(
+                field, self.ical.get(field, None)
+            )
+            digest.update(
+                "{field}={value}\0".format(field=field, value=value).encode(
+                    "utf-8", "surrogatepass"
+                )
+            )
+
+        return digest.hexdigest()
+
+    def normalize_fingerprint_field(self, field, value):
+        """Collapse whitespace, and case where it carries no meaning."""
+        if value is None:
+            return ""
+
+        value = " ".join(str(value).split())
+
+        if field in CASELESS_FINGERPRINT_FIELDS:
+            value = value.casefold()
+
+        return value
+
+    def has_material_change(self, previous_fingerprint):
+        """Tell whether the event changed beyond a cosmetic re-send.
+
+        Events without a previous fingerprint always count as changed.
+        """
+        return previous_fingerprint != self.fingerprint()
+
+    def get_return_path_from(self, headers):
+        """Get return path from email headers."""
         logging.debug("Extracting return_path from email")
-        return_path = extract_field("return_path", data=email)["return_path"]
+        return_path = extract_field("return_path", data=headers)["return_path"]
 
         return sanitize_field("return_path", data=return_path)
 
-    def get_shared_calendar_from(
-        self, attachment
-    ):  # pragma: no cover (R0201: Method could be a function (no-self-use))
-        """Get shared calendar from attachment."""
+    def get_shared_calendar_from(self, attachment):
+        """Get shared calendar from attachment.
+
+        Raises FetchError when the calendar cannot be downloaded within
+        the fetch time and size limits.
+        """
         logging.debug("Downloading ics")
-        download = extract_field("icalUrl", data=attachment)
 
-        return urlopen(download["icalUrl"]).read().decode("utf8") #nosec (temp fix, see https://stackoverflow.com/questions/48779202/audit-url-open-for-permitted-schemes-allowing-use-of-file-or-custom-schemes)
+        with self.extraction_budget():
+            download = extract_field("ical_url", data=attachment)
+
+        return fetch_calendar_now(unescape(download["ical_url"].strip()))
 
     def get_method_from(self, ical):
         """Get method from iCal."""
@@ -294,3 +560,108 @@ class Ical:
         for field in fields_to_lowercase:
             if self.ical.get(field, None):
                 self.ical[field] = self.ical[field].lower()
+
+
+def fold_line(text):
+    """Folds a content line into lines of at most 75 UTF-8 octets."""
+    if not text.isascii():
+        return fold_into(bytearray(), text).decode("utf-8", "surrogatepass")
+
+    if len(text) <= UNFOLDED_OCTETS:
+        return text
+
+    return FOLD.join(
+        [text[:FIRST_LINE_OCTETS]]
+        + [
+            text[start : start + CONTINUATION_OCTETS]
+            for start in range(
+                FIRST_LINE_OCTETS, len(text), CONTINUATION_OCTETS
+            )
+        ]
+    )
+
+
+def fold_into(buffer, text):
+    """Writes a content line folded like fold_line into a bytearray.
+
+    Makes one pass over the encoded line and breaks lines before a UTF-8
+    continuation byte rather than inside a multi-octet sequence.
+    """
+    data = memoryview(text.encode("utf-8", "surrogatepass"))
+
+    if len(data) <= UNFOLDED_OCTETS:
+        buffer += data
+
+        return buffer
+
+    end = sequence_start(data, FIRST_LINE_OCTETS)
+    buffer += data[:end]
+
+    while len(data) - end > CONTINUATION_OCTETS:
+        start = end
+        end = sequence_start(data, start + CONTINUATION_OCTETS)
+        buffer += b"\r\n "
+        buffer += data[start:end]
+
+    buffer += b"\r\n "
+    buffer += data[end:]
+
+    return buffer
+
+
+def sequence_start(data, position):
+    """Moves position back to the first byte of its UTF-8 sequence."""
+    while data[position] & 0xC0 == 0x80:
+        position -= 1
+
+    return position
+
+
+class ParseCache:
+    """Bounded LRU of parsed ical fields keyed by calendar payload digest."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key_for(self, ical, sender):
+        """Digest of calendar payload and the sender it was received from."""
+        digest = sha256(sender.lower().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(ical.encode("utf-8", "surrogatepass"))
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Get cached fields for key, or None."""
+        fields = self.entries.get(key, None)
+
+        if fields is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        return fields
+
+    def put(self, key, fields):
+        """Cache fields for key, evicting the least recently used entry."""
+        self.entries[key] = dict(fields)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        """Return cache statistics."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
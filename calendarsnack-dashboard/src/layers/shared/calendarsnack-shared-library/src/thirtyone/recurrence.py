@@ -0,0 +1,612 @@
+"""Expand recurring events."""
+
+import logging
+from bisect import bisect_left
+from calendar import monthrange
+from collections import OrderedDict, namedtuple
+from datetime import MAXYEAR, date, datetime, time, timedelta
+from heapq import merge
+from os import environ
+
+import pytz
+
+from thirtyone.timezone import (local_to_utc, resolve_embedded_timezone,
+                                 utc_to_local)
+from thirtyone.tokenizer import find_component, index_components
+
+logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
+logging.getLogger(__name__)
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("YEARLY", "MONTHLY", "WEEKLY", "DAILY")
+# RRULE parts understood by this module; any other part raises ValueError
+RULE_PARTS = (
+    "FREQ",
+    "INTERVAL",
+    "COUNT",
+    "UNTIL",
+    "BYDAY",
+    "BYMONTHDAY",
+    "BYMONTH",
+    "BYSETPOS",
+    "WKST",
+)
+# Years without an occurrence before a rule counts as exhausted; rules like
+# Monday, February 29th recur only every 28 to 40 years
+MAX_EMPTY_YEARS = 100
+# Expansions memoized per (uid, sequence), least recently used evicted first
+EXPANSIONS = OrderedDict()
+EXPANSIONS_MAXSIZE = 256
+
+Recurrence = namedtuple(
+    "Recurrence",
+    ("uid", "sequence", "dtstart", "tzid", "rule", "rdates", "exdates"),
+)
+Rule = namedtuple(
+    "Rule",
+    (
+        "freq",
+        "interval",
+        "count",
+        "until",
+        "byday",
+        "bymonthday",
+        "bymonth",
+        "bysetpos",
+        "wkst",
+    ),
+)
+
+
+def expand_recurrence(ical):
+    """Returns the memoized Expansion of the first VEVENT in ical.
+
+    Expansions are keyed by UID and SEQUENCE, which change whenever an
+    organizer updates the series, so repeated lookups of the same invite
+    reuse the occurrences expanded so far. Returns None without DTSTART.
+    """
+    index = index_components(ical)
+    key = (
+        read_property(index, "UID"),
+        int(read_property(index, "SEQUENCE") or 0),
+    )
+
+    if key[0] is not None and key in EXPANSIONS:
+        EXPANSIONS.move_to_end(key)
+
+        return EXPANSIONS[key]
+
+    recurrence = read_recurrence_from(index)
+
+    if recurrence is None:
+        return None
+
+    expansion = Expansion(recurrence)
+
+    if key[0] is not None:
+        EXPANSIONS[key] = expansion
+
+        while len(EXPANSIONS) > EXPANSIONS_MAXSIZE:
+            EXPANSIONS.popitem(last=False)
+
+    return expansion
+
+
+def read_recurrence(ical):
+    """Reads DTSTART, RRULE, RDATE and EXDATE of the first VEVENT."""
+    return read_recurrence_from(index_components(ical))
+
+
+def read_recurrence_from(index):
+    """Reads the recurrence of the first VEVENT of an indexed ical."""
+    logging.debug("Reading recurrence")
+    dtstart = read_content_line(index, "DTSTART")
+
+    if dtstart is None:
+        return None
+
+    start, tzid = parse_time(dtstart.value, read_tzid(dtstart.params))
+    rrule = read_property(index, "RRULE")
+
+    if tzid is not None:
+        # Custom TZIDs convert through the VTIMEZONE the ical carries
+        resolve_embedded_timezone(tzid, index)
+
+    return Recurrence(
+        uid=read_property(index, "UID"),
+        sequence=int(read_property(index, "SEQUENCE") or 0),
+        dtstart=start,
+        tzid=tzid,
+        rule=parse_rrule(rrule, start, tzid) if rrule else None,
+        rdates=read_times(index, "RDATE", start, tzid),
+        exdates=read_times(index, "EXDATE", start, tzid),
+    )
+
+
+def read_content_line(index, name):
+    """Returns the first content line named name owned by the VEVENT."""
+    owner = find_component(index, "VEVENT")
+
+    for position in index.names.get(name, []):
+        if owner is None or index.owners[position] == owner:
+            return index.content_lines[position]
+
+    return None
+
+
+def read_property(index, name):
+    """Returns the value of the VEVENT property name, or None."""
+    content_line = read_content_line(index, name)
+
+    return content_line.value.strip() if content_line else None
+
+
+def read_tzid(params):
+    """Reads the TZID parameter from content line parameters."""
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+
+        if name.upper() == "TZID":
+            return value.strip('"')
+
+    return None
+
+
+def read_times(index, name, start, tzid):
+    """Reads every RDATE or EXDATE value as an occurrence, sorted."""
+    owner = find_component(index, "VEVENT")
+    occurrences = []
+
+    for position in index.names.get(name, []):
+        if owner is not None and index.owners[position] != owner:
+            continue
+
+        content_line = index.content_lines[position]
+        line_tzid = read_tzid(content_line.params) or tzid
+
+        for value in content_line.value.split(","):
+            # PERIOD values occur at their start
+            value, line_tzid = parse_time(value.split("/")[0], line_tzid)
+            occurrences.append(
+                occurrence_for(value, start, line_tzid, tzid)
+            )
+
+    return sorted(occurrences)
+
+
+def parse_time(value, tzid=None):
+    """Parses an iCalendar DATE or DATE-TIME into a local value and TZID.
+
+    UTC values ending in Z get the UTC TZID; floating values keep tzid.
+    """
+    value = value.strip()
+
+    if len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d").date(), tzid
+
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ"), "UTC"
+
+    return datetime.strptime(value, "%Y%m%dT%H%M%S"), tzid
+
+
+def parse_rrule(value, start, tzid=None):
+    """Parses an RRULE value relative to the event start."""
+    parts = dict(
+        part.split("=", 1) for part in value.upper().split(";") if part
+    )
+    unsupported = set(parts) - set(RULE_PARTS)
+
+    if unsupported or parts.get("FREQ", None) not in FREQUENCIES:
+        raise ValueError(
+            "Unsupported RRULE: {}".format(
+                ", ".join(sorted(unsupported)) or parts.get("FREQ", None)
+            )
+        )
+
+    until = None
+
+    if parts.get("UNTIL", None):
+        until = local_until(parts["UNTIL"], start, tzid)
+
+    return Rule(
+        freq=parts["FREQ"],
+        interval=int(parts.get("INTERVAL", 1)),
+        count=int(parts["COUNT"]) if "COUNT" in parts else None,
+        until=until,
+        byday=tuple(
+            parse_weekday(day) for day in split_list(parts.get("BYDAY"))
+        ),
+        bymonthday=tuple(
+            int(day) for day in split_list(parts.get("BYMONTHDAY"))
+        ),
+        bymonth=tuple(
+            int(month) for month in split_list(parts.get("BYMONTH"))
+        ),
+        bysetpos=tuple(
+            int(position) for position in split_list(parts.get("BYSETPOS"))
+        ),
+        wkst=WEEKDAYS.index(parts.get("WKST", "MO")),
+    )
+
+
+def split_list(value):
+    """Splits a comma separated RRULE value."""
+    return value.split(",") if value else ()
+
+
+def parse_weekday(value):
+    """Parses a BYDAY entry like MO, 2TU or -1FR into (ordinal, weekday)."""
+    ordinal = value[:-2]
+
+    return (int(ordinal) if ordinal else None, WEEKDAYS.index(value[-2:]))
+
+
+def local_until(value, start, tzid):
+    """Converts UNTIL into the local time rule candidates are compared in."""
+    until, until_tzid = parse_time(value, tzid)
+
+    if isinstance(until, datetime) and until_tzid != tzid and tzid:
+        until = utc_to_local(until, tzid)
+
+    if not isinstance(until, datetime):
+        # Date bounds include the whole day
+        until = datetime.combine(until, time.max)
+
+    if not isinstance(start, datetime):
+        until = datetime.combine(until.date(), time.min)
+
+    return until
+
+
+def occurrence_for(value, start, tzid, start_tzid):
+    """Converts a local value into the kind of occurrence start yields.
+
+    All-day events yield dates and floating events yield naive local
+    datetimes. Events with a TZID or in UTC yield aware UTC datetimes,
+    localized like convert_to_utc does.
+    """
+    if not isinstance(start, datetime):
+        return value.date() if isinstance(value, datetime) else value
+
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+        tzid = start_tzid
+
+    if start_tzid is None:
+        return value
+
+    return local_to_utc(value, tzid or start_tzid).replace(tzinfo=pytz.utc)
+
+
+def iter_occurrences(recurrence):
+    """Lazily yields occurrences of a recurrence in chronological order."""
+    start = recurrence.dtstart
+    local_start = (
+        start
+        if isinstance(start, datetime)
+        else datetime.combine(start, time.min)
+    )
+
+    if recurrence.rule is None:
+        local_times = iter([local_start])
+    else:
+        local_times = iter_rule(local_start, recurrence.rule)
+
+    occurrences = (
+        occurrence_for(local_time, start, recurrence.tzid, recurrence.tzid)
+        for local_time in local_times
+    )
+    exdates = set(recurrence.exdates)
+    previous = None
+
+    for occurrence in merge(occurrences, recurrence.rdates):
+        if occurrence != previous and occurrence not in exdates:
+            yield occurrence
+
+        previous = occurrence
+
+
+def iter_rule(start, rule):
+    """Lazily yields local datetimes of an RRULE starting at start.
+
+    DTSTART always counts as the first occurrence, as RFC 5545 requires.
+    """
+    yield start
+    count = 1
+    last = start
+
+    for first_day, candidates in iter_periods(start, rule):
+        if first_day.year - last.year > MAX_EMPTY_YEARS:
+            return
+
+        for candidate in candidates:
+            if candidate <= start:
+                continue
+
+            if rule.count is not None and count >= rule.count:
+                return
+
+            if rule.until is not None and candidate > rule.until:
+                return
+
+            count += 1
+            last = candidate
+            yield candidate
+
+
+def iter_periods(start, rule):
+    """Yields the first day and sorted candidates of each FREQ period."""
+    expand_period = {
+        "DAILY": expand_day,
+        "MONTHLY": expand_month,
+        "WEEKLY": expand_week,
+        "YEARLY": expand_year,
+    }[rule.freq]
+    period = first_period(start, rule)
+
+    while True:
+        candidates = sorted(
+            {
+                datetime.combine(day, start.time())
+                for day in expand_period(period, start, rule)
+            }
+        )
+        yield first_day_of(period, rule), select_positions(
+            candidates, rule.bysetpos
+        )
+
+        try:
+            period = next_period(period, rule)
+        except (OverflowError, ValueError):
+            return
+
+
+def first_period(start, rule):
+    """Returns the period holding start: a year, month index or date."""
+    if rule.freq == "YEARLY":
+        return start.year
+
+    if rule.freq == "MONTHLY":
+        return start.year * 12 + start.month - 1
+
+    if rule.freq == "WEEKLY":
+        return start.date() - timedelta(
+            days=(start.weekday() - rule.wkst) % 7
+        )
+
+    return start.date()
+
+
+def first_day_of(period, rule):
+    """Returns the first day of a period."""
+    if rule.freq == "YEARLY":
+        return date(period, 1, 1)
+
+    if rule.freq == "MONTHLY":
+        return date(period // 12, period % 12 + 1, 1)
+
+    return period
+
+
+def next_period(period, rule):
+    """Returns the period INTERVAL periods after period."""
+    if rule.freq == "YEARLY":
+        if period + rule.interval > MAXYEAR:
+            raise OverflowError("Year out of range")
+
+        return period + rule.interval
+
+    if rule.freq == "MONTHLY":
+        if (period + rule.interval) // 12 > MAXYEAR:
+            raise OverflowError("Year out of range")
+
+        return period + rule.interval
+
+    if rule.freq == "WEEKLY":
+        return period + timedelta(weeks=rule.interval)
+
+    return period + timedelta(days=rule.interval)
+
+
+def expand_year(year, start, rule):
+    """Returns the days of year that match rule."""
+    if rule.byday and not rule.bymonth:
+        days = match_weekdays(days_between(year, 1, year, 12), rule.byday)
+
+        return [day for day in days if match_monthday(day, rule.bymonthday)]
+
+    if rule.bymonth:
+        months = rule.bymonth
+    elif rule.bymonthday:
+        months = range(1, 13)
+    else:
+        months = (start.month,)
+
+    return [
+        day
+        for month in sorted(months)
+        for day in month_days(year, month, start, rule)
+    ]
+
+
+def expand_month(period, start, rule):
+    """Returns the days of the month index period that match rule."""
+    year, month = divmod(period, 12)
+
+    if rule.bymonth and month + 1 not in rule.bymonth:
+        return []
+
+    return month_days(year, month + 1, start, rule)
+
+
+def expand_week(week, start, rule):
+    """Returns the days of the week starting on week that match rule."""
+    weekdays = {weekday for _, weekday in rule.byday} or {start.weekday()}
+    days = []
+
+    for offset in range(7):
+        day = week + timedelta(days=offset)
+
+        if day.weekday() in weekdays and match_month(day, rule.bymonth):
+            days.append(day)
+
+    return days
+
+
+def expand_day(day, start, rule):
+    """Returns day if it matches rule."""
+    weekdays = {weekday for _, weekday in rule.byday}
+
+    if (
+        (not weekdays or day.weekday() in weekdays)
+        and match_month(day, rule.bymonth)
+        and match_monthday(day, rule.bymonthday)
+    ):
+        return [day]
+
+    return []
+
+
+def month_days(year, month, start, rule):
+    """Returns the days of a month that match BYMONTHDAY and BYDAY."""
+    if not rule.byday and not rule.bymonthday:
+        if start.day > monthrange(year, month)[1]:
+            # Months without the start day are skipped, not clamped
+            return []
+
+        return [date(year, month, start.day)]
+
+    days = days_between(year, month, year, month)
+
+    if rule.byday:
+        days = match_weekdays(days, rule.byday)
+
+    return [day for day in days if match_monthday(day, rule.bymonthday)]
+
+
+def days_between(first_year, first_month, last_year, last_month):
+    """Returns every day from the first month through the last month."""
+    first = date(first_year, first_month, 1)
+    last = date(last_year, last_month, monthrange(last_year, last_month)[1])
+
+    return [
+        first + timedelta(days=offset)
+        for offset in range((last - first).days + 1)
+    ]
+
+
+def match_weekdays(days, byday):
+    """Returns days matching BYDAY, ordinals counted within days."""
+    matched = set()
+
+    for ordinal, weekday in byday:
+        candidates = [day for day in days if day.weekday() == weekday]
+
+        if ordinal is None:
+            matched.update(candidates)
+        elif 0 < ordinal <= len(candidates):
+            matched.add(candidates[ordinal - 1])
+        elif 0 < -ordinal <= len(candidates):
+            matched.add(candidates[ordinal])
+
+    return sorted(matched)
+
+
+def match_monthday(day, bymonthday):
+    """Tells whether day matches BYMONTHDAY, counting negatives from end."""
+    if not bymonthday:
+        return True
+
+    last = monthrange(day.year, day.month)[1]
+
+    return any(
+        day.day == (monthday if monthday > 0 else last + monthday + 1)
+        for monthday in bymonthday
+    )
+
+
+def match_month(day, bymonth):
+    """Tells whether day matches BYMONTH."""
+    return not bymonth or day.month in bymonth
+
+
+def select_positions(candidates, bysetpos):
+    """Applies BYSETPOS to the sorted candidates of one period."""
+    if not bysetpos:
+        return candidates
+
+    selected = set()
+
+    for position in bysetpos:
+        if 0 < position <= len(candidates):
+            selected.add(candidates[position - 1])
+        elif 0 < -position <= len(candidates):
+            selected.add(candidates[position])
+
+    return sorted(selected)
+
+
+class Expansion:
+    """Occurrences of a recurrence, expanded lazily and kept for reuse."""
+
+    def __init__(self, recurrence):
+        self.recurrence = recurrence
+        self.occurrences = []
+        self.pending = iter_occurrences(recurrence)
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, position):
+        """Yields occurrences from position, expanding on demand."""
+        while position < len(self.occurrences) or self.expand():
+            yield self.occurrences[position]
+            position += 1
+
+    def expand(self):
+        """Expands one more occurrence, or returns False once exhausted."""
+        if self.pending is None:
+            return False
+
+        occurrence = next(self.pending, None)
+
+        if occurrence is None:
+            self.pending = None
+
+            return False
+
+        self.occurrences.append(occurrence)
+
+        return True
+
+    def between(self, start, end):
+        """Yields occurrences from start up to, but excluding, end."""
+        while (
+            not self.occurrences or self.occurrences[-1] < start
+        ) and self.expand():
+            pass
+
+        for occurrence in self.iter_from(
+            bisect_left(self.occurrences, start)
+        ):
+            if occurrence >= end:
+                return
+
+            yield occurrence
+
+    def upcoming(self, count, after=None):
+        """Returns the next count occurrences, from after if given."""
+        if after is None:
+            occurrences = self.iter_from(0)
+        else:
+            while (
+                not self.occurrences or self.occurrences[-1] < after
+            ) and self.expand():
+                pass
+
+            occurrences = self.iter_from(
+                bisect_left(self.occurrences, after)
+            )
+
+        return [occurrence for _, occurrence in zip(range(count), occurrences)]
@@ -5,74 +5,184 @@ from os import environ
 logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
 logging.getLogger(__name__)
 
+ENTITIES = {"amp": "&", "nbsp": " "}
+MASK = "*" * 7
+UNFOLD = r"\r?\n[ \t]"
+# Backslash escaped commas and semicolons lose every backslash in one pass
+UNESCAPE = (r"\\+(?P<escaped>[,;])", r"\g<escaped>")
+TEXT_ESCAPES = r"&(?P<entity>nbsp|amp)\\?;|\\+(?P<escaped>[,;])"
+HTML_ESCAPES = r"\\+(?P<escaped>[n,;])"
+EMAIL_AT = (r"\s*([^@]*)@(([\w\-\=]*\.){1,}(\w+))\s*", "\\1[at]\\2")
+PRVS = (r"prvs=[^=\s@]+=", "")
+# Lookaheads reject positions that cannot start a match before the slower
+# alternatives are tried
+SIGNATURE = (
+    r"(?s)(?=[\s\\:-])((\\+\s*n\s*){1,}-\s*\\\s*n)?(\s*-)?\s*:\s*:\s*~"
+)
+TRAILING = r"(?s)(?=[\s\\])((\\r)?\\n|\s){1,}"
+TRAILING_NEWLINES = (TRAILING + "$", "")
+# Joins a column of values so each pass runs once over all of them.
+# Columns holding NUL run per value, as a pass could then form a SENTINEL.
+SENTINEL = "\n\x00"
+# Where $ matches in a value, found in a column joined by SENTINEL
+END_OF_VALUE = r"(?=\n?\n\x00|\n?\Z)"
+# Patterns rewritten so they neither match across SENTINEL nor past the
+# end of a value; passes missing here run value by value.
+BATCH_PATTERNS = {
+    UNFOLD: UNFOLD,
+    UNESCAPE[0]: UNESCAPE[0],
+    TEXT_ESCAPES: TEXT_ESCAPES,
+    HTML_ESCAPES: HTML_ESCAPES,
+    PRVS[0]: PRVS[0],
+    EMAIL_AT[0]: r"\s*([^@\x00]*)@(([\w\-\=]*\.){1,}(\w+))(?:\s(?!\x00))*",
+    SIGNATURE + ".*$": SIGNATURE + "[^\x00]*" + END_OF_VALUE,
+    TRAILING_NEWLINES[0]: TRAILING + END_OF_VALUE,
+}
 
-def sanitize_field(field, data):
-    """Sanitize field to standard format."""
-    logging.debug("Sanitizing {}".format(field))
+
+def unescape_text(match):
+    """Replace an HTML entity or drop the backslashes of an escape."""
+    if match.group("entity"):
+        return ENTITIES[match.group("entity")]
+
+    return match.group("escaped")
+
+
+def unescape_html(match):
+    """Replace escaped newlines with <br> and drop other backslashes."""
+    if match.group("escaped") == "n":
+        return "<br>"
+
+    return match.group("escaped")
+
+
+# Substitutions applied in order per field. Consecutive substitutions that
+# cannot feed each other share one alternation pass; the first, UNFOLD, is
+# skipped for values the tokenizer already unfolded.
+SANITIZE_PIPELINES = {
+    "attendee": ((UNFOLD, ""),),
+    "description": (
+        (UNFOLD, ""),
+        (SIGNATURE + ".*$", ""),
+        (TEXT_ESCAPES, unescape_text),
+        TRAILING_NEWLINES,
+    ),
+    "dtend": ((r"^(\d{8})$", "\\1T000000Z"),),
+    "dtstart": ((r"^(\d{8})$", "\\1T000000Z"),),
+    "html": ((UNFOLD, ""), (HTML_ESCAPES, unescape_html)),
+    "location": ((UNFOLD, ""), UNESCAPE),
+    "mailto": ((UNFOLD, ""), PRVS),
+    "name": (EMAIL_AT, UNESCAPE),
+    "organizer": ((UNFOLD, ""), EMAIL_AT, UNESCAPE, PRVS),
+    "org_mailto": ((UNFOLD, ""), PRVS),
+    "original_uid": ((UNFOLD, ""),),
+    "outlook_desktop": (
+        (r"(?<!<\\\\n>)(\\\\n\\\\n)(?!\\\\n)", "\\\\\\\\n"),
+        (r"(?<!<br>)(<br><br>)(?!<br>)", "<br>"),
+    ),
+    "partstat": ((UNFOLD, ""),),
+    "return_path": ((r"^.*<([^\>])", "\\1"), PRVS),
+    "summary": ((UNFOLD, ""), UNESCAPE, TRAILING_NEWLINES),
+}
+COMPILED_PIPELINES = {}
+COMPILED_BATCH_PATTERNS = {}
+
+
+def sanitize_field(field, data, unfolded=False):
+    """Sanitize field to standard format.
+
+    Values read from tokenized content lines are already unfolded; passing
+    unfolded=True skips the unfolding pass for them.
+    """
+    logging.debug("Sanitizing %s", field)
     result = {field: data}
-    sanitize_regex_for = {
-        "attendee": ((r"(?s)(\r)?\n( |\t)", ""),),
-        "description": (
-            (r"(?s)(\r)?\n( |\t)", ""),
-            (r"(?s)((\\+\s*n\s*){1,}-\s*\\\s*n)?(\s*-)?\s*:\s*:\s*~.*$", ""),
-            (r"&nbsp(\\)?;", " "),
-            (r"&amp(\\)?;", "&"),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-            (r"(?s)((\\r)?\\n|\s){1,}$", ""),
-        ),
-        "dtend": ((r"^(\d{8})$", "\\1T000000Z"),),
-        "dtstart": ((r"^(\d{8})$", "\\1T000000Z"),),
-        "html": (
-            (r"(?s)(\r)?\n( |\t)", ""),
-            (r"(\\){1,}n", "<br>"),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-        ),
-        "location": (
-            (r"(?s)(\r)?\n( |\t)", ""),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-        ),
-        "mailto": ((r"(?s)(\r)?\n( |\t)", ""), (r"prvs=[^=\s@]+=", "")),
-        "name": (
-            (r"\s*([^@]*)@(([\w\-\=]*\.){1,}(\w+))\s*", "\\1[at]\\2"),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-        ),
-        "organizer": (
-            (r"(?s)(\r)?\n( |\t)", ""),
-            (r"\s*([^@]*)@(([\w\-\=]*\.){1,}(\w+))\s*", "\\1[at]\\2"),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-            (r"prvs=[^=\s@]+=", ""),
-        ),
-        "org_mailto": ((r"(?s)(\r)?\n( |\t)", ""), (r"prvs=[^=\s@]+=", "")),
-        "original_uid": ((r"(?s)(\r)?\n( |\t)", ""),),
-        "outlook_desktop": (
-            (r"(?<!<\\\\n>)(\\\\n\\\\n)(?!\\\\n)", "\\\\\\\\n"),
-            (r"(?<!<br>)(<br><br>)(?!<br>)", "<br>"),
-        ),
-        "partstat": ((r"(?s)(\r)?\n( |\t)", ""),),
-        "return_path": ((r"^.*<([^\>])", "\\1"), (r"prvs=[^=\s@]+=", "")),
-        "summary": (
-            (r"(?s)(\r)?\n( |\t)", ""),
-            (r"(\\){1,},", ","),
-            (r"(\\){1,};", ";"),
-            (r"(?s)((\\r)?\\n|\s){1,}$", ""),
-        ),
-    }
-
-    if result[field] and sanitize_regex_for.get(field, None):
-        for index, regex in enumerate(sanitize_regex_for[field]):
-            result[field] = re.sub(
-                regex[0], regex[1], result.get(field, "None")
-            )
+
+    if result[field] and field in SANITIZE_PIPELINES:
+        for index, (regex, replacement) in enumerate(
+            compiled_pipeline_for(field)
+        ):
+            if unfolded and regex.pattern == UNFOLD:
+                continue
+
+            result[field] = regex.sub(replacement, result[field])
             logging.debug(
-                "Value: {value}\nRegex: {regex}".format(
-                    value=result[field],
-                    regex={"index": str(index), "regex": regex},
-                )
+                "Value: %s\nRegex: %s",
+                result[field],
+                {"index": str(index), "regex": regex.pattern},
             )
 
     return result
+
+
+def compiled_pipeline_for(field):
+    """Return the compiled substitutions of field, compiling them once."""
+    compiled = COMPILED_PIPELINES.get(field, None)
+
+    if compiled is None:
+        compiled = tuple(
+            (re.compile(regex), replacement)
+            for regex, replacement in SANITIZE_PIPELINES[field]
+        )
+        COMPILED_PIPELINES[field] = compiled
+
+    return compiled
+
+
+def sanitize_many(field, values, unfolded=False):
+    """Sanitize a column of values the way sanitize_field does each value.
+
+    Each pass runs once over all values joined by SENTINEL where it cannot
+    match across values, and value by value otherwise.
+    """
+    logging.debug("Sanitizing %s values", field)
+    values = list(values)
+
+    if field not in SANITIZE_PIPELINES:
+        return values
+
+    positions = [position for position, value in enumerate(values) if value]
+    texts = [values[position] for position in positions]
+    batchable = not any("\x00" in text for text in texts)
+
+    for regex, replacement in compiled_pipeline_for(field):
+        if unfolded and regex.pattern == UNFOLD:
+            continue
+
+        if batchable and regex.pattern in BATCH_PATTERNS:
+            texts = (
+                compiled_batch_pattern_for(regex.pattern)
+                .sub(replacement, SENTINEL.join(texts))
+                .split(SENTINEL)
+            )
+        else:
+            texts = [regex.sub(replacement, text) for text in texts]
+
+    for position, text in zip(positions, texts):
+        values[position] = text
+
+    return values
+
+
+def compiled_batch_pattern_for(pattern):
+    """Return the compiled batch form of pattern, compiling it once."""
+    compiled = COMPILED_BATCH_PATTERNS.get(pattern, None)
+
+    if compiled is None:
+        compiled = re.compile(BATCH_PATTERNS[pattern])
+        COMPILED_BATCH_PATTERNS[pattern] = compiled
+
+    return compiled
+
+
+def mask_many(values, emails=False):
+    """Mask a column of names, or of emails keeping their domain.
+
+    Public attendee lists only show the first character of each value.
+    """
+    if emails:
+        return [
+            value[0] + MASK + "@" + value.partition("@")[2]
+            for value in values
+        ]
+
+    return [value[0] + MASK for value in values]
@@ -0,0 +1,162 @@
+"""Cache and render email templates kept in CodeCommit or S3."""
+
+import logging
+import re
+from collections import namedtuple
+from os import environ
+from time import monotonic
+
+from thirtyone.clients import client
+
+logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
+logging.getLogger(__name__)
+
+# Seconds a template is used before revalidating it against its source
+TEMPLATE_SECONDS = float(environ.get("TEMPLATE_SECONDS", 300))
+PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+S3_PREFIX = "s3://"
+# Cached templates by repository and path
+TEMPLATES = {}
+# Default branch of each CodeCommit repository holding templates
+BRANCHES = {}
+
+# Literal text alternating with placeholder names, starting and ending with
+# literal text
+Template = namedtuple("Template", ("segments",))
+CachedTemplate = namedtuple(
+    "CachedTemplate", ("template", "version", "expires")
+)
+
+
+def get_template_for(path, repository=None, codecommit=None, s3=None):
+    """Returns the compiled template at path in repository.
+
+    repository is a CodeCommit repository name or an s3://bucket. Cached
+    templates are revalidated once TEMPLATE_SECONDS old, against the head
+    commit of the default branch or the S3 ETag, and only downloaded again
+    when that changed.
+    """
+    cached = TEMPLATES.get((repository, path))
+
+    if cached and monotonic() < cached.expires:
+        return cached.template
+
+    version = None
+
+    if cached:
+        version = read_template_version(repository, path, codecommit, s3)
+
+    if cached and version == cached.version:
+        logging.debug("Template unchanged: %s", path)
+        template = cached.template
+    else:
+        text, version = read_template(
+            repository, path, version, codecommit, s3
+        )
+        template = compile_template(text)
+
+    TEMPLATES[(repository, path)] = CachedTemplate(
+        template, version, monotonic() + TEMPLATE_SECONDS
+    )
+
+    return template
+
+
+def preload_templates_for(paths, repository=None, codecommit=None, s3=None):
+    """Loads a bundle of templates at init, all from the same commit.
+
+    Failures are logged and left for get_template_for to retry.
+    """
+    try:
+        version = (
+            None
+            if repository.startswith(S3_PREFIX)
+            else read_branch_head(repository, codecommit)
+        )
+
+        for path in paths:
+            text, path_version = read_template(
+                repository, path, version, codecommit, s3
+            )
+            TEMPLATES[(repository, path)] = CachedTemplate(
+                compile_template(text),
+                path_version,
+                monotonic() + TEMPLATE_SECONDS,
+            )
+    except Exception:  # pylint: disable=broad-except
+        logging.warning("Preloading templates failed", exc_info=True)
+
+
+def read_template(repository, path, version=None, codecommit=None, s3=None):
+    """Downloads a template, returning its text and version.
+
+    CodeCommit templates are read at commit version, or the default branch
+    head when None.
+    """
+    if repository.startswith(S3_PREFIX):
+        if s3 is None:
+            s3 = client("s3")
+
+        response = s3.get_object(Bucket=repository[len(S3_PREFIX) :], Key=path)
+
+        return response["Body"].read().decode("utf-8-sig"), response["ETag"]
+
+    if codecommit is None:
+        codecommit = client("codecommit")
+
+    if version is None:
+        response = codecommit.get_file(
+            repositoryName=repository, filePath=path
+        )
+    else:
+        response = codecommit.get_file(
+            repositoryName=repository, commitSpecifier=version, filePath=path
+        )
+
+    return response["fileContent"].decode("utf-8-sig"), response["commitId"]
+
+
+def read_template_version(repository, path, codecommit=None, s3=None):
+    """Returns the current version of a template without downloading it."""
+    if repository.startswith(S3_PREFIX):
+        if s3 is None:
+            s3 = client("s3")
+
+        return s3.head_object(
+            Bucket=repository[len(S3_PREFIX) :], Key=path
+        )["ETag"]
+
+    return read_branch_head(repository, codecommit)
+
+
+def read_branch_head(repository, codecommit=None):
+    """Returns the head commit id of the repository's default branch."""
+    if codecommit is None:
+        codecommit = client("codecommit")
+
+    if repository not in BRANCHES:
+        BRANCHES[repository] = codecommit.get_repository(
+            repositoryName=repository
+        )["repositoryMetadata"]["defaultBranch"]
+
+    return codecommit.get_branch(
+        repositoryName=repository, branchName=BRANCHES[repository]
+    )["branch"]["commitId"]
+
+
+def compile_template(text):
+    """Splits text into literal segments and {name} placeholders."""
+    return Template(tuple(PLACEHOLDER.split(text)))
+
+
+def render_template(template, **values):
+    """Renders template, keeping placeholders values has no value for."""
+    segments = list(template.segments)
+
+    for position in range(1, len(segments), 2):
+        name = segments[position]
+        segments[position] = (
+            values[name] if name in values else "{" + name + "}"
+        )
+
+    return "".join(segments)
@@ -1,27 +1,334 @@
 """Manage timezones."""
 
 import logging
-from datetime import datetime
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
 from os import environ
 
 import pytz
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover - batches convert value by value
+    numpy = None
+
 # Replace pytz with dateutil
 # https://assert.cc/posts/dateutil-preferred/
 
 logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
 logging.getLogger(__name__)
 
+WINDOWS_TIMEZONES = {
+    "AUS Central Standard Time": "Australia/Darwin",
+    "AUS Eastern Standard Time": "Australia/Sydney",
+    "Abu Dhabi, Muscat": "Asia/Dubai",
+    "Adelaide": "Australia/Adelaide",
+    "Afghanistan Standard Time": "Asia/Kabul",
+    "Alaska": "America/Anchorage",
+    "Alaskan Standard Time": "America/Anchorage",
+    "Aleutian Standard Time": "America/Adak",
+    "Altai Standard Time": "Asia/Barnaul",
+    "Amman": "Asia/Amman",
+    "Amsterdam, Berlin, Bern, Rome, Stockholm, Vienna": "Europe/Berlin",
+    "Anadyr, Petropavlovsk-Kamchatsky (RTZ 11)": "Asia/Kamchatka",
+    "Arab Standard Time": "Asia/Riyadh",
+    "Arabian Standard Time": "Asia/Dubai",
+    "Arabic Standard Time": "Asia/Baghdad",
+    "Argentina Standard Time": "America/Buenos_Aires",
+    "Arizona": "America/Phoenix",
+    "Ashgabat, Tashkent": "Asia/Tashkent",
+    "Astana": "Asia/Almaty",
+    "Astrakhan Standard Time": "Europe/Astrakhan",
+    "Asuncion": "America/Asuncion",
+    "Athens, Bucharest": "Europe/Bucharest",
+    "Atlantic Standard Time": "America/Halifax",
+    "Atlantic Time (Canada)": "America/Halifax",
+    "Auckland, Wellington": "Pacific/Auckland",
+    "Aus Central W. Standard Time": "Australia/Eucla",
+    "Azerbaijan Standard Time": "Asia/Baku",
+    "Azores Standard Time": "Atlantic/Azores",
+    "Azores": "Atlantic/Azores",
+    "Baghdad": "Asia/Baghdad",
+    "Bahia Standard Time": "America/Bahia",
+    "Baja California": "America/Tijuana",
+    "Baku": "Asia/Baku",
+    "Bangkok, Hanoi, Jakarta": "Asia/Bangkok",
+    "Bangladesh Standard Time": "Asia/Dhaka",
+    "Beijing, Chongqing, Hong Kong, Urumqi": "Asia/Shanghai",
+    "Beirut": "Asia/Beirut",
+    "Belarus Standard Time": "Europe/Minsk",
+    "Belgrade, Bratislava, Budapest, Ljubljana, Prague": "Europe/Budapest",
+    "Bogota, Lima, Quito, Rio Branco": "America/Bogota",
+    "Bougainville Standard Time": "Pacific/Bougainville",
+    "Brasilia": "America/Sao_Paulo",
+    "Brisbane": "Australia/Brisbane",
+    "Brussels, Copenhagen, Madrid, Paris": "Europe/Paris",
+    "Cabo Verde Is.": "Atlantic/Cape_Verde",
+    "Cairo": "Africa/Cairo",
+    "Canada Central Standard Time": "America/Regina",
+    "Canberra, Melbourne, Sydney": "Australia/Brisbane",
+    "Cape Verde Standard Time": "Atlantic/Cape_Verde",
+    "Caracas": "America/Caracas",
+    "Casablanca": "Africa/Casablanca",
+    "Caucasus Standard Time": "Asia/Yerevan",
+    "Cayenne, Fortaleza": "America/Cayenne",
+    "Cen. Australia Standard Time": "Australia/Adelaide",
+    "Central America Standard Time": "America/Guatemala",
+    "Central America": "America/Chicago",
+    "Central Asia Standard Time": "Asia/Almaty",
+    "Central Brazilian Standard Time": "America/Cuiaba",
+    "Central Europe Standard Time": "Europe/Budapest",
+    "Central European Standard Time": "Europe/Warsaw",
+    "Central Pacific Standard Time": "Pacific/Guadalcanal",
+    "Central Standard Time (Mexico)": "America/Mexico_City",
+    "Central Standard Time": "America/Chicago",
+    "Central Time (US & Canada)": "America/Chicago",
+    "Chatham Islands Standard Time": "Pacific/Chatham",
+    "Chennai, Kolkata, Mumbai, New Delhi": "Asia/Calcutta",
+    "Chetumal": "America/Cancun",
+    "Chihuahua, La Paz, Mazatlan": "America/Chihuahua",
+    "China Standard Time": "Asia/Shanghai",
+    "Chokurdakh (RTZ 10)": "Asia/Srednekolymsk",
+    "City of Buenos Aires": "America/Buenos_Aires",
+    "Coordinated Universal Time": "Etc/GMT",
+    "Coordinated Universal Time+12": "Etc/GMT-12",
+    "Coordinated Universal Time-02": "Etc/GMT+2",
+    "Coordinated Universal Time-11": "Etc/GMT+11",
+    "Cuba Standard Time": "America/Havana",
+    "Cuiaba": "America/Cuiaba",
+    "Damascus": "Asia/Damascus",
+    "Darwin": "Australia/Darwin",
+    "Dateline Standard Time": "Etc/GMT+12",
+    "Dhaka": "Asia/Dhaka",
+    "Dublin, Edinburgh, Lisbon, London": "Europe/London",
+    "E. Africa Standard Time": "Africa/Nairobi",
+    "E. Australia Standard Time": "Australia/Brisbane",
+    "E. Europe Standard Time": "Europe/Chisinau",
+    "E. Europe": "Europe/Chisinau",
+    "E. South America Standard Time": "America/Sao_Paulo",
+    "Easter Island Standard Time": "Pacific/Easter",
+    "Eastern Standard Time (Mexico)": "America/Cancun",
+    "Eastern Standard Time": "America/New_York",
+    "Eastern Time (US & Canada)": "America/New_York",
+    "Egypt Standard Time": "Africa/Cairo",
+    "Ekaterinburg (RTZ 4)": "Asia/Yekaterinburg",
+    "Ekaterinburg Standard Time": "Asia/Yekaterinburg",
+    "FLE Standard Time": "Europe/Kiev",
+    "Fiji Standard Time": "Pacific/Fiji",
+    "Fiji": "Pacific/Fiji",
+    "GMT Standard Time": "Europe/London",
+    "GTB Standard Time": "Europe/Bucharest",
+    "Georgetown, La Paz, Manaus, San Juan": "America/La_Paz",
+    "Georgian Standard Time": "Asia/Tbilisi",
+    "Greenland Standard Time": "America/Godthab",
+    "Greenland": "America/Godthab",
+    "Greenwich Standard Time": "Atlantic/Reykjavik",
+    "Guadalajara, Mexico City, Monterrey": "America/Mexico_City",
+    "Guam, Port Moresby": "Pacific/Port_Moresby",
+    "Haiti Standard Time": "America/Port-au-Prince",
+    "Harare, Pretoria": "Africa/Johannesburg",
+    "Hawaii": "Pacific/Honolulu",
+    "Hawaiian Standard Time": "Pacific/Honolulu",
+    "Helsinki, Kyiv, Riga, Sofia, Tallinn, Vilnius": "Europe/Kiev",
+    "Hobart": "Australia/Hobart",
+    "India Standard Time": "Asia/Calcutta",
+    "Indiana (East)": "America/Indianapolis",
+    "International Date Line West": "Etc/GMT+12",
+    "Iran Standard Time": "Asia/Tehran",
+    "Irkutsk (RTZ 7)": "Asia/Irkutsk",
+    "Islamabad, Karachi": "Asia/Karachi",
+    "Israel Standard Time": "Asia/Jerusalem",
+    "Istanbul": "Europe/Istanbul",
+    "Izhevsk, Samara (RTZ 3)": "Europe/Samara",
+    "Jerusalem": "Asia/Jerusalem",
+    "Jordan Standard Time": "Asia/Amman",
+    "Kabul": "Asia/Kabul",
+    "Kaliningrad (RTZ 1)": "Europe/Kaliningrad",
+    "Kaliningrad Standard Time": "Europe/Kaliningrad",
+    "Kathmandu": "Asia/Katmandu",
+    "Kiritimati Island": "Pacific/Kiritimati",
+    "Korea Standard Time": "Asia/Seoul",
+    "Krasnoyarsk (RTZ 6)": "Asia/Irkutsk",
+    "Kuala Lumpur, Singapore": "Asia/Singapore",
+    "Kuwait, Riyadh": "Asia/Riyadh",
+    "Libya Standard Time": "Africa/Tripoli",
+    "Line Islands Standard Time": "Pacific/Kiritimati",
+    "Lord Howe Standard Time": "Australia/Lord_Howe",
+    "Magadan Standard Time": "Asia/Magadan",
+    "Magadan": "Asia/Magadan",
+    "Magallanes Standard Time": "America/Punta_Arenas",
+    "Marquesas Standard Time": "Pacific/Marquesas",
+    "Mauritius Standard Time": "Indian/Mauritius",
+    "Middle East Standard Time": "Asia/Beirut",
+    "Minsk": "Europe/Minsk",
+    "Monrovia, Reykjavik": "Atlantic/Reykjavik",
+    "Montevideo Standard Time": "America/Montevideo",
+    "Montevideo": "America/Montevideo",
+    "Morocco Standard Time": "Africa/Casablanca",
+    "Moscow, St. Petersburg, Volgograd (RTZ 2)": "Europe/Moscow",
+    "Mountain Standard Time (Mexico)": "America/Chihuahua",
+    "Mountain Standard Time": "America/Denver",
+    "Mountain Time (US & Canada)": "America/Denver",
+    "Myanmar Standard Time": "Asia/Rangoon",
+    "N. Central Asia Standard Time": "Asia/Novosibirsk",
+    "Nairobi": "Africa/Nairobi",
+    "Namibia Standard Time": "Africa/Windhoek",
+    "Nepal Standard Time": "Asia/Katmandu",
+    "New Zealand Standard Time": "Pacific/Auckland",
+    "Newfoundland Standard Time": "America/St_Johns",
+    "Newfoundland": "America/St_Johns",
+    "Norfolk Standard Time": "Pacific/Norfolk",
+    "North Asia East Standard Time": "Asia/Irkutsk",
+    "North Asia Standard Time": "Asia/Krasnoyarsk",
+    "North Korea Standard Time": "Asia/Pyongyang",
+    "Novosibirsk (RTZ 5)": "Asia/Novosibirsk",
+    "Nuku’alofa": "Pacific/Tongatapu",
+    "Omsk Standard Time": "Asia/Omsk",
+    "Osaka, Sapporo, Tokyo": "Asia/Tokyo",
+    "Pacific SA Standard Time": "America/Santiago",
+    "Pacific Standard Time (Mexico)": "America/Tijuana",
+    "Pacific Standard Time": "America/Los_Angeles",
+    "Pacific Time (US & Canada)": "America/Los_Angeles",
+    "Pakistan Standard Time": "Asia/Karachi",
+    "Paraguay Standard Time": "America/Asuncion",
+    "Perth": "Australia/Perth",
+    "Port Louis": "Indian/Mauritius",
+    "Romance Standard Time": "Europe/Paris",
+    "Russia Time Zone 10": "Asia/Srednekolymsk",
+    "Russia Time Zone 11": "Asia/Kamchatka",
+    "Russia Time Zone 3": "Europe/Samara",
+    "Russian Standard Time": "Europe/Moscow",
+    "SA Eastern Standard Time": "America/Cayenne",
+    "SA Pacific Standard Time": "America/Bogota",
+    "SA Western Standard Time": "America/La_Paz",
+    "SE Asia Standard Time": "Asia/Bangkok",
+    "Saint Pierre Standard Time": "America/Miquelon",
+    "Sakhalin Standard Time": "Asia/Sakhalin",
+    "Salvador": "America/Bahia",
+    "Samoa Standard Time": "Pacific/Apia",
+    "Samoa": "Pacific/Apia",
+    "Santiago": "America/Santiago",
+    "Sao Tome Standard Time": "Africa/Sao_Tome",
+    "Sarajevo, Skopje, Warsaw, Zagreb": "Europe/Warsaw",
+    "Saratov Standard Time": "Europe/Saratov",
+    "Saskatchewan": "America/Regina",
+    "Seoul": "Asia/Seoul",
+    "Singapore Standard Time": "Asia/Singapore",
+    "Solomon Is., New Caledonia": "Pacific/Guadalcanal",
+    "South Africa Standard Time": "Africa/Johannesburg",
+    "Sri Jayawardenepura": "Asia/Colombo",
+    "Sri Lanka Standard Time": "Asia/Colombo",
+    "Sudan Standard Time": "Africa/Khartoum",
+    "Syria Standard Time": "Asia/Damascus",
+    "Taipei Standard Time": "Asia/Taipei",
+    "Taipei": "Asia/Taipei",
+    "Tasmania Standard Time": "Australia/Hobart",
+    "Tbilisi": "Asia/Tbilisi",
+    "Tehran": "Asia/Tehran",
+    "Tocantins Standard Time": "America/Araguaina",
+    "Tokyo Standard Time": "Asia/Tokyo",
+    "Tomsk Standard Time": "Asia/Tomsk",
+    "Tonga Standard Time": "Pacific/Tongatapu",
+    "Transbaikal Standard Time": "Asia/Chita",
+    "Tripoli": "Africa/Tripoli",
+    "Turkey Standard Time": "Europe/Istanbul",
+    "Turks And Caicos Standard Time": "America/Grand_Turk",
+    "US Eastern Standard Time": "America/Indianapolis",
+    "US Mountain Standard Time": "America/Phoenix",
+    "UTC": "Etc/GMT",
+    "UTC+12": "Etc/GMT-12",
+    "UTC+13": "Etc/GMT-13",
+    "UTC-02": "Etc/GMT+2",
+    "UTC-08": "Etc/GMT+8",
+    "UTC-09": "Etc/GMT+9",
+    "UTC-11": "Etc/GMT+11",
+    "Ulaanbaatar Standard Time": "Asia/Ulaanbaatar",
+    "Ulaanbaatar": "Asia/Ulaanbaatar",
+    "Venezuela Standard Time": "America/Caracas",
+    "Vladivostok Standard Time": "Asia/Vladivostok",
+    "Vladivostok, Magadan (RTZ 9)": "Asia/Vladivostok",
+    "W. Australia Standard Time": "Australia/Perth",
+    "W. Central Africa Standard Time": "Africa/Lagos",
+    "W. Europe Standard Time": "Europe/Berlin",
+    "W. Mongolia Standard Time": "Asia/Hovd",
+    "West Asia Standard Time": "Asia/Tashkent",
+    "West Bank Standard Time": "Asia/Hebron",
+    "West Central Africa": "Africa/Lagos",
+    "West Pacific Standard Time": "Pacific/Port_Moresby",
+    "Windhoek": "Africa/Windhoek",
+    "Yakutsk (RTZ 8)": "Asia/Yakutsk",
+    "Yakutsk Standard Time": "Asia/Yakutsk",
+    "Yangon (Rangoon)": "Asia/Rangoon",
+    "Yerevan": "Asia/Yerevan",
+}
 
-def convert_time_to_utc(time, timezone):
-    """Converts time to UTC."""
+# Zones clients send most often; they convert through a transition table
+HOT_TIMEZONES = (
+    "America/Anchorage",
+    "America/Chicago",
+    "America/Denver",
+    "America/Los_Angeles",
+    "America/Mexico_City",
+    "America/New_York",
+    "America/Phoenix",
+    "America/Sao_Paulo",
+    "America/Toronto",
+    "Asia/Calcutta",
+    "Asia/Singapore",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+    "Etc/GMT",
+    "Europe/Berlin",
+    "Europe/London",
+    "Europe/Madrid",
+    "Europe/Paris",
+    "Pacific/Auckland",
+    "Pacific/Honolulu",
+)
+LOCAL_TIME = re.compile(r"[0-9]{8}T[0-9]{6}")
+LOCAL_TIMES = re.compile(r"[0-9]{8}T[0-9]{6}(?:\n[0-9]{8}T[0-9]{6})*")
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+FIRST_SECOND = (datetime.min - EPOCH) // SECOND
+LAST_SECOND = (datetime.max - EPOCH) // SECOND
+# Spacing and size of transitions a table reproduces exactly
+ISOLATED = timedelta(days=3)
+LONGEST_JUMP = timedelta(hours=6)
+UTC_OFFSET = re.compile(r"([+-])([0-9]{2})([0-9]{2})([0-9]{2})?")
+# Last year embedded VTIMEZONE onsets are expanded to; later times keep the
+# offset of the last onset, like pytz zones do after 2037
+EMBEDDED_UNTIL_YEAR = 2100
+# Timezone names resolved so far, keyed by the name clients sent or by the
+# TZID of an embedded VTIMEZONE
+RESOLVED_TIMEZONES = {}
+# Transitions in seconds since the epoch as NumPy arrays, for batches
+TRANSITION_ARRAYS = {}
+
+# Zones built from an embedded VTIMEZONE have no pytz timezone and keep the
+# definition they were built from
+Resolved = namedtuple(
+    "Resolved", ["timezone", "transitions", "definition"], defaults=(None,)
+)
+# Wall-clock times each UTC offset applies from, for times from since on;
+# offsets[0] applies before starts[0] and offsets[index + 1] from
+# starts[index]
+Transitions = namedtuple("Transitions", ["since", "starts", "offsets"])
+
+
+def convert_time_to_utc(time, timezone, index=None):
+    """Converts time to UTC.
+
+    Passing the indexed ical lets TZIDs pytz does not know resolve from
+    their VTIMEZONE definition.
+    """
     logging.debug("Converting '%s' to UTC", timezone)
     event_time = {}
     for field in time:
         if "Z" not in time[field]:
-            _timezone = standardize_timezone_name(timezone)
             event_time[field] = convert_to_utc(
-                time=time[field], timezone=_timezone
+                time=time[field], timezone=timezone, index=index
             )
 
     return event_time
@@ -31,258 +338,475 @@ def standardize_timezone_name(timezone):
     """Converts timezone names to accepted standard for pytz."""
     logging.debug("Converting '%s' to accepted format", timezone)
 
-    timezones = {
-        "AUS Central Standard Time": "Australia/Darwin",
-        "AUS Eastern Standard Time": "Australia/Sydney",
-        "Abu Dhabi, Muscat": "Asia/Dubai",
-        "Adelaide": "Australia/Adelaide",
-        "Afghanistan Standard Time": "Asia/Kabul",
-        "Alaska": "America/Anchorage",
-        "Alaskan Standard Time": "America/Anchorage",
-        "Aleutian Standard Time": "America/Adak",
-        "Altai Standard Time": "Asia/Barnaul",
-        "Amman": "Asia/Amman",
-        "Amsterdam, Berlin, Bern, Rome, Stockholm, Vienna": "Europe/Berlin",
-        "Anadyr, Petropavlovsk-Kamchatsky (RTZ 11)": "Asia/Kamchatka",
-        "Arab Standard Time": "Asia/Riyadh",
-        "Arabian Standard Time": "Asia/Dubai",
-        "Arabic Standard Time": "Asia/Baghdad",
-        "Argentina Standard Time": "America/Buenos_Aires",
-        "Arizona": "America/Phoenix",
-        "Ashgabat, Tashkent": "Asia/Tashkent",
-        "Astana": "Asia/Almaty",
-        "Astrakhan Standard Time": "Europe/Astrakhan",
-        "Asuncion": "America/Asuncion",
-        "Athens, Bucharest": "Europe/Bucharest",
-        "Atlantic Standard Time": "America/Halifax",
-        "Atlantic Time (Canada)": "America/Halifax",
-        "Auckland, Wellington": "Pacific/Auckland",
-        "Aus Central W. Standard Time": "Australia/Eucla",
-        "Azerbaijan Standard Time": "Asia/Baku",
-        "Azores Standard Time": "Atlantic/Azores",
-        "Azores": "Atlantic/Azores",
-        "Baghdad": "Asia/Baghdad",
-        "Bahia Standard Time": "America/Bahia",
-        "Baja California": "America/Tijuana",
-        "Baku": "Asia/Baku",
-        "Bangkok, Hanoi, Jakarta": "Asia/Bangkok",
-        "Bangladesh Standard Time": "Asia/Dhaka",
-        "Beijing, Chongqing, Hong Kong, Urumqi": "Asia/Shanghai",
-        "Beirut": "Asia/Beirut",
-        "Belarus Standard Time": "Europe/Minsk",
-        "Belgrade, Bratislava, Budapest, Ljubljana, Prague": "Europe/Budapest",
-        "Bogota, Lima, Quito, Rio Branco": "America/Bogota",
-        "Bougainville Standard Time": "Pacific/Bougainville",
-        "Brasilia": "America/Sao_Paulo",
-        "Brisbane": "Australia/Brisbane",
-        "Brussels, Copenhagen, Madrid, Paris": "Europe/Paris",
-        "Cabo Verde Is.": "Atlantic/Cape_Verde",
-        "Cairo": "Africa/Cairo",
-        "Canada Central Standard Time": "America/Regina",
-        "Canberra, Melbourne, Sydney": "Australia/Brisbane",
-        "Cape Verde Standard Time": "Atlantic/Cape_Verde",
-        "Caracas": "America/Caracas",
-        "Casablanca": "Africa/Casablanca",
-        "Caucasus Standard Time": "Asia/Yerevan",
-        "Cayenne, Fortaleza": "America/Cayenne",
-        "Cen. Australia Standard Time": "Australia/Adelaide",
-        "Central America Standard Time": "America/Guatemala",
-        "Central America": "America/Chicago",
-        "Central Asia Standard Time": "Asia/Almaty",
-        "Central Brazilian Standard Time": "America/Cuiaba",
-        "Central Europe Standard Time": "Europe/Budapest",
-        "Central European Standard Time": "Europe/Warsaw",
-        "Central Pacific Standard Time": "Pacific/Guadalcanal",
-        "Central Standard Time (Mexico)": "America/Mexico_City",
-        "Central Standard Time": "America/Chicago",
-        "Central Time (US & Canada)": "America/Chicago",
-        "Chatham Islands Standard Time": "Pacific/Chatham",
-        "Chennai, Kolkata, Mumbai, New Delhi": "Asia/Calcutta",
-        "Chetumal": "America/Cancun",
-        "Chihuahua, La Paz, Mazatlan": "America/Chihuahua",
-        "China Standard Time": "Asia/Shanghai",
-        "Chokurdakh (RTZ 10)": "Asia/Srednekolymsk",
-        "City of Buenos Aires": "America/Buenos_Aires",
-        "Coordinated Universal Time": "Etc/GMT",
-        "Coordinated Universal Time+12": "Etc/GMT-12",
-        "Coordinated Universal Time-02": "Etc/GMT+2",
-        "Coordinated Universal Time-11": "Etc/GMT+11",
-        "Cuba Standard Time": "America/Havana",
-        "Cuiaba": "America/Cuiaba",
-        "Damascus": "Asia/Damascus",
-        "Darwin": "Australia/Darwin",
-        "Dateline Standard Time": "Etc/GMT+12",
-        "Dhaka": "Asia/Dhaka",
-        "Dublin, Edinburgh, Lisbon, London": "Europe/London",
-        "E. Africa Standard Time": "Africa/Nairobi",
-        "E. Australia Standard Time": "Australia/Brisbane",
-        "E. Europe Standard Time": "Europe/Chisinau",
-        "E. Europe": "Europe/Chisinau",
-        "E. South America Standard Time": "America/Sao_Paulo",
-        "Easter Island Standard Time": "Pacific/Easter",
-        "Eastern Standard Time (Mexico)": "America/Cancun",
-        "Eastern Standard Time": "America/New_York",
-        "Eastern Time (US & Canada)": "America/New_York",
-        "Egypt Standard Time": "Africa/Cairo",
-        "Ekaterinburg (RTZ 4)": "Asia/Yekaterinburg",
-        "Ekaterinburg Standard Time": "Asia/Yekaterinburg",
-        "FLE Standard Time": "Europe/Kiev",
-        "Fiji Standard Time": "Pacific/Fiji",
-        "Fiji": "Pacific/Fiji",
-        "GMT Standard Time": "Europe/London",
-        "GTB Standard Time": "Europe/Bucharest",
-        "Georgetown, La Paz, Manaus, San Juan": "America/La_Paz",
-        "Georgian Standard Time": "Asia/Tbilisi",
-        "Greenland Standard Time": "America/Godthab",
-        "Greenland": "America/Godthab",
-        "Greenwich Standard Time": "Atlantic/Reykjavik",
-        "Guadalajara, Mexico City, Monterrey": "America/Mexico_City",
-        "Guam, Port Moresby": "Pacific/Port_Moresby",
-        "Haiti Standard Time": "America/Port-au-Prince",
-        "Harare, Pretoria": "Africa/Johannesburg",
-        "Hawaii": "Pacific/Honolulu",
-        "Hawaiian Standard Time": "Pacific/Honolulu",
-        "Helsinki, Kyiv, Riga, Sofia, Tallinn, Vilnius": "Europe/Kiev",
-        "Hobart": "Australia/Hobart",
-        "India Standard Time": "Asia/Calcutta",
-        "Indiana (East)": "America/Indianapolis",
-        "International Date Line West": "Etc/GMT+12",
-        "Iran Standard Time": "Asia/Tehran",
-        "Irkutsk (RTZ 7)": "Asia/Irkutsk",
-        "Islamabad, Karachi": "Asia/Karachi",
-        "Israel Standard Time": "Asia/Jerusalem",
-        "Istanbul": "Europe/Istanbul",
-        "Izhevsk, Samara (RTZ 3)": "Europe/Samara",
-        "Jerusalem": "Asia/Jerusalem",
-        "Jordan Standard Time": "Asia/Amman",
-        "Kabul": "Asia/Kabul",
-        "Kaliningrad (RTZ 1)": "Europe/Kaliningrad",
-        "Kaliningrad Standard Time": "Europe/Kaliningrad",
-        "Kathmandu": "Asia/Katmandu",
-        "Kiritimati Island": "Pacific/Kiritimati",
-        "Korea Standard Time": "Asia/Seoul",
-        "Krasnoyarsk (RTZ 6)": "Asia/Irkutsk",
-        "Kuala Lumpur, Singapore": "Asia/Singapore",
-        "Kuwait, Riyadh": "Asia/Riyadh",
-        "Libya Standard Time": "Africa/Tripoli",
-        "Line Islands Standard Time": "Pacific/Kiritimati",
-        "Lord Howe Standard Time": "Australia/Lord_Howe",
-        "Magadan Standard Time": "Asia/Magadan",
-        "Magadan": "Asia/Magadan",
-        "Magallanes Standard Time": "America/Punta_Arenas",
-        "Marquesas Standard Time": "Pacific/Marquesas",
-        "Mauritius Standard Time": "Indian/Mauritius",
-        "Middle East Standard Time": "Asia/Beirut",
-        "Minsk": "Europe/Minsk",
-        "Monrovia, Reykjavik": "Atlantic/Reykjavik",
-        "Montevideo Standard Time": "America/Montevideo",
-        "Montevideo": "America/Montevideo",
-        "Morocco Standard Time": "Africa/Casablanca",
-        "Moscow, St. Petersburg, Volgograd (RTZ 2)": "Europe/Moscow",
-        "Mountain Standard Time (Mexico)": "America/Chihuahua",
-        "Mountain Standard Time": "America/Denver",
-        "Mountain Time (US & Canada)": "America/Denver",
-        "Myanmar Standard Time": "Asia/Rangoon",
-        "N. Central Asia Standard Time": "Asia/Novosibirsk",
-        "Nairobi": "Africa/Nairobi",
-        "Namibia Standard Time": "Africa/Windhoek",
-        "Nepal Standard Time": "Asia/Katmandu",
-        "New Zealand Standard Time": "Pacific/Auckland",
-        "Newfoundland Standard Time": "America/St_Johns",
-        "Newfoundland": "America/St_Johns",
-        "Norfolk Standard Time": "Pacific/Norfolk",
-        "North Asia East Standard Time": "Asia/Irkutsk",
-        "North Asia Standard Time": "Asia/Krasnoyarsk",
-        "North Korea Standard Time": "Asia/Pyongyang",
-        "Novosibirsk (RTZ 5)": "Asia/Novosibirsk",
-        "Nuku’alofa": "Pacific/Tongatapu",
-        "Omsk Standard Time": "Asia/Omsk",
-        "Osaka, Sapporo, Tokyo": "Asia/Tokyo",
-        "Pacific SA Standard Time": "America/Santiago",
-        "Pacific Standard Time (Mexico)": "America/Tijuana",
-        "Pacific Standard Time": "America/Los_Angeles",
-        "Pacific Time (US & Canada)": "America/Los_Angeles",
-        "Pakistan Standard Time": "Asia/Karachi",
-        "Paraguay Standard Time": "America/Asuncion",
-        "Perth": "Australia/Perth",
-        "Port Louis": "Indian/Mauritius",
-        "Romance Standard Time": "Europe/Paris",
-        "Russia Time Zone 10": "Asia/Srednekolymsk",
-        "Russia Time Zone 11": "Asia/Kamchatka",
-        "Russia Time Zone 3": "Europe/Samara",
-        "Russian Standard Time": "Europe/Moscow",
-        "SA Eastern Standard Time": "America/Cayenne",
-        "SA Pacific Standard Time": "America/Bogota",
-        "SA Western Standard Time": "America/La_Paz",
-        "SE Asia Standard Time": "Asia/Bangkok",
-        "Saint Pierre Standard Time": "America/Miquelon",
-        "Sakhalin Standard Time": "Asia/Sakhalin",
-        "Salvador": "America/Bahia",
-        "Samoa Standard Time": "Pacific/Apia",
-        "Samoa": "Pacific/Apia",
-        "Santiago": "America/Santiago",
-        "Sao Tome Standard Time": "Africa/Sao_Tome",
-        "Sarajevo, Skopje, Warsaw, Zagreb": "Europe/Warsaw",
-        "Saratov Standard Time": "Europe/Saratov",
-        "Saskatchewan": "America/Regina",
-        "Seoul": "Asia/Seoul",
-        "Singapore Standard Time": "Asia/Singapore",
-        "Solomon Is., New Caledonia": "Pacific/Guadalcanal",
-        "South Africa Standard Time": "Africa/Johannesburg",
-        "Sri Jayawardenepura": "Asia/Colombo",
-        "Sri Lanka Standard Time": "Asia/Colombo",
-        "Sudan Standard Time": "Africa/Khartoum",
-        "Syria Standard Time": "Asia/Damascus",
-        "Taipei Standard Time": "Asia/Taipei",
-        "Taipei": "Asia/Taipei",
-        "Tasmania Standard Time": "Australia/Hobart",
-        "Tbilisi": "Asia/Tbilisi",
-        "Tehran": "Asia/Tehran",
-        "Tocantins Standard Time": "America/Araguaina",
-        "Tokyo Standard Time": "Asia/Tokyo",
-        "Tomsk Standard Time": "Asia/Tomsk",
-        "Tonga Standard Time": "Pacific/Tongatapu",
-        "Transbaikal Standard Time": "Asia/Chita",
-        "Tripoli": "Africa/Tripoli",
-        "Turkey Standard Time": "Europe/Istanbul",
-        "Turks And Caicos Standard Time": "America/Grand_Turk",
-        "US Eastern Standard Time": "America/Indianapolis",
-        "US Mountain Standard Time": "America/Phoenix",
-        "UTC": "Etc/GMT",
-        "UTC+12": "Etc/GMT-12",
-        "UTC+13": "Etc/GMT-13",
-        "UTC-02": "Etc/GMT+2",
-        "UTC-08": "Etc/GMT+8",
-        "UTC-09": "Etc/GMT+9",
-        "UTC-11": "Etc/GMT+11",
-        "Ulaanbaatar Standard Time": "Asia/Ulaanbaatar",
-        "Ulaanbaatar": "Asia/Ulaanbaatar",
-        "Venezuela Standard Time": "America/Caracas",
-        "Vladivostok Standard Time": "Asia/Vladivostok",
-        "Vladivostok, Magadan (RTZ 9)": "Asia/Vladivostok",
-        "W. Australia Standard Time": "Australia/Perth",
-        "W. Central Africa Standard Time": "Africa/Lagos",
-        "W. Europe Standard Time": "Europe/Berlin",
-        "W. Mongolia Standard Time": "Asia/Hovd",
-        "West Asia Standard Time": "Asia/Tashkent",
-        "West Bank Standard Time": "Asia/Hebron",
-        "West Central Africa": "Africa/Lagos",
-        "West Pacific Standard Time": "Pacific/Port_Moresby",
-        "Windhoek": "Africa/Windhoek",
-        "Yakutsk (RTZ 8)": "Asia/Yakutsk",
-        "Yakutsk Standard Time": "Asia/Yakutsk",
-        "Yangon (Rangoon)": "Asia/Rangoon",
-        "Yerevan": "Asia/Yerevan",
-    }
-
-    return timezones.get(timezone, timezone)
-
-
-def convert_to_utc(time, timezone):
+    return WINDOWS_TIMEZONES.get(timezone, timezone)
+
+
+def convert_to_utc(time, timezone, index=None):
     """Converts time to UTC."""
     logging.debug("Converting to UTC")
-    _time = datetime.strptime(time, "%Y%m%dT%H%M%S")
-    _timezone = pytz.timezone(timezone)
-    utc_time = _timezone.localize(_time, is_dst=True).astimezone(pytz.utc)
+    _time = parse_local_time(time)
+
+    return local_to_utc(_time, timezone, index).strftime("%Y%m%dT%H%M%SZ")
+
+
+def parse_local_time(time):
+    """Parses a %Y%m%dT%H%M%S local time."""
+    if LOCAL_TIME.fullmatch(time):
+        return datetime(
+            int(time[0:4]),
+            int(time[4:6]),
+            int(time[6:8]),
+            int(time[9:11]),
+            int(time[11:13]),
+            int(time[13:15]),
+        )
+
+    return datetime.strptime(time, "%Y%m%dT%H%M%S")
+
+
+def convert_many_to_utc(times, timezone, epoch=False, index=None):
+    """Converts a column of local times the way convert_to_utc does each.
+
+    Returns UTC strings, or seconds since the epoch when epoch is True.
+    With NumPy installed the column converts in a few array operations;
+    columns it cannot take exactly convert value by value.
+    """
+    logging.debug("Converting local times in '%s' to UTC", timezone)
+    times = list(times)
+    utc_times = None
+
+    if numpy is not None and times:
+        utc_times = convert_array_to_utc(times, timezone, index)
+
+    if utc_times is None:
+        utc_times = [
+            local_to_utc(parse_local_time(time), timezone, index)
+            for time in times
+        ]
+
+        if epoch:
+            return [(time - EPOCH) // SECOND for time in utc_times]
+
+        return [time.strftime("%Y%m%dT%H%M%SZ") for time in utc_times]
+
+    if epoch:
+        return utc_times.tolist()
+
+    return format_utc_array(utc_times)
+
+
+def convert_array_to_utc(times, timezone, index=None):
+    """Returns UTC seconds since the epoch of local times as an array.
+
+    Returns None for columns holding a value that is not a valid plain
+    local time, one before the zone's table applies or one that converts
+    outside the datetime range.
+    """
+    joined = "\n".join(times)
+
+    if not LOCAL_TIMES.fullmatch(joined):
+        return None
+
+    digits = (
+        numpy.frombuffer((joined + "\n").encode("ascii"), numpy.uint8)
+        .reshape(-1, 16)
+        .astype(numpy.int64)
+        - ord("0")
+    )
+    year = read_number(digits, 0, 4)
+    month = read_number(digits, 4, 6)
+    day = read_number(digits, 6, 8)
+    hour = read_number(digits, 9, 11)
+    minute = read_number(digits, 11, 13)
+    second = read_number(digits, 13, 15)
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    first_days = months.astype("datetime64[D]")
+    month_days = ((months + 1).astype("datetime64[D]") - first_days).astype(
+        numpy.int64
+    )
+
+    if not (
+        (year >= 1).all()
+        and ((month >= 1) & (month <= 12)).all()
+        and ((day >= 1) & (day <= month_days)).all()
+        and (hour < 24).all()
+        and (minute < 60).all()
+        and (second < 60).all()
+    ):
+        return None
+
+    local_times = (
+        (first_days.astype(numpy.int64) + day - 1) * 86400
+        + hour * 3600
+        + minute * 60
+        + second
+    )
+    since, starts, offsets = transition_arrays_for(timezone, index)
+
+    if (local_times < since).any():
+        return None
+
+    utc_times = local_times - offsets[
+        numpy.searchsorted(starts, local_times, side="right")
+    ]
+
+    # Times that leave the datetime range raise converting value by value
+    if ((utc_times < FIRST_SECOND) | (utc_times > LAST_SECOND)).any():
+        return None
+
+    return utc_times
+
+
+def read_number(digits, start, end):
+    """Reads the decimal number in columns start to end of a digit array."""
+    number = digits[:, start]
+
+    for column in range(start + 1, end):
+        number = number * 10 + digits[:, column]
+
+    return number
+
+
+def transition_arrays_for(timezone, index=None):
+    """Returns the transitions of a zone in seconds as NumPy arrays.
+
+    Zones converted in batches get a table even when they are not hot.
+    """
+    resolved = resolve_timezone(timezone, index)
+    transitions = resolved.transitions or build_transitions(
+        resolved.timezone
+    )
+    source, arrays = TRANSITION_ARRAYS.get(timezone, (None, None))
+
+    # Embedded zones are rebuilt when another ical redefines their TZID
+    if arrays is None or (
+        resolved.definition is not None and source != resolved.definition
+    ):
+        since, starts, offsets = transitions
+        arrays = Transitions(
+            (since - EPOCH) // SECOND,
+            numpy.array(
+                [(start - EPOCH) // SECOND for start in starts], numpy.int64
+            ),
+            numpy.array([offset // SECOND for offset in offsets], numpy.int64),
+        )
+        TRANSITION_ARRAYS[timezone] = (resolved.definition, arrays)
+
+    return arrays
+
+
+def format_utc_array(utc_times):
+    """Formats UTC seconds since the epoch like convert_to_utc does."""
+    days = (utc_times // 86400).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    years = months.astype("datetime64[Y]").astype(numpy.int64) + 1970
+
+    if (years < 1000).any():
+        # strftime writes these years without padding
+        return [
+            (EPOCH + time * SECOND).strftime("%Y%m%dT%H%M%SZ")
+            for time in utc_times.tolist()
+        ]
+
+    seconds = utc_times % 86400
+    text = numpy.empty((len(utc_times), 16), numpy.uint8)
+    text[:, 8] = ord("T")
+    text[:, 15] = ord("Z")
+
+    for start, value, width in (
+        (0, years, 4),
+        (4, months.astype(numpy.int64) % 12 + 1, 2),
+        (6, (days - months).astype(numpy.int64) + 1, 2),
+        (9, seconds // 3600, 2),
+        (11, seconds // 60 % 60, 2),
+        (13, seconds % 60, 2),
+    ):
+        for place in range(width):
+            text[:, start + width - place - 1] = value // 10**place % 10 + 48
+
+    text = text.tobytes().decode("ascii")
+
+    return [text[index : index + 16] for index in range(0, len(text), 16)]
+
+
+def local_to_utc(time, timezone, index=None):
+    """Converts a naive local time to naive UTC.
+
+    Matches pytz localize with is_dst=True: ambiguous times take the
+    daylight saving offset and skipped times the offset after the jump.
+    Embedded VTIMEZONE zones follow the same rule.
+    """
+    resolved = resolve_timezone(timezone, index)
+
+    if resolved.transitions is None or time < resolved.transitions.since:
+        return (
+            resolved.timezone.localize(time, is_dst=True)
+            .astimezone(pytz.utc)
+            .replace(tzinfo=None)
+        )
+
+    _, starts, offsets = resolved.transitions
+
+    return time - offsets[bisect_right(starts, time)]
+
+
+def utc_to_local(time, timezone, index=None):
+    """Converts a naive UTC time to naive local time."""
+    resolved = resolve_timezone(timezone, index)
+
+    if resolved.timezone is not None:
+        return (
+            pytz.utc.localize(time)
+            .astimezone(resolved.timezone)
+            .replace(tzinfo=None)
+        )
+
+    _, starts, offsets = resolved.transitions
+    # Each start is read in the offset before it
+    instants = [start - offset for start, offset in zip(starts, offsets)]
+
+    return time + offsets[bisect_right(instants, time)]
+
+
+def resolve_timezone(timezone, index=None):
+    """Returns the pytz timezone and, for hot zones, its transitions.
+
+    Accepts Windows and IANA names and resolves each name once. TZIDs pytz
+    does not know resolve from their VTIMEZONE when index holds one.
+    """
+    resolved = RESOLVED_TIMEZONES.get(timezone, None)
+
+    if index is not None and (resolved is None or resolved.timezone is None):
+        resolved = resolve_embedded_timezone(timezone, index) or resolved
+
+    if resolved is None:
+        name = standardize_timezone_name(timezone)
+        _timezone = pytz.timezone(name)
+        resolved = Resolved(
+            _timezone,
+            build_transitions(_timezone) if name in HOT_TIMEZONES else None,
+        )
+        RESOLVED_TIMEZONES[timezone] = resolved
+
+    return resolved
+
+
+def resolve_embedded_timezone(timezone, index):
+    """Returns the zone the VTIMEZONE with TZID timezone defines, or None.
+
+    Names pytz knows are left to pytz. Zones are cached per TZID and rebuilt
+    when an ical defines a TZID differently, as Outlook names every custom
+    zone "Customized Time Zone".
+    """
+    if standardize_timezone_name(timezone) in pytz.all_timezones_set:
+        return None
+
+    definition = read_vtimezone(index, timezone)
+
+    if definition is None:
+        return None
+
+    resolved = RESOLVED_TIMEZONES.get(timezone, None)
+
+    if resolved is None or resolved.definition != definition:
+        transitions = build_embedded_transitions(definition)
+
+        if transitions is None:
+            return None
+
+        logging.debug("Resolved '%s' from its VTIMEZONE", timezone)
+        resolved = Resolved(None, transitions, definition)
+        RESOLVED_TIMEZONES[timezone] = resolved
+
+    return resolved
+
+
+def read_vtimezone(index, tzid):
+    """Returns the STANDARD and DAYLIGHT content lines of a VTIMEZONE.
+
+    Each observance is a tuple of its own content lines, in the order of
+    the ical. Returns None when no VTIMEZONE has TZID tzid.
+    """
+    for position, component in enumerate(index.components):
+        lines = range(component.first, component.last + 1)
+
+        if component.name == "VTIMEZONE" and any(
+            index.owners[line] == position
+            and index.content_lines[line].name == "TZID"
+            and index.content_lines[line].value.strip() == tzid
+            for line in lines
+        ):
+            return (
+                tuple(
+                    tuple(
+                        index.content_lines[line]
+                        for line in lines
+                        if index.owners[line] == child
+                    )
+                    for child in range(position + 1, len(index.components))
+                    if index.components[child].parent == position
+                    and index.components[child].name
+                    in ("STANDARD", "DAYLIGHT")
+                )
+                or None
+            )
+
+    return None
+
+
+def build_embedded_transitions(definition):
+    """Builds wall-clock transitions from VTIMEZONE observances.
+
+    Onsets are expanded from each observance's DTSTART, RRULE and RDATEs
+    up to EMBEDDED_UNTIL_YEAR. Returns None for a definition that cannot
+    be read.
+    """
+    onsets = []
+
+    for observance in definition:
+        try:
+            onsets.extend(read_onsets(observance))
+        except (KeyError, ValueError) as error:
+            logging.debug("Unreadable VTIMEZONE observance: %s", error)
+
+            return None
+
+    if not onsets:
+        return None
+
+    onsets.sort()
+    offsets = [onsets[0][1]]
+    starts = []
+
+    for instant, _, offset_to in onsets:
+        starts.append(instant + offsets[-1])
+        offsets.append(offset_to)
+
+    return Transitions(datetime.min, starts, offsets)
+
+
+def read_onsets(observance):
+    """Returns (UTC onset, offset from, offset to) of an observance."""
+    # recurrence converts its occurrences through this module
+    from thirtyone.recurrence import iter_rule, parse_rrule
+
+    properties = {}
+    rdates = []
+
+    for content_line in observance:
+        if content_line.name == "RDATE":
+            rdates.extend(content_line.value.split(","))
+        else:
+            properties.setdefault(content_line.name, content_line.value)
+
+    start = read_onset_time(properties["DTSTART"])
+    offset_from = parse_utc_offset(properties["TZOFFSETFROM"])
+    offset_to = parse_utc_offset(properties["TZOFFSETTO"])
+    local_onsets = [start]
+
+    if properties.get("RRULE", None):
+        parts = properties["RRULE"].strip().split(";")
+        until = None
+
+        # UNTIL is a UTC time here, so it bounds onsets read in offset_from
+        for part in parts:
+            if part.upper().startswith("UNTIL="):
+                until = read_onset_time(part[6:])
+
+                if part.strip().upper().endswith("Z"):
+                    until += offset_from
+
+        rule = parse_rrule(
+            ";".join(
+                part for part in parts if not part.upper().startswith("UNTIL=")
+            ),
+            start,
+        )
+        local_onsets = []
+
+        for onset in iter_rule(start, rule):
+            if onset.year > EMBEDDED_UNTIL_YEAR or (
+                until is not None and onset > until
+            ):
+                break
+
+            local_onsets.append(onset)
+
+    for rdate in rdates:
+        local_onsets.append(read_onset_time(rdate.split("/")[0]))
+
+    return [
+        (onset - offset_from, offset_from, offset_to)
+        for onset in local_onsets
+    ]
+
+
+def read_onset_time(value):
+    """Parses a VTIMEZONE DATE or DATE-TIME, dates starting at midnight."""
+    # recurrence converts its occurrences through this module
+    from thirtyone.recurrence import parse_time
+
+    onset, _ = parse_time(value)
+
+    if not isinstance(onset, datetime):
+        return datetime(onset.year, onset.month, onset.day)
+
+    return onset
+
+
+def parse_utc_offset(value):
+    """Parses a TZOFFSETFROM or TZOFFSETTO value like -0500."""
+    match = UTC_OFFSET.fullmatch(value.strip())
+
+    if match is None:
+        raise ValueError("Invalid UTC offset: {}".format(value))
+
+    sign, hours, minutes, seconds = match.groups()
+    offset = timedelta(
+        hours=int(hours), minutes=int(minutes), seconds=int(seconds or 0)
+    )
+
+    return -offset if sign == "-" else offset
+
+
+def build_transitions(timezone):
+    """Precomputes the wall-clock transitions of a pytz timezone.
+
+    A transition takes effect at its UTC instant read in the offset before
+    it, which covers both the repeated and the skipped hour. Times before
+    the last transition that would not localize that way keep using
+    localize.
+    """
+    transition_times = getattr(timezone, "_utc_transition_times", None)
+
+    if not transition_times:
+        return Transitions(datetime.min, [], [timezone.utcoffset(None)])
+
+    offsets = [info[0] for info in timezone._transition_info]
+    daylight = [bool(info[1]) for info in timezone._transition_info]
+    since = datetime.min
+
+    for index in range(1, len(offsets)):
+        # localize looks one day either side of a time and resolves skipped
+        # times six hours later, so only isolated transitions of up to six
+        # hours behave like the table. Repeated times take the daylight
+        # saving side, else the earlier one.
+        if (
+            index > 1
+            and transition_times[index] - transition_times[index - 1]
+            < ISOLATED
+            or abs(offsets[index] - offsets[index - 1]) > LONGEST_JUMP
+            or offsets[index] < offsets[index - 1]
+            and daylight[index]
+            and not daylight[index - 1]
+        ):
+            since = transition_times[index] + ISOLATED
 
-    return utc_time.strftime("%Y%m%dT%H%M%SZ")
+    return Transitions(
+        since,
+        [
+            transition_times[index] + offsets[index - 1]
+            for index in range(1, len(offsets))
+        ],
+        offsets,
+    )
@@ -0,0 +1,373 @@
+"""Tokenize iCalendar content lines."""
+
+import logging
+from collections import deque, namedtuple
+from itertools import chain
+from os import environ
+
+logging.basicConfig(level=environ.get("LOG_LEVEL", logging.INFO))
+logging.getLogger(__name__)
+
+ContentLine = namedtuple("ContentLine", ("name", "params", "value"))
+Component = namedtuple(
+    "Component", ("name", "start", "end", "first", "last", "parent")
+)
+ComponentIndex = namedtuple(
+    "ComponentIndex", ("content_lines", "components", "owners", "names")
+)
+
+
+def tokenize(ical):
+    """Tokenizes ical text into a list of unfolded content lines."""
+    logging.debug("Tokenizing ical")
+
+    return list(iter_content_lines(ical.split("\n")))
+
+
+def iter_content_lines(lines):
+    """Unfolds physical lines and yields content lines in one pass."""
+    for content_line, _, _ in iter_located_content_lines(lines):
+        yield content_line
+
+
+def iter_lines(text):
+    """Lazily yields the physical lines of text."""
+    start = 0
+    end = text.find("\n")
+
+    while end != -1:
+        yield text[start:end]
+        start = end + 1
+        end = text.find("\n", start)
+
+    yield text[start:]
+
+
+def iter_located_content_lines(lines):
+    """Yields content lines with the offsets of the text they span."""
+    folded = []
+    start = offset = 0
+
+    for line in lines:
+        length = len(line) + 1
+
+        if line[-1:] == "\r":
+            line = line[:-1]
+
+        if folded and line[:1] in (" ", "\t"):
+            folded.append(line[1:])
+            offset += length
+            continue
+
+        if folded:
+            content_line = split_content_line("".join(folded))
+
+            if content_line:
+                yield content_line, start, offset
+
+        folded = [line]
+        start = offset
+        offset += length
+
+    if folded:
+        content_line = split_content_line("".join(folded))
+
+        if content_line:
+            yield content_line, start, offset - 1
+
+
+def split_content_line(line):
+    """Splits NAME;PARAMS:VALUE content line, honoring quoted parameters."""
+    end = line.find(":")
+
+    if end < 1:
+        return None
+
+    quote = line.find('"', 0, end)
+
+    while quote != -1:
+        closing = line.find('"', quote + 1)
+
+        if closing == -1:
+            break
+
+        end = line.find(":", closing + 1)
+
+        if end == -1:
+            return None
+
+        quote = line.find('"', closing + 1, end)
+
+    name, _, params = line[:end].partition(";")
+
+    return ContentLine(name.upper(), params, line[end + 1 :])
+
+
+def index_components(ical):
+    """Tokenizes ical and records every BEGIN/END block in one pass.
+
+    Components keep the character offsets of the text they span and the
+    positions of their BEGIN and END content lines. Each content line is
+    owned by its innermost component, so a VEVENT's own properties can be
+    told apart from those of its VALARMs or of a VTIMEZONE.
+    """
+    logging.debug("Indexing ical components")
+    content_lines = []
+    components = []
+    owners = []
+    names = {}
+    stack = []
+
+    for content_line, start, end in iter_located_content_lines(
+        ical.split("\n")
+    ):
+        position = len(content_lines)
+        content_lines.append(content_line)
+        names.setdefault(content_line.name, []).append(position)
+
+        if content_line.name == "BEGIN":
+            components.append(
+                Component(
+                    content_line.value.strip().upper(),
+                    start,
+                    None,
+                    position,
+                    None,
+                    stack[-1] if stack else None,
+                )
+            )
+            stack.append(len(components) - 1)
+
+        owners.append(stack[-1] if stack else None)
+
+        if content_line.name == "END":
+            close_component(
+                components,
+                stack,
+                content_line.value.strip().upper(),
+                end=end,
+                last=position,
+            )
+
+    while stack:
+        close_component(
+            components,
+            stack,
+            components[stack[-1]].name,
+            end=len(ical),
+            last=len(content_lines) - 1,
+        )
+
+    return ComponentIndex(content_lines, components, owners, names)
+
+
+def close_component(components, stack, name, end, last):
+    """Closes the innermost open component named name and its children."""
+    if name not in (components[index].name for index in stack):
+        return
+
+    while stack:
+        index = stack.pop()
+        components[index] = components[index]._replace(end=end, last=last)
+
+        if components[index].name == name:
+            break
+
+
+def iter_event_calendars(ical):
+    """Lazily yields a standalone VCALENDAR for each VEVENT in ical.
+
+    Each yielded calendar carries the top-level calendar properties and
+    the VTIMEZONEs seen so far, followed by one VEVENT, so memory is
+    bounded by the largest event rather than by the whole feed. Events
+    with local times wait for the VTIMEZONEs they need, which may follow
+    them.
+    """
+    splitter = EventCalendarSplitter(ical)
+
+    return chain(
+        splitter.iter_calendars(len(ical)), splitter.release(final=True)
+    )
+
+
+class EventCalendarSplitter:
+    """Splits ical text fed in chunks into standalone VEVENT calendars.
+
+    Produces the calendars iter_event_calendars yields for the whole text,
+    each once the line after its END:VEVENT has arrived. Only the text of
+    components still open, and of events held back, is kept between
+    chunks.
+
+    Extraction converts local times through the first VTIMEZONE, so an
+    event with local times is held back until a VTIMEZONE and those of
+    every TZID it references have arrived, or the text ends. Events are
+    yielded in order.
+    """
+
+    def __init__(self, text=""):
+        self.text = text
+        # Offset of self.text in the whole ical, and how far it is split
+        self.base = 0
+        self.split = 0
+        self.properties = []
+        self.timezones = []
+        self.stack = []
+        # TZIDs of the VTIMEZONEs seen, and those the open VEVENT uses
+        self.tzids = set()
+        self.event_tzids = set()
+        self.event_local = False
+        # Complete VEVENTs waiting for timezones, in order
+        self.held = deque()
+
+    def feed(self, text):
+        """Adds text and returns the calendars it completes."""
+        self.text += text
+        calendars = list(self.iter_calendars(self.complete_lines_end()))
+        kept = min(
+            [
+                start
+                for component, start in self.stack
+                if component in ("VEVENT", "VTIMEZONE")
+            ]
+            + [self.split]
+        )
+        self.text = self.text[kept - self.base :]
+        self.base = kept
+
+        return calendars
+
+    def close(self):
+        """Returns the calendars completed by the end of the text."""
+        return list(self.iter_calendars(self.base + len(self.text))) + list(
+            self.release(final=True)
+        )
+
+    def complete_lines_end(self):
+        """Offset after the last line no folded line can still extend."""
+        start = self.split - self.base
+        end = len(self.text) - 1
+
+        while True:
+            end = self.text.rfind("\n", start, end)
+
+            if end == -1:
+                return self.split
+
+            if self.text[end + 1] not in " \t":
+                return self.base + end + 1
+
+    def iter_calendars(self, end):
+        """Yields the calendars completed by the text up to end."""
+        text = self.text
+        offset = self.split
+        first, last = offset - self.base, end - self.base
+        lines = text if (first, last) == (0, len(text)) else text[first:last]
+
+        for content_line, start, stop in iter_located_content_lines(
+            iter_lines(lines)
+        ):
+            if content_line.name == "BEGIN":
+                self.stack.append(
+                    (content_line.value.strip().upper(), offset + start)
+                )
+
+                if self.stack[-1][0] == "VEVENT":
+                    self.event_tzids = set()
+                    self.event_local = False
+            elif content_line.name == "END":
+                name = content_line.value.strip().upper()
+
+                if name not in (component for component, _ in self.stack):
+                    continue
+
+                component, start = self.stack.pop()
+
+                while component != name:
+                    component, start = self.stack.pop()
+
+                if name == "VEVENT":
+                    self.held.append(
+                        (
+                            text[start - self.base : first + stop].strip(),
+                            self.event_tzids,
+                            self.event_local,
+                        )
+                    )
+                elif name == "VTIMEZONE":
+                    self.timezones.append(
+                        text[start - self.base : first + stop].strip()
+                    )
+
+                for calendar in self.release():
+                    yield calendar
+            elif len(self.stack) == 1 and self.stack[0][0] == "VCALENDAR":
+                self.properties.append(join_content_line(content_line))
+            elif content_line.name in ("DTSTART", "DTEND") and (
+                self.stack and self.stack[-1][0] == "VEVENT"
+            ):
+                self.event_tzids.update(tzids_of(content_line))
+                self.event_local |= "Z" not in content_line.value
+            elif content_line.name == "TZID" and (
+                self.stack and self.stack[-1][0] == "VTIMEZONE"
+            ):
+                self.tzids.add(content_line.value.strip())
+
+        self.split = end
+
+    def release(self, final=False):
+        """Yields held back events in order while their timezones are in.
+
+        final releases every held back event, once the text has ended.
+        """
+        while self.held:
+            event, tzids, local = self.held[0]
+
+            if (
+                local
+                and not final
+                and not (self.timezones and tzids <= self.tzids)
+            ):
+                return
+
+            self.held.popleft()
+
+            yield "\r\n".join(
+                ["BEGIN:VCALENDAR"]
+                + self.properties
+                + self.timezones
+                + [event, "END:VCALENDAR"]
+            )
+
+
+def tzids_of(content_line):
+    """Returns the TZID parameters of content line."""
+    return {
+        value.strip().strip('"')
+        for name, _, value in (
+            param.partition("=") for param in content_line.params.split(";")
+        )
+        if name.strip().upper() == "TZID"
+    }
+
+
+def find_component(index, name):
+    """Returns position of the first component named name, or None."""
+    for position, component in enumerate(index.components):
+        if component.name == name:
+            return position
+
+    return None
+
+
+def join_content_line(content_line):
+    """Joins content line back into NAME;PARAMS:VALUE text."""
+    if content_line.params:
+        return (
+            content_line.name
+            + ";"
+            + content_line.params
+            + ":"
+            + content_line.value
+        )
+
+    return content_line.name + ":" + content_line.value
@@ -1 +1,6 @@
 """conftest.py."""
+
+from os import environ
+
+# Matches tox setenv; boto3 clients need a region
+environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
@@ -0,0 +1,119 @@
+"""Adversarial Extraction Test"""
+
+import re
+import signal
+from time import perf_counter
+
+import pytest
+from thirtyone import Ical
+from thirtyone.extract import (COMPILED_EXTRACTIONS, EXTRACTIONS,
+                               ExtractionBudget, ExtractionTimeout,
+                               extract_field)
+
+REPEAT = 10000
+# Seconds any extraction may take on REPEAT-sized hostile input; quadratic
+# patterns take tens of seconds here, linear ones a few milliseconds.
+TIME_BOUND = 0.5
+
+# Inputs that made extraction regexes backtrack super-linearly, by field
+ADVERSARIAL = {
+    "description": ("DESCRIPTION;LANGUAGE=" * REPEAT,),
+    "dtstart": (
+        "BEGIN:VEVENT" * REPEAT,
+        "BEGIN:VEVENT" + "DTSTART;" * REPEAT,
+        "BEGIN:VEVENT\r\n" + "DTSTART;TZID=x\r\n" * REPEAT,
+    ),
+    "ical_header": ("Content-Type: application/ics" * REPEAT,),
+    "ical_payload": (
+        "Content-Type: text/calendar" * REPEAT,
+        "Content-Type: application/ics\r\n" * REPEAT,
+        "BEGIN:VCALENDAR" * REPEAT,
+    ),
+    "ical_url": ("<IcalUrl>" * REPEAT, "<IcalUrl\n" * REPEAT),
+    "location": ("LOCATION;LANGUAGE=" * REPEAT,),
+    "name": (
+        "CN=" * REPEAT,
+        "CN=a;" * REPEAT,
+        "EMAIL=" + ":mailto:a@" * REPEAT,
+        "CN=a:mailto:a@" + "a." * REPEAT + "!",
+        "CN=a:mailto:a@" + "a\n " * REPEAT,
+    ),
+    "organizer": (
+        ";EMAIL=:" * REPEAT,
+        "a;EMAIL=" * REPEAT,
+        "a;SENT-BY=" + ":mailto:a@" * REPEAT,
+        "a;EMAIL=:mailto:a@b.c" + ";EMAIL=" * REPEAT,
+        "mailto:a@" + "a." * REPEAT + "!",
+        "ORGANIZER;CN=a;EMAIL=a\r\n" * REPEAT,
+    ),
+    "original_uid": ("UID;LANGUAGE=" * REPEAT,),
+    "return_path": (
+        "Reply-To: " + " " * REPEAT + "x",
+        "Reply-To: " + "a " * REPEAT,
+        "Reply-To: x\r\n " * REPEAT,
+    ),
+    "summary": ("SUMMARY;LANGUAGE=" * REPEAT,),
+    "uid": ("UID" * REPEAT, "UIDa" * REPEAT),
+}
+
+
+@pytest.mark.parametrize(
+    "field,data",
+    [(field, data) for field in ADVERSARIAL for data in ADVERSARIAL[field]],
+)
+def test_extract_field_is_bounded_on_adversarial_input(field, data):
+    start = perf_counter()
+    extract_field(field, data)
+
+    assert perf_counter() - start < TIME_BOUND
+
+
+@pytest.mark.parametrize("field", sorted(EXTRACTIONS))
+def test_every_field_is_bounded_on_the_adversarial_corpus(field):
+    start = perf_counter()
+
+    for inputs in ADVERSARIAL.values():
+        for data in inputs:
+            extract_field(field, data)
+
+    assert perf_counter() - start < TIME_BOUND * 4
+
+
+def test_extraction_budget_fails_fast_on_input_size():
+    with pytest.raises(ExtractionTimeout):
+        with ExtractionBudget(max_chars=REPEAT):
+            extract_field("organizer", data="a;EMAIL=" * REPEAT)
+
+
+def test_extraction_budget_interrupts_runaway_regex(monkeypatch):
+    monkeypatch.setitem(
+        COMPILED_EXTRACTIONS, "method", (re.compile(r"(a+)+$"),)
+    )
+    start = perf_counter()
+
+    with pytest.raises(ExtractionTimeout):
+        with ExtractionBudget(seconds=0.05):
+            extract_field("method", data="a" * 64 + "!")
+
+    assert perf_counter() - start < TIME_BOUND
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+def test_hardened_ical_matches_default_extraction():
+    ical = (
+        "BEGIN:VCALENDAR\r\n"
+        + "METHOD:CANCEL\r\n"
+        + "PRODID:-//Feed//EN\r\n"
+        + "BEGIN:VEVENT\r\n"
+        + "UID:cancelled@example.com\r\n"
+        + 'ORGANIZER;CN=Jane;SENT-BY="mailto:a@example.com":mailto:jane@ex\r\n'
+        + " ample.com\r\n"
+        + "END:VEVENT\r\n"
+        + "END:VCALENDAR"
+    )
+    handler = signal.getsignal(signal.SIGALRM)
+
+    assert Ical(hardened=True).read_ical_from(
+        ical, from_email=False, uid="hardened"
+    ) == Ical().read_ical_from(ical, from_email=False, uid="hardened")
+    assert signal.getsignal(signal.SIGALRM) is handler
@@ -0,0 +1,333 @@
+"""AWS Test"""
+
+import threading
+import time
+from copy import deepcopy
+from io import BytesIO
+
+import boto3
+import pytest
+from thirtyone import aws as _aws
+from thirtyone.aws import (BatchGetError, deserializer_for,
+                           get_dynamodb_records_for, get_value_from_dynamodb,
+                           mapped_s3_file_from, send_ses_invites_to_attendees)
+
+ITEMS = [
+    {
+        "uid": {"S": "abc"},
+        "created": {"N": "1704186000"},
+        "rsvp": {"BOOL": True},
+        "notes": {"NULL": True},
+        "tags": {"L": [{"S": "a"}, {"N": "1.5"}]},
+        "venue": {"M": {"seats": {"N": "40"}, "open": {"BOOL": False}}},
+    },
+    {"uid": {"S": "def"}, "created": {"N": "1.5"}},
+]
+
+
+class StubS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket=None, Key=None):
+        return {"Body": BytesIO(self.objects[(Bucket, Key)])}
+
+
+def test_mapped_s3_file_from_spools_object():
+    s3 = StubS3({("inbox", "email"): b"From: jane@example.com\r\n" * 1000})
+
+    with mapped_s3_file_from(bucket="inbox", key="email", s3=s3) as email:
+        assert len(email) == 24000
+        assert email[:22] == b"From: jane@example.com"
+        assert email.find(b"jane", 24) == 30
+
+
+def test_mapped_s3_file_from_empty_object():
+    s3 = StubS3({("inbox", "empty"): b""})
+
+    with mapped_s3_file_from(bucket="inbox", key="empty", s3=s3) as email:
+        assert email == b""
+
+
+def test_deserializer_for_converts_pages_without_mutating_them():
+    items = deepcopy(ITEMS)
+    schema = {
+        "uid": "S",
+        "created": "N",
+        "rsvp": "BOOL",
+        "notes": "NULL",
+        "tags": "L",
+        "venue": "M",
+    }
+    expected = [
+        {
+            "uid": "abc",
+            "created": 1704186000,
+            "rsvp": True,
+            "notes": None,
+            "tags": ["a", 1.5],
+            "venue": {"seats": 40, "open": False},
+        },
+        # Numbers that are not integral take the value by value path
+        dict(dict.fromkeys(schema), uid="def", created=1.5),
+    ]
+
+    assert deserializer_for(schema)(items) == expected
+    assert deserializer_for("uid, created, tags")(items) == [
+        {key: row[key] for key in ("uid", "created", "tags")}
+        for row in expected
+    ]
+    assert deserializer_for(["uid", "created"], tuples=True)(items) == [
+        ("abc", 1704186000),
+        ("def", 1.5),
+    ]
+    assert deserializer_for(schema) is deserializer_for(schema)
+    assert items == ITEMS
+
+
+def test_get_value_from_dynamodb_keeps_value():
+    value = {"N": "7"}
+
+    assert get_value_from_dynamodb("count", value) == {"count": 7}
+    assert value == {"N": "7"}
+
+
+class StubDynamoDB:
+    """Serves items by key, leaving half the keys of early calls unprocessed."""
+
+    def __init__(self, items, partial_calls=2):
+        self.items = items
+        self.partial_calls = partial_calls
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def batch_get_item(self, RequestItems=None, ReturnConsumedCapacity=None):
+        ((table, request),) = RequestItems.items()
+        keys = [(key["pk"]["S"], key["sk"]["S"]) for key in request["Keys"]]
+
+        with self.lock:
+            self.calls.append(keys)
+            partial = len(self.calls) <= self.partial_calls
+
+        assert len(keys) <= 100 and len(set(keys)) == len(keys)
+        split = len(keys) // 2 if partial else len(keys)
+        processed, unprocessed = keys[:split], keys[split:]
+
+        return {
+            "Responses": {
+                table: [
+                    self.items[key] for key in processed if key in self.items
+                ]
+            },
+            "UnprocessedKeys": {
+                table: {
+                    "Keys": [
+                        {"pk": {"S": primary}, "sk": {"S": secondary}}
+                        for primary, secondary in unprocessed
+                    ]
+                }
+            }
+            if unprocessed
+            else {},
+        }
+
+
+def event_item(number):
+    return {
+        "pk": {"S": "event#{}".format(number)},
+        "sk": {"S": "event#{}".format(number)},
+        "seats": {"N": str(number)},
+    }
+
+
+def test_get_dynamodb_records_for_batches_and_keeps_key_order(monkeypatch):
+    delays = []
+    monkeypatch.setattr(_aws, "sleep", delays.append)
+    dynamodb = StubDynamoDB(
+        {
+            ("event#{}".format(number),) * 2: event_item(number)
+            for number in range(250)
+        }
+    )
+    keys = ["event#{}".format(number) for number in range(260, -1, -1)]
+    keys += [("event#7", "event#7"), ("event#7", "missing")]
+
+    records = get_dynamodb_records_for(
+        keys, dynamodb=dynamodb, dynamodb_table="events"
+    )
+
+    assert [record.get("seats") for record in records] == (
+        [None] * 11 + list(range(249, -1, -1)) + [7, None]
+    )
+    # Three chunks of up to 100 unique keys, and a retry after each delay
+    assert max(len(keys) for keys in dynamodb.calls) == 100
+    assert len(delays) == len(dynamodb.calls) - 3 >= 2
+    # Two partial calls retry a chunk at most twice
+    assert all(0 <= delay <= 2 * _aws.BATCH_GET_BACKOFF for delay in delays)
+
+
+def test_get_dynamodb_records_for_gives_up_on_unprocessed_keys(monkeypatch):
+    monkeypatch.setattr(_aws, "sleep", lambda _: None)
+    dynamodb = StubDynamoDB({}, partial_calls=100)
+
+    with pytest.raises(BatchGetError):
+        get_dynamodb_records_for(
+            ["event#1", "event#2"], dynamodb=dynamodb, dynamodb_table="events"
+        )
+
+    assert len(dynamodb.calls) == _aws.BATCH_GET_ATTEMPTS
+
+
+def test_get_dynamodb_records_for_reads_a_table():
+    moto = pytest.importorskip("moto")
+
+    with moto.mock_aws():
+        dynamodb = boto3.client("dynamodb", region_name="us-west-2")
+        dynamodb.create_table(
+            TableName="events",
+            KeySchema=[
+                {"AttributeName": "pk", "KeyType": "HASH"},
+                {"AttributeName": "sk", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "pk", "AttributeType": "S"},
+                {"AttributeName": "sk", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        for number in range(150):
+            dynamodb.put_item(TableName="events", Item=event_item(number))
+
+        records = get_dynamodb_records_for(
+            ["event#{}".format(number) for number in range(160)],
+            dynamodb=dynamodb,
+            dynamodb_table="events",
+        )
+
+    assert [record.get("seats") for record in records] == (
+        list(range(150)) + [None] * 10
+    )
+
+
+class SESError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class StubSES:
+    """Accepts raw emails after a delay, throttling some recipients first."""
+
+    def __init__(self, max_send_rate=50.0, seconds=0.0, throttled=()):
+        self.max_send_rate = max_send_rate
+        self.seconds = seconds
+        self.throttled = set(throttled)
+        self.attempts = []
+        self.sent = []
+        self.sending = 0
+        self.most_sending = 0
+        self.lock = threading.Lock()
+
+    def get_send_quota(self):
+        return {"MaxSendRate": self.max_send_rate}
+
+    def send_raw_email(self, Source=None, Destinations=None, RawMessage=None):
+        (recipient,) = Destinations
+
+        with self.lock:
+            self.attempts.append(recipient)
+            self.sending += 1
+            self.most_sending = max(self.most_sending, self.sending)
+
+            if recipient in self.throttled:
+                self.throttled.discard(recipient)
+                self.sending -= 1
+                raise SESError("Throttling", "Maximum sending rate exceeded.")
+
+        time.sleep(self.seconds)
+
+        with self.lock:
+            self.sending -= 1
+            self.sent.append((time.monotonic(), recipient))
+
+        if "unknown" in recipient:
+            raise SESError("MessageRejected", "Email address is not verified.")
+
+        return {"MessageId": "id-" + recipient}
+
+
+def invite_fields():
+    return {
+        "ical": "BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n",
+        "subject": "Launch",
+        "sender": "events@example.com",
+        "html": "<p>Launch</p>",
+    }
+
+
+def test_send_ses_invites_to_attendees_paces_to_the_send_rate():
+    ses = StubSES(max_send_rate=100.0, seconds=0.01)
+    recipients = ["guest{}@example.com".format(number) for number in range(40)]
+
+    started = time.monotonic()
+    results = send_ses_invites_to_attendees(
+        recipients, workers=8, ses=ses, **invite_fields()
+    )
+    elapsed = time.monotonic() - started
+
+    assert [result.recipient for result in results] == recipients
+    assert [result.message_id for result in results] == [
+        "id-" + recipient for recipient in recipients
+    ]
+    # One send may go at once, the rest wait a hundredth of a second each
+    assert elapsed >= 39 / 100 * 0.9
+    assert 1 < ses.most_sending <= 8
+
+
+def test_send_ses_invites_to_attendees_sends_concurrently():
+    ses = StubSES(max_send_rate=1000.0, seconds=0.05)
+    recipients = ["guest{}@example.com".format(number) for number in range(32)]
+
+    started = time.monotonic()
+    results = send_ses_invites_to_attendees(
+        recipients, workers=8, ses=ses, **invite_fields()
+    )
+
+    # Sending one after another would take 1.6 seconds
+    assert time.monotonic() - started < 0.8
+    assert all(result.error is None for result in results)
+    assert ses.most_sending == 8
+
+
+def test_send_ses_invites_to_attendees_retries_throttling(monkeypatch):
+    monkeypatch.setattr(_aws, "sleep", lambda _: None)
+    ses = StubSES(throttled=["b@example.com"])
+
+    results = send_ses_invites_to_attendees(
+        iter(
+            [
+                "a@example.com",
+                {"recipient": "b@example.com", "subject": "Launch for B"},
+                "unknown@example.com",
+            ]
+        ),
+        max_send_rate=1000.0,
+        workers=2,
+        ses=ses,
+        **invite_fields()
+    )
+
+    assert [result[:2] for result in results] == [
+        ("a@example.com", "id-a@example.com"),
+        ("b@example.com", "id-b@example.com"),
+        ("unknown@example.com", None),
+    ]
+    assert results[2].error.response["Error"]["Code"] == "MessageRejected"
+    # Throttling was retried, and rejection was not
+    assert sorted(ses.attempts) == [
+        "a@example.com",
+        "b@example.com",
+        "b@example.com",
+        "unknown@example.com",
+    ]
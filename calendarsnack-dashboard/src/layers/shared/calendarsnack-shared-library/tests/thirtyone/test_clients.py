@@ -0,0 +1,24 @@
+"""Clients Test"""
+
+from thirtyone import clients as _clients
+from thirtyone.clients import client, cold_start_report
+
+
+def test_clients_are_built_once_and_reported(monkeypatch):
+    monkeypatch.setattr(_clients, "CLIENTS", {})
+    monkeypatch.setattr(_clients, "SESSIONS", [])
+    monkeypatch.setattr(_clients, "COLD_START", [])
+
+    sqs = client("sqs", region_name="us-west-2")
+
+    assert client("sqs", region_name="us-west-2") is sqs
+    assert client("sqs") is not sqs
+    assert sqs.meta.config.max_pool_connections == 32
+    assert sqs.meta.config.retries["mode"] == "standard"
+    assert list(cold_start_report()) == [
+        "import boto3",
+        "session",
+        "client sqs us-west-2",
+        "client sqs",
+    ]
+    assert cold_start_report() == {}
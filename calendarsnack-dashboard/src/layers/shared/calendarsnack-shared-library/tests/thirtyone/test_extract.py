@@ -0,0 +1,192 @@
+"""Extract Test"""
+
+from base64 import encodebytes
+
+from thirtyone.extract import (decode_base64, decode_quoted_printable,
+                               extract_content_line_fields, extract_fields,
+                               extract_ical_from, walk_mime)
+from thirtyone.tokenizer import index_components
+
+
+def test_vevent_fields_ignore_trailing_vtimezone():
+    ical = (
+        "BEGIN:VCALENDAR\r\n"
+        + "BEGIN:VEVENT\r\n"
+        + "DTSTART;TZID=Eastern Standard Time:20240101T090000\r\n"
+        + "DTEND;TZID=Eastern Standard Time:20240101T100000\r\n"
+        + "END:VEVENT\r\n"
+        + "BEGIN:VTIMEZONE\r\n"
+        + "TZID:Eastern Standard Time\r\n"
+        + "BEGIN:STANDARD\r\n"
+        + "DTSTART:20071104T020000\r\n"
+        + "END:STANDARD\r\n"
+        + "END:VTIMEZONE\r\n"
+        + "END:VCALENDAR"
+    )
+
+    assert extract_content_line_fields(
+        ("dtstart", "dtend", "tzid"), index_components(ical)
+    ) == {
+        "dtstart": "20240101T090000",
+        "dtend": "20240101T100000",
+        "tzid": "Eastern Standard Time",
+    }
+
+
+def test_vevent_description_ignores_valarm():
+    ical = (
+        "BEGIN:VEVENT\r\n"
+        + "BEGIN:VALARM\r\n"
+        + "ACTION:DISPLAY\r\n"
+        + "DESCRIPTION:REMINDER\r\n"
+        + "END:VALARM\r\n"
+        + "DESCRIPTION;LANGUAGE=en-US:Planning\r\n"
+        + "END:VEVENT"
+    )
+
+    assert extract_content_line_fields(
+        ("description",), index_components(ical)
+    ) == {"description": "Planning"}
+
+
+def test_extract_fields_tries_each_field_in_fallback_order():
+    ical = "BEGIN:VCALENDAR\r\nMETHOD:REPLY\r\nEND:VCALENDAR"
+    attendee = "ATTENDEE;PARTSTAT=ACCEPTED;CN=Jane Doe:mailto:jane@example.com"
+
+    # Without a Content-Type header the payload falls back to the bare ical
+    assert extract_fields(("ical_payload", "method"), ical) == {
+        "content": ical,
+        "method": "REPLY",
+    }
+    assert extract_fields(("name", "mailto_rsvp", "partstat"), attendee) == {
+        "name": "Jane Doe",
+        "mailto_rsvp": "jane@example.com",
+        "partstat": "ACCEPTED",
+    }
+    assert extract_fields(("partstat",), "ATTENDEE:mailto:a@b.c") == {}
+
+
+def test_walk_mime_skips_parts_before_calendar():
+    email = (
+        "From: Jane <jane@example.com>\r\n"
+        + 'Content-Type: multipart/mixed; boundary="outer"\r\n'
+        + "\r\n"
+        + "--outer\r\n"
+        + "Content-Type: multipart/alternative;\r\n"
+        + '\tboundary="inner"\r\n'
+        + "\r\n"
+        + "--inner\r\n"
+        + "Content-Type: text/plain\r\n"
+        + "\r\n"
+        + "Content-Type: text/calendar\r\n"
+        + "--inner--\r\n"
+        + "\r\n"
+        + "--outer\r\n"
+        + "Content-Type: application/pdf\r\n"
+        + "Content-Transfer-Encoding: base64\r\n"
+        + "\r\n"
+        + "JVBERi0xLjQK\r\n"
+        + "--outer\r\n"
+        + 'Content-Type: text/calendar; method="REQUEST"\r\n'
+        + "Content-Transfer-Encoding: 7bit\r\n"
+        + "\r\n"
+        + "BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n"
+        + "--outer--\r\n"
+    )
+
+    message = walk_mime(email)
+
+    assert message.headers == (
+        "From: Jane <jane@example.com>\r\n"
+        + 'Content-Type: multipart/mixed; boundary="outer"'
+    )
+    assert message.content_type == "text/calendar"
+    assert message.encoding == "7bit"
+    assert extract_ical_from(message) == "BEGIN:VCALENDAR\r\nEND:VCALENDAR"
+
+
+def test_walk_mime_reads_bytes_like_emails():
+    calendar = "BEGIN:VCALENDAR\r\nSUMMARY:Caf\u00e9\r\nEND:VCALENDAR"
+    email = (
+        "From: Jos\u00e9 <jose@example.com>\r\n"
+        + 'Content-Type: multipart/mixed; boundary="outer"\r\n'
+        + "\r\n"
+        + "--outer\r\n"
+        + "Content-Type: application/pdf\r\n"
+        + "\r\n"
+        + "JVBERi0xLjQK\r\n"
+        + "--outer\r\n"
+        + "Content-Type: text/calendar\r\n"
+        + "Content-Transfer-Encoding: base64\r\n"
+        + "\r\n"
+        + encodebytes(calendar.encode("utf-8")).decode("ascii")
+        + "--outer--\r\n"
+    )
+
+    for raw in (email.encode("utf-8"), bytearray(email.encode("utf-8"))):
+        message = walk_mime(raw)
+
+        assert message.headers == walk_mime(email).headers
+        assert message.content_type == "text/calendar"
+        assert extract_ical_from(message) == calendar
+
+
+def test_walk_mime_decodes_forwarded_calendar():
+    email = (
+        "From: jane@example.com\n"
+        + "Content-Type: multipart/mixed; boundary=a\n"
+        + "\n"
+        + "--a\n"
+        + "Content-Type: message/rfc822\n"
+        + "\n"
+        + "From: sam@example.com\n"
+        + "Content-Type: multipart/mixed; boundary=b\n"
+        + "\n"
+        + "--b\n"
+        + "Content-Type: application/ics\n"
+        + "\n"
+        + "QkVHSU46VkNBTEVOREFS\n"
+        + "--b--\n"
+        + "--a--\n"
+    )
+
+    assert extract_ical_from(walk_mime(email)) == "BEGIN:VCALENDAR"
+
+
+def test_walk_mime_without_calendar():
+    message = walk_mime("From: jane@example.com\n\nHello")
+
+    assert message.payload is None
+    assert extract_ical_from(message) is None
+
+
+def test_decode_base64_across_chunk_boundaries():
+    ical = "\ufeffBEGIN:VCALENDAR\r\nSUMMARY:Caf\u00e9 \u2713\r\n" * 20
+    payload = encodebytes(ical.encode("utf-8")).decode("ascii")
+    payload = payload.replace("\n", "\r\n")
+
+    for chunk_size in (1, 5, 77, 1024):
+        assert decode_base64(payload, chunk_size) == ical.lstrip("\ufeff")
+        assert decode_base64(payload.encode("ascii"), chunk_size) == (
+            ical.lstrip("\ufeff")
+        )
+        assert decode_base64(
+            memoryview(payload.encode("ascii")), chunk_size
+        ) == ical.lstrip("\ufeff")
+
+
+def test_decode_quoted_printable_soft_line_breaks():
+    payload = (
+        "BEGIN:VCALENDAR\r\n"
+        + "SUMMARY:Caf=C3=A9 with a very long summary that is wrapped=\r\n"
+        + " by a soft line break\r\n"
+        + "END:VCALENDAR"
+    )
+
+    for chunk_size in (1, 7, 64):
+        assert decode_quoted_printable(payload, chunk_size) == (
+            "BEGIN:VCALENDAR\r\n"
+            + "SUMMARY:Caf\u00e9 with a very long summary that is wrapped"
+            + " by a soft line break\r\n"
+            + "END:VCALENDAR"
+        )
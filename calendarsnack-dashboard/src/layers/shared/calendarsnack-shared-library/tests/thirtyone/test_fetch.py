@@ -0,0 +1,263 @@
+"""Fetch Test"""
+
+import asyncio
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from thirtyone import FetchError, Ical
+from thirtyone import fetch as _fetch
+from thirtyone import ical as _ical
+from thirtyone.extract import ExtractionBudget
+from thirtyone.fetch import (fetch_calendar_now, is_public,
+                             iter_calendar_events, redirect_url, request_for)
+from thirtyone.tokenizer import iter_event_calendars
+
+CALENDAR = (
+    "BEGIN:VCALENDAR\r\nMETHOD:PUBLISH\r\n"
+    + "".join(
+        "BEGIN:VEVENT\r\nUID:{0}@example.com\r\nSUMMARY:Event {0}\r\n"
+        "ORGANIZER;CN=Jane:mailto:jane@example.com\r\n"
+        "DTSTART:20240102T090000Z\r\nEND:VEVENT\r\n".format(event)
+        for event in range(500)
+    )
+    + "END:VCALENDAR\r\n"
+).encode("utf8")
+
+
+class Feed(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    revalidated = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.client_address))
+
+        if self.path == "/slow":
+            time.sleep(1)
+        elif self.path == "/moved":
+            self.reply(302, headers={"Location": "/calendar"})
+            return
+        elif self.path == "/metadata":
+            self.reply(
+                302, headers={"Location": "http://169.254.169.254/latest/"}
+            )
+            return
+        elif self.path == "/huge":
+            # No Content-Length, so the body ends when the connection does
+            self.send_response(200)
+            self.end_headers()
+
+            for _ in range(64):
+                self.wfile.write(b"X" * 0x4000)
+
+            return
+        elif self.path.startswith("/length/"):
+            self.send_response(200)
+            self.send_header("Content-Length", self.path[8:])
+            self.end_headers()
+            self.wfile.write(CALENDAR)
+            return
+        elif self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        self.revalidated.append(self.headers.get("If-None-Match") == '"v1"')
+
+        if self.revalidated[-1]:
+            self.reply(304, headers={"ETag": '"v1"'})
+        else:
+            self.reply(200, CALENDAR, {"ETag": '"v1"'})
+
+    def reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(_fetch, "CALENDARS", type(_fetch.CALENDARS)())
+    # Only the local stand-in is let through the public address check
+    monkeypatch.setattr(
+        _fetch, "is_public", lambda address: address == "127.0.0.1"
+    )
+    Feed.requests = []
+    Feed.revalidated = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Feed)
+    server.handle_error = lambda *_: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield "http://127.0.0.1:{}".format(server.server_address[1])
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_feed_is_revalidated(feed):
+    text = fetch_calendar_now(feed + "/calendar")
+
+    assert text == CALENDAR.decode("utf8")
+    assert fetch_calendar_now(feed + "/calendar") == text
+    assert len(Feed.requests) == 2
+    assert Feed.revalidated == [False, True]
+
+
+def test_slow_and_huge_feeds_fail_within_limits(feed):
+    started = time.monotonic()
+
+    with pytest.raises(FetchError):
+        fetch_calendar_now(feed + "/slow", seconds=0.2)
+
+    assert time.monotonic() - started < 0.9
+
+    with pytest.raises(FetchError):
+        fetch_calendar_now(feed + "/huge", max_bytes=64 * 1024)
+
+    assert len(fetch_calendar_now(feed + "/huge")) == 64 * 0x4000
+
+    with pytest.raises(FetchError):
+        fetch_calendar_now("file:///etc/passwd")
+
+
+def test_non_public_addresses_are_refused(feed):
+    for url in (
+        "http://169.254.169.254/latest/meta-data/",
+        "http://[::1]/calendar",
+        feed + "/metadata",
+    ):
+        with pytest.raises(FetchError, match="not a public address"):
+            fetch_calendar_now(url)
+
+    assert [path for path, _ in Feed.requests] == ["/metadata"]
+
+
+def test_is_public():
+    assert is_public("93.184.215.14")
+    assert is_public("2606:2800:21f:cb07:6820:80da:af6b:8b2c")
+
+    for address in (
+        "127.0.0.1",
+        "10.1.2.3",
+        "172.16.0.1",
+        "192.168.1.1",
+        "169.254.169.254",
+        "100.64.0.1",
+        "0.0.0.0",
+        "224.0.0.1",
+        "::1",
+        "fe80::1%eth0",
+        "fd00:ec2::254",
+        "::ffff:127.0.0.1",
+    ):
+        assert not is_public(address), address
+
+
+def test_requests_encode_international_urls():
+    scheme, host, port, message = request_for(
+        "webcal://例え.jp:8443/カレンダー.ics?name=é&x=%20", {}
+    )
+
+    assert (scheme, host, port) == ("https", "xn--r8jz45g.jp", 8443)
+    assert message.startswith(
+        b"GET /%E3%82%AB%E3%83%AC%E3%83%B3%E3%83%80%E3%83%BC.ics"
+        b"?name=%C3%A9&x=%20 HTTP/1.0\r\nHost: xn--r8jz45g.jp:8443\r\n"
+    )
+    assert b"Host: [::1]\r\n" in request_for("http://[::1]/", {})[3]
+
+    for url in (
+        "http://a.example:99999/",
+        "http://" + "a" * 64 + ".example/",
+        "http:///calendar",
+        "ftp://a.example/",
+    ):
+        with pytest.raises(FetchError):
+            request_for(url, {})
+
+
+def test_redirects_may_not_leave_https():
+    assert redirect_url("webcal://a.example/x", "/y") == "https://a.example/y"
+    assert redirect_url("http://a.example/x", "https://b.example/y") == (
+        "https://b.example/y"
+    )
+
+    with pytest.raises(FetchError):
+        redirect_url("https://a.example/x", "http://a.example/x")
+
+
+@pytest.mark.parametrize("path", ["/length/-1", "/length/x", "/chunked"])
+def test_malformed_bodies_fail_with_fetch_error(feed, path):
+    with pytest.raises(FetchError):
+        fetch_calendar_now(feed + path)
+
+
+def test_interrupted_fetch_does_not_resume_later(feed):
+    class Interrupted(Exception):
+        pass
+
+    def interrupt(*_):
+        raise Interrupted()
+
+    handler = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, 0.2)
+
+    try:
+        with pytest.raises(Interrupted):
+            fetch_calendar_now(feed + "/slow")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+
+    assert fetch_calendar_now(feed + "/calendar") == CALENDAR.decode("utf8")
+    assert list(_fetch.CALENDARS) == [feed + "/calendar"]
+
+
+def test_events_stream_like_the_whole_feed(feed):
+    async def read_events():
+        return [
+            calendar
+            async for calendar in iter_calendar_events(feed + "/moved")
+        ]
+
+    events = asyncio.run(read_events())
+
+    assert events == list(iter_event_calendars(CALENDAR.decode("utf8")))
+    assert len(events) == 500
+
+
+def test_shared_calendar_is_read_from_its_ical_url(feed):
+    ical = Ical().read_ical_from(
+        "<IcalUrl>{}/moved?a=1&amp;b=2</IcalUrl>".format(feed),
+        from_email=False,
+    )
+
+    assert ical["summary"] == "Event 0"
+    assert Feed.requests[0][0] == "/moved?a=1&b=2"
+
+
+def test_hardened_extraction_budget_leaves_out_the_download(
+    feed, monkeypatch
+):
+    monkeypatch.setattr(
+        _ical, "ExtractionBudget", lambda: ExtractionBudget(seconds=0.3)
+    )
+
+    # The feed answers after a second, well past the extraction budget
+    ical = Ical(hardened=True).read_ical_from(
+        "<IcalUrl>{}/slow</IcalUrl>".format(feed), from_email=False
+    )
+
+    assert ical["summary"] == "Event 0"
@@ -0,0 +1,245 @@
+"""Ical Test"""
+
+from io import BytesIO
+
+from freezegun import freeze_time
+from thirtyone import Ical, ParseCache
+from thirtyone import ical as _ical
+from thirtyone.ical import fold_into, fold_line
+from thirtyone.extract import extract_fields_by_method
+
+VEVENTS = (
+    "BEGIN:VEVENT\r\n"
+    + "UID:first@example.com\r\n"
+    + "ORGANIZER;CN=Jane:mailto:jane@example.com\r\n"
+    + "SUMMARY:First\r\n"
+    + "DTSTART;TZID=Pacific Standard Time:20240102T090000\r\n"
+    + "DTEND;TZID=Pacific Standard Time:20240102T100000\r\n"
+    + "END:VEVENT\r\n",
+    "BEGIN:VEVENT\r\n"
+    + "UID:second@example.com\r\n"
+    + "SUMMARY:Second\r\n"
+    + "DESCRIPTION:Weekly\\, with notes\r\n"
+    + "DTSTART:20240103T170000Z\r\n"
+    + "END:VEVENT\r\n",
+)
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE\r\n"
+    + "TZID:Pacific Standard Time\r\n"
+    + "BEGIN:STANDARD\r\n"
+    + "DTSTART:16010101T020000\r\n"
+    + "END:STANDARD\r\n"
+    + "END:VTIMEZONE\r\n"
+)
+
+
+def calendar_with(*components):
+    return (
+        "BEGIN:VCALENDAR\r\nMETHOD:PUBLISH\r\nPRODID:-//Feed//EN\r\n"
+        + "".join(components)
+        + "END:VCALENDAR\r\n"
+    )
+
+
+@freeze_time("2024-01-01 00:00:00")
+def test_iter_events_matches_single_event_extraction():
+    events = Ical().iter_events(
+        calendar_with(VTIMEZONE, *VEVENTS), sender="Organizer@example.com"
+    )
+
+    for event, vevent in zip(events, VEVENTS):
+        expected = extract_fields_by_method(
+            "REQUEST",
+            data=calendar_with(VTIMEZONE, vevent),
+            sender="Organizer@example.com",
+        )
+
+        assert event.pop("method") == "REQUEST"
+        assert len(event.pop("uid")) == 16
+        assert event == expected
+
+
+@freeze_time("2024-01-01 00:00:00")
+def test_iter_events_resolves_timezones_defined_after_the_event():
+    readers = Ical(), Ical()
+
+    for reader in readers:
+        reader.ical["return_path"] = "organizer@example.com"
+
+    events = list(readers[0].iter_events(calendar_with(*VEVENTS, VTIMEZONE)))
+    expected = readers[1].read_ical_from(
+        calendar_with(VEVENTS[0], VTIMEZONE), from_email=False, uid="first"
+    )
+
+    # The second event is in UTC and waits behind the first
+    assert [event["summary"] for event in events] == ["First", "Second"]
+    assert events[0]["dtstart"] == "20240102T170000Z"
+    assert dict(events[0], uid="first") == expected
+
+
+@freeze_time("2024-01-01 00:00:00")
+def test_read_ical_from_s3_reads_the_email_through_a_mmap():
+    email = (
+        "Return-Path: <jane@example.com>\r\n"
+        + 'Content-Type: multipart/mixed; boundary="outer"\r\n'
+        + "\r\n"
+        + "--outer\r\n"
+        + "Content-Type: application/pdf\r\n"
+        + "Content-Transfer-Encoding: base64\r\n"
+        + "\r\n"
+        + "JVBERi0xLjQK\r\n" * 1000
+        + "--outer\r\n"
+        + 'Content-Type: text/calendar; method="REQUEST"\r\n'
+        + "Content-Transfer-Encoding: 7bit\r\n"
+        + "\r\n"
+        + calendar_with(VTIMEZONE, VEVENTS[0])
+        + "--outer--\r\n"
+    )
+
+    class StubS3:
+        def get_object(self, Bucket=None, Key=None):
+            assert (Bucket, Key) == ("inbox", "email")
+
+            return {"Body": BytesIO(email.encode("utf8"))}
+
+    ical = Ical().read_ical_from_s3("inbox", "email", s3=StubS3(), uid="x")
+
+    assert ical["summary"] == "First"
+    assert ical == Ical().read_ical_from(email, uid="x")
+
+
+def test_iter_events_is_lazy():
+    events = Ical().iter_events(
+        calendar_with(VEVENTS[0], "BEGIN:VEVENT\r\n"),
+        sender="organizer@example.com",
+    )
+
+    assert next(events)["summary"] == "First"
+
+
+def test_parse_cache_recomputes_per_message_fields():
+    parse_cache = ParseCache(maxsize=2)
+    ical = calendar_with(VTIMEZONE, VEVENTS[0])
+
+    with freeze_time("2024-01-01 00:00:00"):
+        first = Ical(parse_cache=parse_cache).read_ical_from(
+            ical, from_email=False, uid="a" * 16
+        )
+
+    with freeze_time("2024-01-02 00:00:00"):
+        second = Ical(parse_cache=parse_cache).read_ical_from(
+            ical, from_email=False, uid="b" * 16
+        )
+
+    assert parse_cache.info() == {
+        "hits": 1,
+        "misses": 1,
+        "size": 1,
+        "maxsize": 2,
+    }
+    assert second["uid"] == "b" * 16
+    assert second["dtstamp"] == second["created"] == "20240102T000000Z"
+
+    for field in ("uid", "created", "dtstamp", "last_modified"):
+        first.pop(field)
+        second.pop(field)
+
+    assert first == second
+
+
+def test_parse_cache_evicts_least_recently_used():
+    parse_cache = ParseCache(maxsize=1)
+
+    parse_cache.put("first", {"method": "REQUEST"})
+    parse_cache.put("second", {"method": "CANCEL"})
+
+    assert parse_cache.get("first") is None
+    assert parse_cache.get("second") == {"method": "CANCEL"}
+    assert len(parse_cache) == 1
+
+
+def test_fingerprint_ignores_cosmetic_resends():
+    ical = calendar_with(VTIMEZONE, VEVENTS[0])
+    resent = ical.replace(
+        "SUMMARY:First\r\n", "SEQUENCE:2\r\nDTSTAMP:20240105T000000Z\r\n"
+    ).replace("UID:", "SUMMARY:First \r\nUID:")
+
+    with freeze_time("2024-01-01 00:00:00"):
+        original = Ical()
+        original.read_ical_from(ical, from_email=False, uid="a" * 16)
+
+    with freeze_time("2024-01-02 00:00:00"):
+        cosmetic = Ical()
+        cosmetic.read_ical_from(resent, from_email=False, uid="b" * 16)
+
+    moved = Ical()
+    moved.read_ical_from(
+        ical.replace("T090000", "T093000"), from_email=False, uid="c" * 16
+    )
+
+    assert not cosmetic.has_material_change(original.fingerprint())
+    assert moved.has_material_change(original.fingerprint())
+    assert moved.has_material_change(None)
+
+
+def test_prepared_icals_splice_each_recipient(monkeypatch):
+    monkeypatch.setattr(_ical, "PREPARED_ICALS", _ical.OrderedDict())
+    event = {
+        "description": "Agenda {draft} " * 10,
+        "dtend": "20240102T100000Z",
+        "dtstamp": "20240101T000000Z",
+        "dtstart": "20240102T090000Z",
+        "mailto": "jane@example.com",
+        "rsvp_email": "invite@example.com",
+        "summary": "Planning",
+        "uid": "event@example.com",
+    }
+    ical = Ical()
+    icals = ical.build_icals_for(["a@example.com", "b@example.com"], **event)
+
+    assert icals == [
+        ical.build_ical_from(recipient=recipient, **event)
+        for recipient in ("a@example.com", "b@example.com")
+    ]
+    assert "DTSTART;TZID=Etc/GMT:20240102T090000\r\n" in icals[0]
+    assert "mailto:b@example.com\r\n" in icals[1]
+    assert ical.prepare_ical_from(**event) is ical.prepare_ical_from(**event)
+
+    # Same uid and sequence with other fields renders again
+    event["summary"] = "Planning moved"
+
+    assert "SUMMARY:Planning moved\r\n" in ical.build_ical_from(
+        recipient="a@example.com", **event
+    )
+    assert list(_ical.PREPARED_ICALS) == [("event@example.com", 0)]
+
+
+def test_fold_line_keeps_boundaries_and_utf8_sequences():
+    assert fold_line("A" * 70) == "A" * 70
+    assert fold_line("A" * 197) == "\r\n ".join(
+        ("A" * 65, "A" * 66, "A" * 66)
+    )
+
+    text = "DESCRIPTION:" + "caf\u00e9 \U0001f4c5 " * 40
+    folded = fold_line(text)
+    lines = folded.encode("utf-8").split(b"\r\n ")
+
+    assert folded.replace("\r\n ", "") == text
+    assert max(len(line) for line in lines) <= 66
+    assert all(line.decode("utf-8") for line in lines)
+    assert fold_into(bytearray(b"X"), text) == b"X" + folded.encode("utf-8")
+
+
+@freeze_time("2024-01-01 12:34:56", tz_offset=-5)
+def test_prepared_ical_dtstamp_defaults_to_current_utc_time(monkeypatch):
+    monkeypatch.setattr(_ical, "PREPARED_ICALS", _ical.OrderedDict())
+    ical = Ical().build_ical_from(
+        dtend="20240102T100000Z",
+        dtstart="20240102T090000Z",
+        mailto="jane@example.com",
+        recipient="a@example.com",
+        rsvp_email="invite@example.com",
+        uid="event@example.com",
+    )
+
+    assert "DTSTAMP:20240101T123456Z\r\n" in ical
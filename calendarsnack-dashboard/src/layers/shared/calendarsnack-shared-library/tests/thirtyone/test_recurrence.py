@@ -0,0 +1,135 @@
+"""Recurrence Test"""
+
+from datetime import date, datetime
+from itertools import islice
+
+import pytest
+import pytz
+from thirtyone import recurrence
+from thirtyone.recurrence import (expand_recurrence, iter_occurrences,
+                                  read_recurrence)
+
+
+def event(*lines):
+    return "\r\n".join(
+        ("BEGIN:VCALENDAR", "BEGIN:VEVENT", "UID:series@example.com")
+        + lines
+        + ("END:VEVENT", "END:VCALENDAR")
+    )
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=pytz.utc)
+
+
+def occurrences(ical, limit=10):
+    return list(islice(iter_occurrences(read_recurrence(ical)), limit))
+
+
+def test_weekly_byday_across_dst_keeps_wall_time():
+    ical = event(
+        "DTSTART;TZID=America/New_York:20240305T090000",
+        "RRULE:FREQ=WEEKLY;BYDAY=TU,TH;COUNT=4",
+    )
+
+    assert occurrences(ical) == [
+        utc(2024, 3, 5, 14),
+        utc(2024, 3, 7, 14),
+        utc(2024, 3, 12, 13),
+        utc(2024, 3, 14, 13),
+    ]
+
+
+def test_monthly_last_friday_until():
+    ical = event(
+        "DTSTART:20240126T170000Z",
+        "RRULE:FREQ=MONTHLY;BYDAY=-1FR;UNTIL=20240430T000000Z",
+    )
+
+    assert occurrences(ical) == [
+        utc(2024, 1, 26, 17),
+        utc(2024, 2, 23, 17),
+        utc(2024, 3, 29, 17),
+        utc(2024, 4, 26, 17),
+    ]
+
+
+def test_monthly_skips_months_without_start_day():
+    ical = event("DTSTART:20240131T100000", "RRULE:FREQ=MONTHLY;COUNT=3")
+
+    assert occurrences(ical) == [
+        datetime(2024, 1, 31, 10),
+        datetime(2024, 3, 31, 10),
+        datetime(2024, 5, 31, 10),
+    ]
+
+
+def test_yearly_bysetpos_and_all_day_values():
+    ical = event(
+        "DTSTART;VALUE=DATE:20241128",
+        "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=TH;BYSETPOS=4;COUNT=3",
+    )
+
+    assert occurrences(ical) == [
+        date(2024, 11, 28),
+        date(2025, 11, 27),
+        date(2026, 11, 26),
+    ]
+
+
+def test_rdate_and_exdate_merge_into_rule():
+    ical = event(
+        "DTSTART;TZID=Europe/Berlin:20240101T080000",
+        "RRULE:FREQ=DAILY;INTERVAL=2;COUNT=4",
+        "EXDATE;TZID=Europe/Berlin:20240103T080000",
+        "RDATE:20240102T120000Z,20240105T070000Z",
+    )
+
+    assert occurrences(ical) == [
+        utc(2024, 1, 1, 7),
+        utc(2024, 1, 2, 12),
+        utc(2024, 1, 5, 7),
+        utc(2024, 1, 7, 7),
+    ]
+
+
+def test_unsupported_rule_parts_raise():
+    with pytest.raises(ValueError):
+        read_recurrence(
+            event("DTSTART:20240101T090000Z", "RRULE:FREQ=HOURLY")
+        )
+
+    with pytest.raises(ValueError):
+        read_recurrence(
+            event("DTSTART:20240101T090000Z", "RRULE:FREQ=DAILY;BYHOUR=9")
+        )
+
+
+def test_between_expands_unbounded_series_lazily():
+    expansion = expand_recurrence(
+        event("DTSTART:20240101T090000Z", "RRULE:FREQ=DAILY")
+    )
+
+    assert list(
+        expansion.between(utc(2024, 2, 1), utc(2024, 2, 3, 9))
+    ) == [utc(2024, 2, 1, 9), utc(2024, 2, 2, 9)]
+    assert len(expansion.occurrences) == 34
+    assert expansion.upcoming(2, after=utc(2024, 1, 2, 10)) == [
+        utc(2024, 1, 3, 9),
+        utc(2024, 1, 4, 9),
+    ]
+
+
+def test_expansions_are_memoized_by_uid_and_sequence(monkeypatch):
+    monkeypatch.setattr(recurrence, "EXPANSIONS", recurrence.OrderedDict())
+    ical = event("DTSTART:20240101T090000Z", "RRULE:FREQ=WEEKLY")
+    updated = event(
+        "SEQUENCE:1", "DTSTART:20240102T090000Z", "RRULE:FREQ=WEEKLY"
+    )
+
+    assert expand_recurrence(ical) is expand_recurrence(ical)
+    assert expand_recurrence(updated) is not expand_recurrence(ical)
+    assert expand_recurrence(updated).upcoming(1) == [utc(2024, 1, 2, 9)]
+    assert (
+        expand_recurrence("BEGIN:VEVENT\r\nUID:x\r\nEND:VEVENT") is None
+    )
@@ -0,0 +1,57 @@
+"""Sanitize Test"""
+
+import pytest
+from thirtyone.sanitize import mask_many, sanitize_field, sanitize_many
+
+
+@pytest.mark.parametrize(
+    "field,data,expected",
+    [
+        (
+            "description",
+            "Notes\\\\, more\\; &amp\\; &nbsp; &amp\\\\;\\n\\n",
+            "Notes, more; &   &amp;",
+        ),
+        ("html", "a\\\\nb\\,c\\\\;d\r\n e", "a<br>b,c;de"),
+        ("summary", "Plan\\, review \\n", "Plan, review"),
+        (
+            "organizer",
+            "Jane\\, Doe prvs=ab1=jane@ex\r\n ample.com",
+            "Jane, Doe jane[at]example.com",
+        ),
+        ("dtstart", "20240102", "20240102T000000Z"),
+        ("prodid", "-//Feed//EN", "-//Feed//EN"),
+    ],
+)
+def test_sanitize_field_pipelines(field, data, expected):
+    assert sanitize_field(field, data) == {field: expected}
+
+
+def test_sanitize_field_skips_unfolding_unfolded_values():
+    assert sanitize_field("summary", "Plan\r\n review", unfolded=True) == {
+        "summary": "Plan\r\n review"
+    }
+
+
+@pytest.mark.parametrize("field", ["description", "organizer", "dtstart"])
+def test_sanitize_many_matches_sanitize_field(field):
+    values = [
+        "Jane\\, Doe prvs=ab1=jane@ex\r\n ample.com \\n",
+        None,
+        "",
+        "20240102",
+        "Notes &amp; more\\n\\n-::~:~::~\\nJoin",
+    ]
+
+    # Columns holding NUL take the per value path
+    for column in (values, values + ["Nul\x00 keeps\\, values apart"]):
+        assert sanitize_many(field, column) == [
+            sanitize_field(field, value)[field] for value in column
+        ]
+
+
+def test_mask_many_keeps_first_character_and_domain():
+    assert mask_many(["jane@example.com"], emails=True) == [
+        "j*******@example.com"
+    ]
+    assert mask_many(["Jane Doe"]) == ["J*******"]
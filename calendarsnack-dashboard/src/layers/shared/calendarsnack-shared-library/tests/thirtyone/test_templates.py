@@ -0,0 +1,140 @@
+"""Templates Test"""
+
+from io import BytesIO
+
+import pytest
+from thirtyone import templates as _templates
+from thirtyone.templates import (compile_template, get_template_for,
+                                 preload_templates_for, render_template)
+
+HTML = "<style>p { color: red; }</style><p>{uid}</p><a href='{uid}'>{x-y}</a>"
+
+
+class StubCodeCommit:
+    def __init__(self, files):
+        self.files = files
+        self.head = "c1"
+        self.calls = []
+
+    def get_repository(self, repositoryName=None):
+        self.calls.append("get_repository")
+        return {"repositoryMetadata": {"defaultBranch": "main"}}
+
+    def get_branch(self, repositoryName=None, branchName=None):
+        self.calls.append("get_branch")
+        return {"branch": {"commitId": self.head}}
+
+    def get_file(
+        self, repositoryName=None, commitSpecifier=None, filePath=None
+    ):
+        self.calls.append(("get_file", commitSpecifier))
+        return {
+            "fileContent": self.files[filePath].encode("utf-8-sig"),
+            "commitId": commitSpecifier or self.head,
+        }
+
+
+class StubS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+
+    def head_object(self, Bucket=None, Key=None):
+        self.calls.append("head_object")
+        return {"ETag": str(hash(self.objects[Key]))}
+
+    def get_object(self, Bucket=None, Key=None):
+        self.calls.append("get_object")
+        return {
+            "Body": BytesIO(self.objects[Key].encode("utf8")),
+            "ETag": str(hash(self.objects[Key])),
+        }
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(_templates, "TEMPLATES", {})
+    monkeypatch.setattr(_templates, "BRANCHES", {})
+
+
+def test_render_template_matches_replace():
+    template = compile_template(HTML)
+
+    assert render_template(template, uid="abc") == HTML.replace("{uid}", "abc")
+    assert render_template(template) == HTML
+
+
+def test_codecommit_templates_revalidate_against_branch_head(monkeypatch):
+    codecommit = StubCodeCommit({"report.html": HTML})
+
+    def get():
+        return get_template_for(
+            "report.html", repository="templates", codecommit=codecommit
+        )
+
+    template = get()
+
+    assert get() is template
+    assert codecommit.calls == [("get_file", None)]
+
+    # Every cached copy has expired from now on
+    monkeypatch.setattr(_templates, "monotonic", lambda: float("inf"))
+    codecommit.calls = []
+
+    assert get() is template
+    assert codecommit.calls == ["get_repository", "get_branch"]
+
+    codecommit.head = "c2"
+    codecommit.files["report.html"] = "<p>{uid}</p>"
+    codecommit.calls = []
+
+    assert render_template(get(), uid="abc") == "<p>abc</p>"
+    assert codecommit.calls == ["get_branch", ("get_file", "c2")]
+
+
+def test_s3_templates_revalidate_against_etag(monkeypatch):
+    monkeypatch.setattr(_templates, "monotonic", lambda: float("inf"))
+    s3 = StubS3({"report.html": HTML})
+
+    def get():
+        return get_template_for(
+            "report.html", repository="s3://templates", s3=s3
+        )
+
+    template = get()
+
+    assert get() is template
+
+    s3.objects["report.html"] = "{uid}"
+
+    assert render_template(get(), uid="abc") == "abc"
+    assert s3.calls == [
+        "get_object",
+        "head_object",
+        "head_object",
+        "get_object",
+    ]
+
+
+def test_preloaded_bundle_skips_downloads(caplog):
+    codecommit = StubCodeCommit({"report.html": HTML, "notice.html": "{uid}"})
+    preload_templates_for(
+        ("report.html", "notice.html"),
+        repository="templates",
+        codecommit=codecommit,
+    )
+    codecommit.calls = []
+
+    assert render_template(
+        get_template_for(
+            "notice.html", repository="templates", codecommit=codecommit
+        ),
+        uid="abc",
+    ) == "abc"
+    assert codecommit.calls == []
+
+    preload_templates_for(
+        ("missing.html",), repository="templates", codecommit=codecommit
+    )
+
+    assert "Preloading templates failed" in caplog.text
@@ -0,0 +1,159 @@
+"""Timezone Test"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from thirtyone import timezone as _timezone
+from thirtyone.recurrence import expand_recurrence
+from thirtyone.timezone import (HOT_TIMEZONES, build_transitions,
+                                convert_many_to_utc, convert_time_to_utc,
+                                convert_to_utc, local_to_utc,
+                                resolve_timezone)
+from thirtyone.tokenizer import index_components
+
+
+def vtimezone(standard_offset, daylight_offset):
+    return "\r\n".join(
+        (
+            "BEGIN:VCALENDAR",
+            "BEGIN:VTIMEZONE",
+            "TZID:Customized Time Zone",
+            "BEGIN:STANDARD",
+            "DTSTART:16010101T020000",
+            "TZOFFSETFROM:" + daylight_offset,
+            "TZOFFSETTO:" + standard_offset,
+            "RRULE:FREQ=YEARLY;INTERVAL=1;BYDAY=1SU;BYMONTH=11",
+            "END:STANDARD",
+            "BEGIN:DAYLIGHT",
+            "DTSTART:16010101T020000",
+            "TZOFFSETFROM:" + standard_offset,
+            "TZOFFSETTO:" + daylight_offset,
+            "RRULE:FREQ=YEARLY;INTERVAL=1;BYDAY=2SU;BYMONTH=3",
+            "END:DAYLIGHT",
+            "END:VTIMEZONE",
+            "BEGIN:VEVENT",
+            "UID:custom-zone@example.com",
+            "DTSTART;TZID=Customized Time Zone:20240308T090000",
+            "RRULE:FREQ=DAILY;COUNT=3",
+            "END:VEVENT",
+            "END:VCALENDAR",
+        )
+    )
+
+
+def localize(time, timezone):
+    return (
+        pytz.timezone(timezone)
+        .localize(time, is_dst=True)
+        .astimezone(pytz.utc)
+        .replace(tzinfo=None)
+    )
+
+
+@pytest.mark.parametrize(
+    "time,expected",
+    [
+        # Skipped hour takes the offset after the jump
+        ("20240310T023000", "20240310T063000Z"),
+        # Repeated hour takes the daylight saving offset
+        ("20241103T013000", "20241103T053000Z"),
+        ("20241103T020000", "20241103T070000Z"),
+    ],
+)
+def test_convert_to_utc_across_transitions(time, expected):
+    assert convert_to_utc(time, "Eastern Standard Time") == expected
+    assert convert_to_utc(time, "America/New_York") == expected
+
+
+def test_convert_time_to_utc_skips_utc_values():
+    assert convert_time_to_utc(
+        {"dtstart": "20240102T090000", "dtend": "20240102T100000Z"},
+        "W. Europe Standard Time",
+    ) == {"dtstart": "20240102T080000Z"}
+
+
+def test_transition_tables_match_localize():
+    minutes = timedelta(minutes=20)
+
+    for timezone in HOT_TIMEZONES:
+        starts = build_transitions(pytz.timezone(timezone)).starts
+
+        for start in starts[-60:]:
+            for step in range(-6, 7):
+                time = start + step * minutes
+
+                assert local_to_utc(time, timezone) == localize(
+                    time, timezone
+                )
+
+
+def test_resolve_timezone_caches_and_falls_back():
+    assert resolve_timezone("Pacific Standard Time") is resolve_timezone(
+        "Pacific Standard Time"
+    )
+    assert resolve_timezone("Africa/Nairobi").transitions is None
+
+    # Anchorage moved across the date line, which its table leaves to localize
+    time = datetime(1895, 6, 1, 12)
+
+    assert resolve_timezone("America/Anchorage").transitions.since > time
+    assert local_to_utc(time, "America/Anchorage") == localize(
+        time, "America/Anchorage"
+    )
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_convert_many_to_utc_matches_convert_to_utc(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(_timezone, "numpy", None)
+
+    times = ["20240310T023000", "20241103T013000", "20240102T090000"]
+
+    for timezone in ("Eastern Standard Time", "Africa/Casablanca"):
+        assert convert_many_to_utc(times, timezone) == [
+            convert_to_utc(time, timezone) for time in times
+        ]
+
+    assert convert_many_to_utc(times[:1], "Etc/GMT-14", epoch=True) == [
+        1709987400
+    ]
+    # Years before 1000 keep the unpadded strftime format
+    assert convert_many_to_utc(["09990101T000000"], "UTC") == [
+        "9990101T000000Z"
+    ]
+
+    with pytest.raises(ValueError):
+        convert_many_to_utc(times + ["20240230T000000"], "UTC")
+
+
+def test_embedded_vtimezone_resolves_custom_tzids():
+    times = {
+        "dtstart": "20240310T023000",
+        "dtend": "20241103T013000",
+        "original": "20240102T090000Z",
+    }
+    eastern = vtimezone("-0500", "-0400")
+
+    assert convert_time_to_utc(
+        times, "Customized Time Zone", index_components(eastern)
+    ) == convert_time_to_utc(times, "America/New_York")
+    assert expand_recurrence(eastern).upcoming(3) == [
+        datetime(2024, 3, 8, 14, tzinfo=pytz.utc),
+        datetime(2024, 3, 9, 14, tzinfo=pytz.utc),
+        datetime(2024, 3, 10, 13, tzinfo=pytz.utc),
+    ]
+
+    # Another ical may define the same TZID differently
+    assert convert_to_utc(
+        "20240102T090000",
+        "Customized Time Zone",
+        index_components(vtimezone("+0100", "+0200")),
+    ) == "20240102T080000Z"
+
+    with pytest.raises(pytz.UnknownTimeZoneError):
+        convert_to_utc(
+            "20240102T090000",
+            "Undefined Time Zone",
+            index_components(eastern),
+        )
@@ -0,0 +1,98 @@
+"""Tokenizer Test"""
+
+from thirtyone.tokenizer import (ContentLine, find_component,
+                                 index_components, join_content_line,
+                                 tokenize)
+
+ICAL = (
+    "BEGIN:VCALENDAR\r\n"
+    + "BEGIN:VEVENT\r\n"
+    + "DESCRIPTION:Event\r\n"
+    + "BEGIN:VALARM\r\n"
+    + "DESCRIPTION:REMINDER\r\n"
+    + "END:VALARM\r\n"
+    + "END:VEVENT\r\n"
+    + "BEGIN:VTIMEZONE\r\n"
+    + "TZID:Etc/GMT\r\n"
+    + "END:VTIMEZONE\r\n"
+    + "END:VCALENDAR"
+)
+
+
+def test_tokenize_unfolds_lines():
+    ical = (
+        "BEGIN:VEVENT\r\nSUMMARY:Quarterly\r\n  planning\r\n\treview\r\n"
+        + "END:VEVENT"
+    )
+
+    assert tokenize(ical) == [
+        ContentLine("BEGIN", "", "VEVENT"),
+        ContentLine("SUMMARY", "", "Quarterly planningreview"),
+        ContentLine("END", "", "VEVENT"),
+    ]
+
+
+def test_tokenize_splits_quoted_parameters():
+    ical = (
+        'ORGANIZER;CN="Doe: Jane";SENT-BY="mailto:a@example.com":mailto:'
+        + "b@example.com\n"
+    )
+
+    assert tokenize(ical) == [
+        ContentLine(
+            "ORGANIZER",
+            'CN="Doe: Jane";SENT-BY="mailto:a@example.com"',
+            "mailto:b@example.com",
+        )
+    ]
+
+
+def test_tokenize_skips_lines_without_value_separator():
+    assert tokenize("\r\nnot a content line\r\nPRODID:-//31Events//EN") == [
+        ContentLine("PRODID", "", "-//31Events//EN")
+    ]
+
+
+def test_join_content_line():
+    assert (
+        join_content_line(ContentLine("DTSTART", "TZID=UTC", "20240101"))
+        == "DTSTART;TZID=UTC:20240101"
+    )
+
+
+def test_index_components_records_offsets():
+    index = index_components(ICAL)
+
+    assert [component.name for component in index.components] == [
+        "VCALENDAR",
+        "VEVENT",
+        "VALARM",
+        "VTIMEZONE",
+    ]
+
+    valarm = index.components[find_component(index, "VALARM")]
+
+    assert ICAL[valarm.start : valarm.end] == (
+        "BEGIN:VALARM\r\nDESCRIPTION:REMINDER\r\nEND:VALARM\r\n"
+    )
+    assert index.components[valarm.parent].name == "VEVENT"
+
+    vcalendar = index.components[find_component(index, "VCALENDAR")]
+
+    assert ICAL[vcalendar.start : vcalendar.end] == ICAL
+
+
+def test_index_components_owns_lines_by_innermost_component():
+    index = index_components(ICAL)
+    owners = [
+        index.components[index.owners[position]].name
+        for position in index.names["DESCRIPTION"]
+    ]
+
+    assert owners == ["VEVENT", "VALARM"]
+
+
+def test_index_components_closes_unterminated_components():
+    index = index_components("BEGIN:VCALENDAR\nBEGIN:VEVENT\nUID:1")
+
+    assert [(c.end, c.last) for c in index.components] == [(34, 2), (34, 2)]